@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for the school scheduler.
+
+Times every phase of a solve (create_variables, apply_constraints, solve, extraction,
+validate_solution and JSON serialisation) on generated or given instances, records model size
+and peak memory, and writes the results as JSON so runs can be compared across commits.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from instance_generator import SIZE_PRESETS, generate_instance
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_instance(name, instance, options):
+    """Solve one instance in this process and return its measurements."""
+    from index import SchoolScheduler, check_basic_feasibility, configure_scheduler
+
+    rss_before = peak_rss_mb()
+    scheduler = SchoolScheduler(
+        instance["teachers"], instance["subjects"], instance["classes"], instance["rooms"],
+        instance["days"], instance["periods"],
+        solve_mode=options["solve_mode"],
+        room_pooling=options.get("room_pooling", True),
+        engine=options.get("engine", "grid"),
+        symmetry_breaking=options.get("symmetry_breaking", False),
+        teacher_assignment=options["teacher_assignment"],
+        solver_params=options["solver"]
+    )
+    configure_scheduler(scheduler, instance)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        solution = scheduler.solve()
+    phases = dict(scheduler.phase_seconds)
+    if solution:
+        serialize_start = time.perf_counter()
+        json.dumps(scheduler.get_solution_json())
+        phases["serialize"] = round(time.perf_counter() - serialize_start, 4)
+    total = time.perf_counter() - start
+
+    proto = scheduler.model.Proto()
+    stats = scheduler.solve_stats or {}
+    return {
+        "name": name,
+        "solved": solution is not None,
+        "status": stats.get("status"),
+        "objective": stats.get("objective"),
+        "best_bound": stats.get("best_bound"),
+        "first_solution_seconds": scheduler.first_solution_seconds,
+        "total_seconds": round(total, 4),
+        "phases": phases,
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "aggregate_variables": scheduler.model_info.get("aggregate_variables"),
+        "lessons": sum(len(lessons) for lessons in solution.values()) if solution else 0,
+        "feasibility_issues": len(check_basic_feasibility(instance)),
+        "peak_rss_mb": peak_rss_mb(),
+        "model_rss_mb": round(peak_rss_mb() - rss_before, 1)
+    }
+
+
+def _run_job(job):
+    return run_instance(*job)
+
+
+def git_revision():
+    """Short commit hash of the working tree, with a '+dirty' suffix for uncommitted changes."""
+    # Ask the checkout this file lives in, wherever the benchmark is started from
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, text=True).strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd, text=True)
+        return revision + ("+dirty" if dirty.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Print the change of every phase between two result files, matching runs by name."""
+    previous_runs = {run["name"]: run for run in previous["runs"]}
+    print(f"\nComparison with {previous.get('revision')} ({previous.get('created_at')}):")
+    for run in current["runs"]:
+        old = previous_runs.get(run["name"])
+        if old is None:
+            print(f"  {run['name']}: not in previous results")
+            continue
+        print(f"  {run['name']}:")
+        rows = [
+            ("total", old["total_seconds"], run["total_seconds"]),
+            ("first_solution", old.get("first_solution_seconds"), run.get("first_solution_seconds"))
+        ]
+        rows += [
+            (phase, old["phases"].get(phase), seconds) for phase, seconds in run["phases"].items()
+        ]
+        rows += [
+            ("variables", old["variables"], run["variables"]),
+            ("constraints", old["constraints"], run["constraints"]),
+            ("aggregate_variables", old.get("aggregate_variables"), run.get("aggregate_variables")),
+            ("peak_rss_mb", old["peak_rss_mb"], run["peak_rss_mb"]),
+            ("objective", old["objective"], run["objective"])
+        ]
+        for label, before, after in rows:
+            if before is None or after is None:
+                print(f"    {label:<20} {str(before):>12} -> {str(after):>12}")
+                continue
+            change = f"{(after - before) / before * 100:+.1f}%" if before else ""
+            print(f"    {label:<20} {before:>12} -> {after:>12} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the school scheduler on synthetic instances.")
+    parser.add_argument("--sizes", nargs="*", default=["small", "medium"], choices=sorted(SIZE_PRESETS),
+                        help="Generated instance sizes (default: small medium)")
+    parser.add_argument("--seeds", nargs="*", type=int, default=[0], help="Generator seeds (default: 0)")
+    parser.add_argument("--instances", nargs="*", default=[], help="Additional instance JSON files")
+    parser.add_argument("--max-time", type=float, default=30, help="Solver time limit per run (default: 30)")
+    parser.add_argument("--num-workers", type=int, help="CP-SAT workers (default: server default)")
+    parser.add_argument("--random-seed", type=int, default=0, help="CP-SAT random seed (default: 0)")
+    parser.add_argument("--solve-mode", default="full", help="Scheduler solve mode (default: full)")
+    parser.add_argument("--teacher-assignment", action="store_true", help="Enable teacher assignment mode")
+    parser.add_argument("--no-room-pooling", action="store_true", help="Give every room its own variables")
+    parser.add_argument("--symmetry-breaking", action="store_true",
+                        help="Order equivalent rooms and interchangeable lessons")
+    parser.add_argument("--engine", default="grid", help="Model formulation, grid or interval (default: grid)")
+    parser.add_argument("-o", "--output", default="benchmark_results.json",
+                        help="Results file (default: benchmark_results.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    options = {
+        "solve_mode": args.solve_mode,
+        "teacher_assignment": args.teacher_assignment,
+        "room_pooling": not args.no_room_pooling,
+        "engine": args.engine,
+        "symmetry_breaking": args.symmetry_breaking,
+        "solver": {"max_time_in_seconds": args.max_time, "random_seed": args.random_seed}
+    }
+    if args.num_workers:
+        options["solver"]["num_workers"] = args.num_workers
+
+    jobs = []
+    for size in args.sizes:
+        for seed in args.seeds:
+            jobs.append((f"{size}-seed{seed}", generate_instance(seed=seed, **SIZE_PRESETS[size]), options))
+    for path in args.instances:
+        with open(path) as f:
+            jobs.append((os.path.basename(path), json.load(f), options))
+
+    # A fresh process per run keeps peak memory and module state independent between runs
+    runs = []
+    with multiprocessing.get_context("spawn").Pool(processes=1, maxtasksperchild=1) as pool:
+        for run in pool.imap(_run_job, jobs):
+            print(f"{run['name']}: {run['status']} in {run['total_seconds']}s "
+                  f"({run['variables']} variables, {run['aggregate_variables']} aggregates, {run['constraints']} constraints, "
+                  f"{run['peak_rss_mb']} MB)")
+            runs.append(run)
+
+    from ortools import __version__ as ortools_version
+    results = {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "ortools": ortools_version,
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "runs": runs
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Pre-solve feasibility screening.
+
+Every check works on indexes built once from the payload, so an infeasible input is rejected in
+milliseconds with a precise reason instead of after a full solver time limit. The checks are
+necessary conditions only: passing them does not guarantee that a timetable exists.
+"""
+from collections import defaultdict, deque
+
+
+def _bipartite_shortfall(demand, capacity, edges):
+    """Check whether every demand node can be served by the capacity nodes it is connected to.
+
+    demand is {left: amount}, capacity {right: amount} and edges {left: [rights]}. Returns None if
+    a flow meets all demand, otherwise (lefts, rights) of a minimum cut: a set of demand nodes whose
+    total demand exceeds the total capacity of all nodes they are connected to (a Hall violator).
+    """
+    lefts = list(demand)
+    rights = list(capacity)
+    source, sink = 0, len(lefts) + len(rights) + 1
+    index = {("L", left): i + 1 for i, left in enumerate(lefts)}
+    index.update({("R", right): len(lefts) + i + 1 for i, right in enumerate(rights)})
+
+    # Residual graph as parallel edge arrays; edge i ^ 1 is the reverse of edge i
+    graph = [[] for _ in range(sink + 1)]
+    head, cap = [], []
+
+    def add_edge(u, v, amount):
+        graph[u].append(len(head))
+        head.append(v)
+        cap.append(amount)
+        graph[v].append(len(head))
+        head.append(u)
+        cap.append(0)
+
+    total_demand = 0
+    for left in lefts:
+        add_edge(source, index[("L", left)], demand[left])
+        total_demand += demand[left]
+        for right in edges.get(left, []):
+            add_edge(index[("L", left)], index[("R", right)], demand[left])
+    for right in rights:
+        add_edge(index[("R", right)], sink, capacity[right])
+
+    # Dinic's algorithm: BFS levels, then blocking flows along level-increasing paths
+    flow = 0
+    while True:
+        level = [-1] * (sink + 1)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for e in graph[u]:
+                if cap[e] > 0 and level[head[e]] < 0:
+                    level[head[e]] = level[u] + 1
+                    queue.append(head[e])
+        if level[sink] < 0:
+            break
+
+        # Augment along level-increasing paths found by an iterative depth-first search
+        next_edge = [0] * (sink + 1)
+        while True:
+            path = []  # Edges from the source to the current node
+            u = source
+            while u != sink:
+                while next_edge[u] < len(graph[u]):
+                    e = graph[u][next_edge[u]]
+                    if cap[e] > 0 and level[head[e]] == level[u] + 1:
+                        break
+                    next_edge[u] += 1
+                else:
+                    # Dead end: retreat and skip the edge that led here
+                    if not path:
+                        break
+                    level[u] = -1
+                    e = path.pop()
+                    u = head[e ^ 1]
+                    next_edge[u] += 1
+                    continue
+                path.append(e)
+                u = head[e]
+            if u != sink:
+                break
+            pushed = min(cap[e] for e in path)
+            for e in path:
+                cap[e] -= pushed
+                cap[e ^ 1] += pushed
+            flow += pushed
+
+    if flow >= total_demand:
+        return None
+
+    # Nodes still reachable from the source form the demand side of a minimum cut
+    reachable = {source}
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        for e in graph[u]:
+            if cap[e] > 0 and head[e] not in reachable:
+                reachable.add(head[e])
+                queue.append(head[e])
+    cut_lefts = [left for left in lefts if index[("L", left)] in reachable]
+    cut_rights = [right for right in rights if index[("R", right)] in reachable]
+    return cut_lefts, cut_rights
+
+
+def check_basic_feasibility(data):
+    """Check for obvious infeasibilities before solving. Returns a list of issue dicts."""
+    issues = []
+
+    days = data.get('days', [])
+    periods = data.get('periods', [])
+    teachers = data.get('teachers', [])
+    rooms = data.get('rooms', [])
+    teacher_subjects = data.get('teacher_subjects', {})
+    teacher_classes = data.get('teacher_classes', {})
+    class_subjects = data.get('class_subjects', {})
+    subject_constraints = data.get('subject_constraints', {})
+    room_suitability = data.get('room_suitability', {})
+    teacher_unavailability = data.get('teacher_unavailability', {})
+
+    # Open (non-break) timeslots, overall and per day
+    break_slots = {(day, period) for day, period in data.get('break_periods', [])}
+    open_periods_by_day = {day: sum(1 for period in periods if (day, period) not in break_slots) for day in days}
+    available_periods = sum(open_periods_by_day.values())
+
+    # Teachers that can teach each (class, subject) pair, and each teacher's free periods
+    capable_teachers = defaultdict(list)
+    for teacher in teachers:
+        for class_id in teacher_classes.get(teacher, []):
+            class_demand = class_subjects.get(class_id, {})
+            for subject in teacher_subjects.get(teacher, []):
+                if class_demand.get(subject, 0) > 0:
+                    capable_teachers[(class_id, subject)].append(teacher)
+    teacher_free = {}
+    for teacher in teachers:
+        unavailable = {(day, period) for day, period in teacher_unavailability.get(teacher, [])}
+        teacher_free[teacher] = available_periods - len(unavailable - break_slots)
+
+    # Fixed assignments pin a (class, subject) pair to one teacher
+    fixed_teacher = {}
+    for assignment in data.get('fixed_assignments', []):
+        teacher, class_id, subject = assignment.get('teacher'), assignment.get('class'), assignment.get('subject')
+        if teacher not in capable_teachers.get((class_id, subject), []):
+            continue  # The solver ignores fixed assignments that do not match a capable teacher
+        if fixed_teacher.setdefault((class_id, subject), teacher) != teacher:
+            issues.append({
+                "type": "conflicting_fixed_assignments",
+                "class": class_id,
+                "subject": subject,
+                "teachers": [fixed_teacher[(class_id, subject)], teacher],
+                "explanation": f"{subject} for class {class_id} is fixed to both {fixed_teacher[(class_id, subject)]} and {teacher}, but each fixed teacher must teach every lesson"
+            })
+
+    # Class load against open periods
+    for class_id, subjects in class_subjects.items():
+        required_periods = sum(subjects.values())
+        if required_periods > available_periods:
+            issues.append({
+                "type": "class_overload",
+                "class": class_id,
+                "required_periods": required_periods,
+                "available_periods": available_periods,
+                "explanation": f"Class {class_id} needs {required_periods} periods per week but only {available_periods} non-break periods exist"
+            })
+
+    # Daily min/max per subject against weekly periods and the periods of each day; a day that is all
+    # breaks holds no lessons, so daily limits only count the days with an open period
+    open_days = [day for day, open_periods in open_periods_by_day.items() if open_periods > 0]
+    for class_id, subjects in class_subjects.items():
+        daily_minimum = 0
+        for subject, weekly_periods in subjects.items():
+            if subject not in subject_constraints:
+                continue
+            min_daily, max_daily = subject_constraints[subject]
+            daily_minimum += min_daily
+            if min_daily * len(open_days) > weekly_periods:
+                issues.append({
+                    "type": "subject_min_daily_too_high",
+                    "class": class_id,
+                    "subject": subject,
+                    "weekly_periods": weekly_periods,
+                    "min_daily": min_daily,
+                    "explanation": f"{subject} for class {class_id} needs at least {min_daily} periods on each of {len(open_days)} days, more than its {weekly_periods} weekly periods"
+                })
+            if max_daily * len(open_days) < weekly_periods:
+                issues.append({
+                    "type": "subject_max_daily_too_low",
+                    "class": class_id,
+                    "subject": subject,
+                    "weekly_periods": weekly_periods,
+                    "max_daily": max_daily,
+                    "explanation": f"{subject} for class {class_id} needs {weekly_periods} weekly periods but at most {max_daily} per day fit into {len(open_days)} days"
+                })
+        for day in open_days:
+            open_periods = open_periods_by_day[day]
+            if daily_minimum > open_periods:
+                issues.append({
+                    "type": "class_daily_minimum_overload",
+                    "class": class_id,
+                    "day": day,
+                    "required_periods": daily_minimum,
+                    "available_periods": open_periods,
+                    "explanation": f"Class {class_id} needs at least {daily_minimum} periods on {day} for its daily subject minimums, but {day} has only {open_periods} non-break periods"
+                })
+
+    # A consecutive block needs that many weekly periods, a daily maximum that allows it and an unbroken run of periods
+    longest_run = 0
+    for day in days:
+        run = 0
+        for period in periods:
+            run = 0 if (day, period) in break_slots else run + 1
+            longest_run = max(longest_run, run)
+    for subject, min_consecutive in data.get('consecutive_periods', {}).items():
+        if min_consecutive <= 1:
+            continue
+        max_daily = subject_constraints.get(subject, (0, len(periods)))[1]
+        for class_id, subjects in class_subjects.items():
+            weekly_periods = subjects.get(subject, 0)
+            if weekly_periods <= 0 or min_consecutive <= min(weekly_periods, max_daily, longest_run):
+                continue
+            limits = [
+                f"{limit} {label}" for limit, label in (
+                    (weekly_periods, "weekly periods"), (max_daily, "periods per day"),
+                    (longest_run, "unbroken periods in a day")
+                ) if limit < min_consecutive
+            ]
+            issues.append({
+                "type": "consecutive_block_too_long",
+                "class": class_id,
+                "subject": subject,
+                "min_consecutive": min_consecutive,
+                "explanation": f"{subject} for class {class_id} needs a block of {min_consecutive} consecutive periods, but allows only {' and '.join(limits)}"
+            })
+
+    # Check for subject-teacher coverage
+    subject_teachers = defaultdict(list)
+    for teacher, subjects in teacher_subjects.items():
+        for subject in subjects:
+            subject_teachers[subject].append(teacher)
+    for class_id, subjects in class_subjects.items():
+        for subject, weekly_periods in subjects.items():
+            if weekly_periods <= 0:
+                continue
+            if not subject_teachers.get(subject):
+                issues.append({
+                    "type": "no_teachers_for_subject",
+                    "subject": subject,
+                    "class": class_id,
+                    "explanation": f"Subject {subject} is required for class {class_id} but no teachers can teach it"
+                })
+            elif not capable_teachers.get((class_id, subject)):
+                issues.append({
+                    "type": "no_capable_teachers",
+                    "subject": subject,
+                    "class": class_id,
+                    "explanation": f"No teachers can teach {subject} to class {class_id}"
+                })
+
+    # Lessons only one teacher can give (or fixed to one teacher) must fit that teacher's free periods
+    required_by_teacher = defaultdict(int)
+    for pair, candidates in capable_teachers.items():
+        if pair in fixed_teacher or len(candidates) == 1:
+            class_id, subject = pair
+            required_by_teacher[fixed_teacher.get(pair, candidates[0])] += class_subjects[class_id][subject]
+    for teacher, required_periods in required_by_teacher.items():
+        if required_periods > teacher_free[teacher]:
+            issues.append({
+                "type": "teacher_overload",
+                "teacher": teacher,
+                "required_periods": required_periods,
+                "available_periods": teacher_free[teacher],
+                "explanation": f"Teacher {teacher} needs to teach {required_periods} periods but only has {teacher_free[teacher]} available periods"
+            })
+
+    # With teacher assignment, one teacher gives all lessons of a pair
+    if data.get('teacher_assignment'):
+        for (class_id, subject), candidates in capable_teachers.items():
+            weekly_periods = class_subjects[class_id][subject]
+            if all(teacher_free[teacher] < weekly_periods for teacher in candidates):
+                issues.append({
+                    "type": "no_teacher_with_capacity",
+                    "class": class_id,
+                    "subject": subject,
+                    "weekly_periods": weekly_periods,
+                    "explanation": f"None of the teachers of {subject} for class {class_id} has {weekly_periods} free periods"
+                })
+
+    # Teacher supply: all lessons together must be coverable by the free periods of capable teachers.
+    # Only run when no simpler issue already explains the shortage.
+    if not issues:
+        demand = {
+            pair: class_subjects[pair[0]][pair[1]] for pair in capable_teachers
+        }
+        edges = {
+            pair: [fixed_teacher[pair]] if pair in fixed_teacher else candidates
+            for pair, candidates in capable_teachers.items()
+        }
+        shortfall = _bipartite_shortfall(demand, dict(teacher_free), edges)
+        if shortfall:
+            pairs, cut_teachers = shortfall
+            required_periods = sum(demand[pair] for pair in pairs)
+            available = sum(teacher_free[teacher] for teacher in cut_teachers)
+            issues.append({
+                "type": "teacher_supply",
+                "lessons": [[class_id, subject] for class_id, subject in pairs],
+                "teachers": cut_teachers,
+                "required_periods": required_periods,
+                "available_periods": available,
+                "explanation": f"{len(pairs)} class-subject pairs need {required_periods} periods, but the {len(cut_teachers)} teachers qualified for them only have {available} free periods together"
+            })
+
+    # Room supply: lessons of each subject must fit into the open periods of its suitable rooms
+    if rooms and available_periods:
+        subject_demand = defaultdict(int)
+        for subjects in class_subjects.values():
+            for subject, weekly_periods in subjects.items():
+                subject_demand[subject] += max(weekly_periods, 0)
+        # Rooms with the same set of suitable subjects are interchangeable, group them
+        room_groups = defaultdict(list)
+        signature = defaultdict(set)
+        for subject in subject_demand:
+            for room in room_suitability.get(subject, rooms):
+                signature[room].add(subject)
+        for room in rooms:
+            room_groups[frozenset(signature[room])].append(room)
+        group_of = {room: key for key, group in room_groups.items() for room in group}
+        edges = {
+            subject: list({group_of[room] for room in room_suitability.get(subject, rooms) if room in group_of})
+            for subject in subject_demand
+        }
+        capacity = {key: len(group) * available_periods for key, group in room_groups.items()}
+        shortfall = _bipartite_shortfall(dict(subject_demand), capacity, edges)
+        if shortfall:
+            cut_subjects, cut_groups = shortfall
+            cut_rooms = [room for key in cut_groups for room in room_groups[key]]
+            required_periods = sum(subject_demand[subject] for subject in cut_subjects)
+            available = len(cut_rooms) * available_periods
+            issues.append({
+                "type": "room_supply",
+                "subjects": cut_subjects,
+                "rooms": cut_rooms,
+                "required_periods": required_periods,
+                "available_periods": available,
+                "explanation": f"Lessons of {', '.join(cut_subjects)} need {required_periods} room periods, but their {len(cut_rooms)} suitable rooms only offer {available}"
+            })
+
+    return issues
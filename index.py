@@ -1,9 +1,205 @@
 from ortools.sat.python import cp_model
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import json
+import os
+import threading
+import time
+from feasibility import check_basic_feasibility
+from interval_engine import IntervalModel
+from model_cache import CompiledModel, get_model_cache, hard_model_key
+from portfolio import resolve_portfolio, solve_portfolio
+from solution_cache import canonical_input_hash, get_solution_cache
+from validation import validate_timetable
+
+# "full" puts the room in every variable; "two_stage" schedules lessons first and matches rooms afterwards
+SOLVE_MODES = ("full", "two_stage")
+
+# "grid" gives every lesson a boolean per timeslot and room; "interval" gives it a start and optional intervals
+ENGINES = ("grid", "interval")
+
+# Upper bound on the room-group unions enumerated for the two-stage capacity constraints
+MAX_ROOM_GROUP_UNIONS = 4096
+
+# Objective reward for keeping a lesson of the previous solution during a repair
+REPAIR_KEEP_REWARD = 100
+
+# Payload keys that do not change the timetable and are left out of the solution cache key
+CACHE_IGNORED_KEYS = ("use_cache", "stats", "diagnose", "debug_names")
+
+def _env_number(name, default, cast):
+    """Read a numeric setting from the environment, falling back to default when unset."""
+    value = os.environ.get(name)
+    return cast(value) if value not in (None, "") else default
+
+
+def _strict_bool(value, name, default=False):
+    """Return a JSON flag, or default when it is missing; raises TypeError for anything but true/false.
+    
+    bool("false") would be True, so JSON strings and numbers are rejected rather than coerced.
+    """
+    if value is None:
+        return default
+    if not isinstance(value, bool):
+        raise TypeError(f"{name} must be true or false")
+    return value
+
+
+def resolve_solver_params(requested=None):
+    """Merge per-request solver settings with the server defaults and caps.
+    
+    Defaults come from SCHEDULER_MAX_TIME_SECONDS and SCHEDULER_NUM_WORKERS, caps from
+    SCHEDULER_MAX_TIME_CAP and SCHEDULER_MAX_WORKERS. Returns the parameters that will actually be
+    used; raises ValueError for unknown keys or invalid values.
+    """
+    requested = dict(requested or {})
+    unknown = set(requested) - {"num_workers", "max_time_in_seconds", "random_seed", "relative_gap_limit", "log_to_response"}
+    if unknown:
+        raise ValueError(f"Unknown solver parameters: {', '.join(sorted(unknown))}")
+    
+    max_time_cap = _env_number("SCHEDULER_MAX_TIME_CAP", 300.0, float)
+    max_workers = _env_number("SCHEDULER_MAX_WORKERS", os.cpu_count() or 1, int)
+    
+    max_time = float(requested.get("max_time_in_seconds", _env_number("SCHEDULER_MAX_TIME_SECONDS", 60.0, float)))
+    num_workers = int(requested.get("num_workers", _env_number("SCHEDULER_NUM_WORKERS", max_workers, int)))
+    if max_time <= 0:
+        raise ValueError("max_time_in_seconds must be positive")
+    if num_workers < 1:
+        raise ValueError("num_workers must be at least 1")
+    log_to_response = _strict_bool(requested.get("log_to_response"), "log_to_response")
+    
+    params = {
+        "num_workers": min(num_workers, max_workers),
+        "max_time_in_seconds": min(max_time, max_time_cap),
+        "random_seed": None,
+        "relative_gap_limit": None,
+        "log_to_response": log_to_response
+    }
+    if requested.get("random_seed") is not None:
+        params["random_seed"] = int(requested["random_seed"])
+    if requested.get("relative_gap_limit") is not None:
+        params["relative_gap_limit"] = float(requested["relative_gap_limit"])
+        if params["relative_gap_limit"] < 0:
+            raise ValueError("relative_gap_limit must not be negative")
+    return params
+
+
+@contextmanager
+def timed_phase(phases, name):
+    """Add the wall time of the enclosed block to phases[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = round(phases.get(name, 0.0) + time.perf_counter() - start, 4)
+
+
+def match_rooms(candidate_rooms):
+    """Assign a distinct room to every lesson in one timeslot using augmenting paths.
+    
+    candidate_rooms holds the suitable rooms of each lesson. Returns a list with one room per
+    lesson, or None if no matching exists.
+    """
+    room_owner = {}  # {room_id: lesson index}
+    
+    def try_assign(lesson_idx, visited):
+        for room in candidate_rooms[lesson_idx]:
+            if room in visited:
+                continue
+            visited.add(room)
+            if room not in room_owner or try_assign(room_owner[room], visited):
+                room_owner[room] = lesson_idx
+                return True
+        return False
+    
+    for lesson_idx in range(len(candidate_rooms)):
+        if not try_assign(lesson_idx, set()):
+            return None
+    
+    assigned = [None] * len(candidate_rooms)
+    for room, lesson_idx in room_owner.items():
+        assigned[lesson_idx] = room
+    return assigned
+
+
+class FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    """Solution callback that records when the first feasible solution was found."""
+    
+    def __init__(self):
+        super().__init__()
+        self.first_solution_seconds = None
+        self.solution_count = 0
+    
+    def on_solution_callback(self):
+        if self.first_solution_seconds is None:
+            self.first_solution_seconds = self.WallTime()
+        self.solution_count += 1
+
+
+class SolutionStreamer(FirstSolutionTimer):
+    """Solution callback that reports every improving solution as a diff against the previous one.
+    
+    listener receives a dict with the objective value, best bound, elapsed seconds and the lessons
+    added and removed since the last solution, each as [teacher, class, subject, day, period].
+    scheduled_lessons(value) yields the lessons of a solution, see SchoolScheduler._scheduled_lessons.
+    """
+    
+    def __init__(self, scheduled_lessons, listener):
+        super().__init__()
+        self.scheduled_lessons = scheduled_lessons
+        self.listener = listener
+        self.previous_lessons = set()
+    
+    def on_solution_callback(self):
+        super().on_solution_callback()
+        lessons = {lesson[:5] for lesson in self.scheduled_lessons(self.Value)}
+        self.listener({
+            "solution": self.solution_count,
+            "objective": self.ObjectiveValue(),
+            "bound": self.BestObjectiveBound(),
+            "elapsed_seconds": round(self.WallTime(), 3),
+            "lessons": len(lessons),
+            "added": sorted(list(lesson) for lesson in lessons - self.previous_lessons),
+            "removed": sorted(list(lesson) for lesson in self.previous_lessons - lessons)
+        })
+        self.previous_lessons = lessons
+
+
+class Interner:
+    """Dense integer ids for names, assigned in first-seen order."""
+    
+    def __init__(self, names=()):
+        self.names = []  # {id: name} as a list
+        self.ids = {}    # {name: id}
+        for name in names:
+            self.add(name)
+    
+    def add(self, name):
+        """Return the id of name, assigning the next free id to a new name."""
+        entity_id = self.ids.get(name)
+        if entity_id is None:
+            entity_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return entity_id
+    
+    def __len__(self):
+        return len(self.names)
+
 
 class SchoolScheduler:
-    def __init__(self, teachers, subjects, classes, rooms, days, periods):
+    def __init__(self, teachers, subjects, classes, rooms, days, periods, solve_mode="full", room_workers=1,
+                 room_pooling=True, teacher_assignment=False, solver_params=None, model_cache=None,
+                 solution_listener=None, cancel_event=None, portfolio=None, debug_names=False, engine="grid",
+                 symmetry_breaking=False):
+        if solve_mode not in SOLVE_MODES:
+            raise ValueError(f"Unknown solve mode '{solve_mode}', expected one of {', '.join(SOLVE_MODES)}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        if engine == "interval" and solve_mode != "full":
+            raise ValueError("The interval engine assigns rooms in the model and only supports solve_mode 'full'")
+        
         self.teachers = teachers
         self.subjects = subjects
         self.classes = classes
@@ -11,6 +207,26 @@ class SchoolScheduler:
         self.days = days
         self.periods = periods
         self.timeslots = [(day, period) for day in days for period in periods]
+        self.solve_mode = solve_mode
+        self.two_stage_fallback = False  # Set when two_stage had too many room groups and solved in full mode
+        self.room_workers = room_workers  # Processes used for two-stage room matching
+        self.room_pooling = room_pooling  # Model interchangeable rooms as one pool with a per-slot capacity
+        self.teacher_assignment = teacher_assignment  # One teacher per (class, subject), chosen by the model
+        self.solver_params = resolve_solver_params(solver_params)
+        self.model_cache = model_cache  # Optional cache of compiled hard-constraint models
+        self.solution_listener = solution_listener  # Called with every improving solution, see SolutionStreamer
+        self.cancel_event = cancel_event  # threading.Event; setting it stops the search and keeps the best solution
+        self.portfolio = resolve_portfolio(portfolio)  # Solve with several parameterised processes, see portfolio.py
+        self.debug_names = debug_names  # Give model variables readable names (slower, larger models)
+        self.engine = engine  # Model formulation, see ENGINES and interval_engine.py
+        self.symmetry_breaking = symmetry_breaking  # Order equivalent rooms and interchangeable lessons
+        self.portfolio_info = None
+        self.solver_log = []
+        self.first_solution_seconds = None
+        
+        # Warm start from a previous solution
+        self.hint_assignments = []  # [(teacher_id, class_id, subject_id, day, period, room_id)]
+        self.hint_info = None
         
         # Settings to be populated
         self.teacher_subjects = {}  # {teacher_id: [subject_ids]}
@@ -27,11 +243,67 @@ class SchoolScheduler:
         self.consecutive_periods = {}     # {subject_id: min_consecutive_periods}
         self.break_periods = []           # [(day, period)]
         
-        # Model setup
-        self.model = cp_model.CpModel()
-        self.objective_terms = []
-        self.schedule_vars = {}
+        # Repair mode: only the neighbourhood gets free variables, everything else is frozen
+        self.repair_scope = None   # (set of teacher_ids, set of class_ids) or None for a full solve
+        self.frozen_lessons = []   # [(teacher_id, class_id, subject_id, day, period, room_id)]
+        self.repair_info = None
+        
+        self.phase_seconds = {}  # {phase: wall seconds} of the last solve()
+        self.solve_stats = None   # Status, objective and bound of the last solve()
+        
+        # Infeasibility diagnosis: {group key: assumption literal} while diagnose() builds its model
+        self.diagnosis_groups = None
+        self.diagnosis_info = None
+        
         self.solution = None
+        self._reset_model()
+    
+    def _reset_model(self):
+        """Start a fresh CpModel with empty variables and indexes, so solve() can run again."""
+        self.model = cp_model.CpModel()
+        self.objective_vars = []    # Objective as parallel variable and coefficient lists, see _set_objective
+        self.objective_coeffs = []
+        self.objective_offset = 0
+        self.interval_model = IntervalModel(self) if self.engine == "interval" else None
+        
+        # Entities interned to dense integer ids by create_variables; names only return at output time
+        self.teacher_index = Interner()
+        self.class_index = Interner()
+        self.subject_index = Interner()
+        self.room_index = Interner()
+        self.slot_index = Interner()  # (day, period) in self.timeslots order, so day = slot // len(periods)
+        
+        # Schedule variables in creation order, with their entity ids as parallel columns
+        self.schedule_vars = []
+        self.var_teacher = array("i")
+        self.var_class = array("i")
+        self.var_subject = array("i")
+        self.var_slot = array("i")
+        self.var_pool = array("i")  # Room id of the pool's first room, -1 in two-stage mode
+        
+        # Variable indexes by entity ids, filled by create_variables so constraints never re-scan schedule_vars
+        self.teacher_slot_vars = defaultdict(list)       # {(teacher, slot): [schedule vars]}
+        self.class_slot_vars = defaultdict(list)         # {(class, slot): [schedule vars]}
+        self.room_slot_vars = defaultdict(list)          # {(pool, slot): [schedule vars]}
+        self.subject_slot_vars = defaultdict(list)       # {(subject, slot): [schedule vars]}
+        self.lesson_vars = defaultdict(list)             # {(teacher, class, subject, slot): [schedule vars]}, one per pool
+        self.class_subject_vars = defaultdict(list)      # {(class, subject): [schedule vars]}
+        
+        # Shared aggregates over the schedule variables for the counting constraints, see _create_aggregate_vars
+        self.lesson_slot_vars = {}  # {(teacher, class, subject, slot): var}, the lesson is taught in some room
+        self.taught_vars = {}       # {(class, subject, slot): var}, the class has the subject with some teacher
+        self.assignment_vars = defaultdict(list)         # {(teacher, class, subject): [lesson aggregates]}
+        self.class_subject_slot_vars = defaultdict(list) # {(class, subject, slot): [lesson aggregates]}
+        self.teacher_lesson_vars = defaultdict(list)     # {(teacher, slot): [lesson aggregates]}
+        self.assignment_count_vars = {}  # {(teacher, class, subject): var}, lesson counts in the objective
+        self.class_subject_day_vars = defaultdict(list)  # {(class, subject, day): [taught aggregates]}
+        self.room_pools = {}    # {pool_id: [room_ids]}, the pool id is the pool's first room
+        self.room_pool_of = {}  # {room_id: pool_id}
+        self.equivalent_pools = {}  # {pool_id: [pool_ids with the same suitability]}, symmetry breaking only
+        self.teacher_candidates = {}       # {(class_id, subject_id): [teacher_ids]}, teacher_assignment mode only
+        self.teacher_assignment_vars = {}  # {(teacher, class, subject): var} by entity ids
+        self.blocked_vars = defaultdict(list)  # {diagnosis group: [vars]} in break/unavailable slots, diagnosis only
+        self.model_info = {"solve_mode": self.solve_mode, "engine": self.engine, "variables": 0, "full_model_variables": 0, "variables_saved": 0}
     
     def set_teacher_subjects(self, teacher_subjects):
         self.teacher_subjects = teacher_subjects
@@ -52,7 +324,11 @@ class SchoolScheduler:
         self.fixed_assignments.append((teacher_id, class_id, subject_id))
     
     def set_room_suitability(self, room_suitability):
-        self.room_suitability = room_suitability
+        """Set the rooms each subject can be taught in; rooms not in self.rooms are ignored."""
+        known_rooms = set(self.rooms)
+        self.room_suitability = {
+            subject: [room for room in rooms if room in known_rooms] for subject, rooms in room_suitability.items()
+        }
     
     # New methods for additional features
     def set_teacher_unavailability(self, teacher_unavailability):
@@ -71,194 +347,690 @@ class SchoolScheduler:
         """Set which periods are designated as break/lunch periods."""
         self.break_periods = break_periods
     
+    def parse_solution(self, solution_json):
+        """Convert a solution in get_solution_json format into {(day, period): [assignments]}.
+        
+        Accepts either the full response or just its "solution" mapping. Timeslot keys are
+        resolved against the known days and periods; unknown timeslots are skipped.
+        """
+        if "solution" in solution_json and isinstance(solution_json["solution"], dict):
+            solution_json = solution_json["solution"]
+        
+        slot_keys = {f"{day}_{period}": (day, period) for day, period in self.timeslots}
+        solution = defaultdict(list)
+        for slot_key, assignments in solution_json.items():
+            if slot_key not in slot_keys:
+                continue
+            solution[slot_keys[slot_key]].extend(assignments)
+        return solution
+    
+    def set_solution_hint(self, previous_solution):
+        """Use a previous solution (get_solution_json format) as CP-SAT hints for the next solve."""
+        self.hint_assignments = []
+        for (day, period), assignments in self.parse_solution(previous_solution).items():
+            for assignment in assignments:
+                self.hint_assignments.append((
+                    assignment.get("teacher"), assignment.get("class"), assignment.get("subject"),
+                    day, period, assignment.get("room")
+                ))
+        self.hint_info = {
+            "assignments": len(self.hint_assignments),
+            "previous_first_solution_seconds": previous_solution.get("first_solution_seconds")
+        }
+    
+    def _intern_entities(self):
+        """Assign dense integer ids to teachers, classes, subjects, rooms and timeslots.
+        
+        Subjects only named in teacher_subjects or class_subjects get ids after the listed ones.
+        """
+        self.teacher_index = Interner(self.teachers)
+        self.class_index = Interner(self.classes)
+        self.subject_index = Interner(self.subjects)
+        for subjects in list(self.teacher_subjects.values()) + list(self.class_subjects.values()):
+            for subject in subjects:
+                self.subject_index.add(subject)
+        self.room_index = Interner(self.rooms)
+        self.slot_index = Interner(self.timeslots)
+    
+    def _lesson_of(self, position):
+        """Return (teacher, class, subject, day, period) of the schedule variable at position."""
+        day, period = self.slot_index.names[self.var_slot[position]]
+        return (
+            self.teacher_index.names[self.var_teacher[position]], self.class_index.names[self.var_class[position]],
+            self.subject_index.names[self.var_subject[position]], day, period
+        )
+    
+    def _var_position_key(self, teacher, class_id, subject, day, period, pool):
+        """Entity-id key of a schedule variable in _schedule_var_positions, or None for unknown names."""
+        key = (
+            self.teacher_index.ids.get(teacher), self.class_index.ids.get(class_id),
+            self.subject_index.ids.get(subject), self.slot_index.ids.get((day, period)),
+            -1 if pool is None else self.room_index.ids.get(pool)
+        )
+        return None if None in key else key
+    
+    def _schedule_var_positions(self):
+        """Return {(teacher, class, subject, slot, pool): position} for all schedule variables."""
+        return {
+            key: position for position, key in enumerate(zip(
+                self.var_teacher, self.var_class, self.var_subject, self.var_slot, self.var_pool
+            ))
+        }
+    
+    def _hinted_positions(self):
+        """Return the schedule variable positions that match an assignment of the hinted solution."""
+        positions = self._schedule_var_positions()
+        hinted = set()
+        # Equivalent rooms are used in room order, so hinted rooms are renumbered to fit the order
+        rooms_taken = defaultdict(int)  # {(day, period, first equivalent pool): rooms hinted so far}
+        for teacher, class_id, subject, day, period, room in self.hint_assignments:
+            pool = None if self.solve_mode == "two_stage" else self.room_pool_of.get(room)
+            if pool is None and self.solve_mode != "two_stage":
+                continue
+            position = positions.get(self._var_position_key(teacher, class_id, subject, day, period, pool))
+            if position is None:
+                continue
+            pools = self.equivalent_pools.get(pool)
+            if pools is not None and rooms_taken[(day, period, pools[0])] < len(pools):
+                pool = pools[rooms_taken[(day, period, pools[0])]]
+                rooms_taken[(day, period, pools[0])] += 1
+                position = positions.get(self._var_position_key(teacher, class_id, subject, day, period, pool), position)
+            hinted.add(position)
+        return hinted
+    
+    def _apply_solution_hint(self):
+        """Hint every schedule variable: 1 if it matches a previous assignment, 0 otherwise.
+        
+        Assignments whose variable no longer exists (changed availability, removed room, ...)
+        are dropped and counted in hint_info.
+        """
+        hinted = self._hinted_positions()
+        for position, var in enumerate(self.schedule_vars):
+            self.model.AddHint(var, 1 if position in hinted else 0)
+        
+        hinted_teachers = {
+            (self.var_teacher[position], self.var_class[position], self.var_subject[position]) for position in hinted
+        }
+        for assignment_key, var in self.teacher_assignment_vars.items():
+            self.model.AddHint(var, 1 if assignment_key in hinted_teachers else 0)
+        
+        # Aggregates over several variables get a hint too, so the hint stays complete
+        hinted_lessons = {
+            (self.var_teacher[position], self.var_class[position], self.var_subject[position], self.var_slot[position])
+            for position in hinted
+        }
+        for key, var in self.lesson_slot_vars.items():
+            if len(self.lesson_vars[key]) > 1:
+                self.model.AddHint(var, 1 if key in hinted_lessons else 0)
+        hinted_taught = {(c, s, slot) for _, c, s, slot in hinted_lessons}
+        for key, var in self.taught_vars.items():
+            if len(self.class_subject_slot_vars[key]) > 1:
+                self.model.AddHint(var, 1 if key in hinted_taught else 0)
+        hinted_counts = defaultdict(int)
+        for t, c, s, _ in hinted_lessons:
+            hinted_counts[(t, c, s)] += 1
+        for key, var in self.assignment_count_vars.items():
+            self.model.AddHint(var, hinted_counts[key])
+        
+        total = len(self.hint_assignments)
+        self.hint_info.update({
+            "applied": len(hinted),
+            "dropped": total - len(hinted),
+            "survival_rate": round(len(hinted) / total, 4) if total else 0.0
+        })
+    
+    def _slot_mask(self, timeslots):
+        """Bitset of the given (day, period) timeslots; bit i stands for self.timeslots[i]."""
+        mask = 0
+        for timeslot in timeslots:
+            slot = self.slot_index.ids.get(tuple(timeslot))
+            if slot is not None:
+                mask |= 1 << slot
+        return mask
+    
+    def _availability_bitsets(self):
+        """Return (teacher_open, class_open, pool_open): {entity: bitset of the timeslots it can be used in}.
+        
+        Break periods close a timeslot for everyone, unavailability only for the teacher.
+        """
+        open_slots = ((1 << len(self.timeslots)) - 1) & ~self._slot_mask(self.break_periods)
+        teacher_open = {
+            teacher: open_slots & ~self._slot_mask(self.teacher_unavailability.get(teacher, []))
+            for teacher in self.teachers
+        }
+        class_open = defaultdict(lambda: open_slots, {class_id: open_slots for class_id in self.classes})
+        pool_open = {self.room_index.ids[pool]: open_slots for pool in self.room_pools}
+        return teacher_open, class_open, pool_open
+    
+    def _daily_minimum_days(self):
+        """Return {(class_id, subject_id): set of day indices} on which the subject's daily minimum applies.
+        
+        Like the validator, a minimum applies on every day some qualified teacher has an open timeslot,
+        whether or not pruning left that day any variables.
+        """
+        teacher_open, _, _ = self._availability_bitsets()
+        day_mask = (1 << len(self.periods)) - 1
+        days = defaultdict(set)
+        for teacher in self.teachers:
+            open_days = {
+                d for d in range(len(self.days))
+                if (teacher_open[teacher] >> (d * len(self.periods))) & day_mask
+            }
+            for class_id in self.teacher_classes.get(teacher, []):
+                for subject in self.teacher_subjects.get(teacher, []):
+                    if subject in self.class_subjects.get(class_id, {}):
+                        days[(class_id, subject)] |= open_days
+        return days
+    
+    def _pruned_lessons(self):
+        """Return {(teacher_id, class_id, subject_id): reason} for lessons the hard constraints rule out.
+        
+        Implications propagated before any variable exists: when a teacher is fixed to a class and
+        subject, every lesson of it is theirs, so the other teachers are pruned; a class-subject with 0
+        weekly periods or a subject with a daily maximum of 0 cannot be taught.
+        """
+        pruned = {}
+        classes = set(self.classes)
+        fixed_teachers = defaultdict(set)
+        for teacher, class_id, subject in self.fixed_assignments:
+            qualified = (
+                teacher in self.teacher_index.ids
+                and class_id in self.teacher_classes.get(teacher, [])
+                and subject in self.teacher_subjects.get(teacher, [])
+                and subject in self.class_subjects.get(class_id, {})
+            )
+            # In repair mode the fixed teacher only gets variables inside the neighbourhood
+            if qualified and self.repair_scope is not None:
+                scope_teachers, scope_classes = self.repair_scope
+                qualified = teacher in scope_teachers or class_id in scope_classes
+            if qualified:
+                fixed_teachers[(class_id, subject)].add(teacher)
+        
+        for teacher in self.teachers:
+            for class_id in self.teacher_classes.get(teacher, []):
+                for subject in self.teacher_subjects.get(teacher, []):
+                    if subject not in self.class_subjects.get(class_id, {}):
+                        continue
+                    fixed = fixed_teachers.get((class_id, subject))
+                    if fixed and teacher not in fixed:
+                        pruned[(teacher, class_id, subject)] = "fixed_assignments"
+                    elif class_id in classes and self.class_subjects[class_id][subject] == 0:
+                        pruned[(teacher, class_id, subject)] = "zero_weekly_periods"
+                    elif class_id in classes and self.subject_constraints.get(subject, (0, 1))[1] == 0:
+                        pruned[(teacher, class_id, subject)] = "zero_daily_max"
+        return pruned
+    
     def create_variables(self):
-        """Creates the boolean variables for the model."""
+        """Creates the boolean variables for the model and indexes them by entity and timeslot.
+        
+        A pruning pass first intersects the teacher, class and room availability bitsets of every
+        qualified lesson and drops lessons ruled out by other constraints, see _pruned_lessons.
+        model_info["domain_pruning"] reports the candidate variables it eliminated.
+        """
+        self._intern_entities()
+        full_model_variables = 0
+        self._build_room_pools()
+        if self.teacher_assignment:
+            self._create_teacher_assignment_vars()
+        
+        # Diagnosis keeps every variable and forbids blocked ones per group, so they can appear in a conflict
+        diagnosing = self.diagnosis_groups is not None
+        teacher_open, class_open, pool_open = self._availability_bitsets()
+        break_mask = self._slot_mask(self.break_periods)
+        pruned_lessons = {} if diagnosing else self._pruned_lessons()
+        eliminated = defaultdict(int)
+        
         for teacher in self.teachers:
+            t = self.teacher_index.ids[teacher]
             teacher_subjects = self.teacher_subjects.get(teacher, [])
             teacher_classes = self.teacher_classes.get(teacher, [])
             
             for class_id in teacher_classes:
+                # In repair mode lessons outside the neighbourhood are frozen and get no free variables
+                if self.repair_scope is not None:
+                    scope_teachers, scope_classes = self.repair_scope
+                    if teacher not in scope_teachers and class_id not in scope_classes:
+                        continue
+                c = self.class_index.add(class_id)
+                
                 for subject in teacher_subjects:
                     if subject in self.class_subjects.get(class_id, {}):
+                        s = self.subject_index.ids[subject]
                         suitable_rooms = self.room_suitability.get(subject, self.rooms)
-                        for day, period in self.timeslots:
-                            # Skip if this is a break period
-                            if (day, period) in self.break_periods:
-                                continue
-                            
-                            # Skip if teacher is unavailable at this time
-                            if teacher in self.teacher_unavailability and (day, period) in self.teacher_unavailability.get(teacher, []):
-                                continue
-                                
+                        # Two-stage mode leaves the room open (-1) and assigns it after solving
+                        if self.solve_mode == "two_stage":
+                            suitable_pools = [-1]
+                            room_open = 0
                             for room in suitable_rooms:
-                                self.schedule_vars[(teacher, class_id, subject, day, period, room)] = self.model.NewBoolVar(
-                                    f"schedule_{teacher}_{class_id}_{subject}_{day}_{period}_{room}"
-                                )
+                                room_open |= pool_open[self.room_index.ids[self.room_pool_of[room]]]
+                        else:
+                            suitable_pools = list(dict.fromkeys(
+                                self.room_index.ids[self.room_pool_of[room]] for room in suitable_rooms
+                            ))
+                            room_open = 0
+                            for pool in suitable_pools:
+                                room_open |= pool_open[pool]
+                        
+                        # Teacher, class and room availability intersected in one bitset
+                        candidate_slots = teacher_open[teacher] & class_open[class_id]
+                        full_model_variables += bin(candidate_slots).count("1") * len(suitable_rooms)
+                        eliminated["break_periods"] += bin(break_mask).count("1") * len(suitable_pools)
+                        eliminated["teacher_unavailability"] += (
+                            bin(class_open[class_id] & ~candidate_slots).count("1") * len(suitable_pools)
+                        )
+                        eliminated["no_suitable_rooms"] += bin(candidate_slots & ~room_open).count("1")
+                        candidate_slots &= room_open
+                        reason = pruned_lessons.get((teacher, class_id, subject))
+                        if reason is not None:
+                            eliminated[reason] += bin(candidate_slots).count("1") * len(suitable_pools)
+                            continue
+                        if diagnosing:
+                            candidate_slots = (1 << len(self.timeslots)) - 1
+                        
+                        # Teachers pruned by the assignment layer get no time variables
+                        if self.teacher_assignment and (t, c, s) not in self.teacher_assignment_vars:
+                            continue
+                        
+                        while candidate_slots:
+                            lowest = candidate_slots & -candidate_slots
+                            candidate_slots ^= lowest
+                            slot = lowest.bit_length() - 1
+                            day, period = self.timeslots[slot]
+                            blocked = None
+                            if diagnosing:
+                                if break_mask & lowest:
+                                    blocked = ("break_periods",)
+                                elif not teacher_open[teacher] & lowest:
+                                    blocked = ("teacher_availability", teacher)
+                            
+                            for pool in suitable_pools:
+                                name = ""
+                                if self.debug_names:
+                                    room = f"_{self.room_index.names[pool]}" if pool >= 0 else ""
+                                    name = f"schedule_{teacher}_{class_id}_{subject}_{day}_{period}{room}"
+                                var = self.model.NewBoolVar(name)
+                                self._add_schedule_var(t, c, s, slot, pool, var)
+                                if blocked is not None:
+                                    self.blocked_vars[blocked].append(var)
+        
+        # Frozen lessons become variables fixed to 1, so every constraint still counts them
+        for teacher, class_id, subject, day, period, room in self.frozen_lessons:
+            pool = -1 if self.solve_mode == "two_stage" else self.room_index.ids[self.room_pool_of[room]]
+            name = f"frozen_{teacher}_{class_id}_{subject}_{day}_{period}" if self.debug_names else ""
+            var = self.model.NewBoolVar(name)
+            self.model.Add(var == 1)
+            self._add_schedule_var(
+                self.teacher_index.ids[teacher], self.class_index.add(class_id), self.subject_index.add(subject),
+                self.slot_index.ids[(day, period)], pool, var
+            )
+        self._create_aggregate_vars()
+        
+        self.model_info.update({
+            "room_pools": len(self.room_pools),
+            "variables": len(self.schedule_vars),
+            "full_model_variables": full_model_variables,
+            "variables_saved": full_model_variables - len(self.schedule_vars),
+            "domain_pruning": {
+                "eliminated_variables": sum(eliminated.values()),
+                "by_reason": {reason: count for reason, count in eliminated.items() if count}
+            }
+        })
     
-    def apply_constraints(self):
-        # 1. Each teacher can only teach one class at a time
+    def _teacher_available_slots(self, teacher):
+        """Number of non-break timeslots in which the teacher is available."""
+        break_slots = set(self.break_periods)
+        unavailable_slots = set(self.teacher_unavailability.get(teacher, [])) - break_slots
+        return len(self.timeslots) - len(break_slots) - len(unavailable_slots)
+    
+    def _prune_teacher_candidates(self):
+        """Return {(class_id, subject_id): [teacher_ids]} of teachers that could teach all of its lessons.
+        
+        A fixed assignment leaves a single candidate. A teacher is dropped for a (class, subject) if
+        its weekly periods would push the teacher over their available slots on top of the load the
+        teacher is already committed to (pairs where they are the only remaining candidate). Pruning
+        repeats until nothing changes, since every removal can commit other teachers.
+        """
+        candidates = defaultdict(list)
         for teacher in self.teachers:
-            for day, period in self.timeslots:
-                # Skip break periods
-                if (day, period) in self.break_periods:
-                    continue
-                    
-                teacher_slots = []
-                for class_id in self.teacher_classes.get(teacher, []):
-                    for subject in self.teacher_subjects.get(teacher, []):
-                        for room in self.room_suitability.get(subject, self.rooms):
-                            if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                teacher_slots.append(self.schedule_vars[(teacher, class_id, subject, day, period, room)])
-                
-                if teacher_slots:
-                    self.model.Add(sum(teacher_slots) <= 1)
+            for class_id in self.teacher_classes.get(teacher, []):
+                for subject in self.teacher_subjects.get(teacher, []):
+                    if self.class_subjects.get(class_id, {}).get(subject, 0) > 0:
+                        candidates[(class_id, subject)].append(teacher)
         
-        # 2. Each class can only have one subject at a time
-        for class_id in self.classes:
-            for day, period in self.timeslots:
-                # Skip break periods
-                if (day, period) in self.break_periods:
+        for teacher, class_id, subject in self.fixed_assignments:
+            if teacher in candidates.get((class_id, subject), []):
+                candidates[(class_id, subject)] = [teacher]
+        
+        capacity = {teacher: self._teacher_available_slots(teacher) for teacher in self.teachers}
+        changed = True
+        while changed:
+            changed = False
+            committed = defaultdict(int)
+            for (class_id, subject), teachers in candidates.items():
+                if len(teachers) == 1:
+                    committed[teachers[0]] += self.class_subjects[class_id][subject]
+            
+            for (class_id, subject), teachers in candidates.items():
+                if len(teachers) <= 1:
                     continue
-                    
-                class_slots = []
-                for teacher in self.teachers:
-                    for subject in self.teacher_subjects.get(teacher, []):
-                        for room in self.room_suitability.get(subject, self.rooms):
-                            if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                class_slots.append(self.schedule_vars[(teacher, class_id, subject, day, period, room)])
-                
-                if class_slots:
-                    self.model.Add(sum(class_slots) <= 1)
+                weekly_periods = self.class_subjects[class_id][subject]
+                feasible = [t for t in teachers if committed[t] + weekly_periods <= capacity[t]]
+                # Keep the original list if nobody fits, so the infeasibility surfaces in the model
+                if feasible and len(feasible) < len(teachers):
+                    candidates[(class_id, subject)] = feasible
+                    changed = True
+        
+        return dict(candidates)
+    
+    def _create_teacher_assignment_vars(self):
+        """Create one teacher choice per (class, subject) from the pruned candidate lists."""
+        self.teacher_candidates = self._prune_teacher_candidates()
+        for (class_id, subject), teachers in self.teacher_candidates.items():
+            choice_vars = []
+            c, s = self.class_index.add(class_id), self.subject_index.add(subject)
+            for teacher in teachers:
+                var = self.model.NewBoolVar(f"assign_{teacher}_{class_id}_{subject}" if self.debug_names else "")
+                self.teacher_assignment_vars[(self.teacher_index.ids[teacher], c, s)] = var
+                choice_vars.append(var)
+            self.model.AddExactlyOne(choice_vars)
+        
+        all_candidates = sum(
+            1 for teacher in self.teachers
+            for class_id in self.teacher_classes.get(teacher, [])
+            for subject in self.teacher_subjects.get(teacher, [])
+            if self.class_subjects.get(class_id, {}).get(subject, 0) > 0
+        )
+        self.model_info["pruned_teacher_candidates"] = all_candidates - len(self.teacher_assignment_vars)
+    
+    def _build_room_pools(self):
+        """Group rooms whose suitability signature (the set of subjects they can host) is identical.
+        
+        Rooms in one pool are interchangeable, so the model only decides how many of them are used in
+        each timeslot and concrete rooms are picked when the solution is extracted.
+        """
+        self.room_pools = {}
+        self.room_pool_of = {}
+        self.equivalent_pools = {}
+        signatures = defaultdict(set)
+        for subject in set(self.subjects) | set(self.room_suitability):
+            for room in self.room_suitability.get(subject, self.rooms):
+                signatures[room].add(subject)
         
-        # 3. Each room can only host one class at a time
+        pool_by_signature = {}
         for room in self.rooms:
-            for day, period in self.timeslots:
-                # Skip break periods
-                if (day, period) in self.break_periods:
-                    continue
-                    
-                room_slots = []
-                for teacher in self.teachers:
-                    for class_id in self.classes:
-                        for subject in self.teacher_subjects.get(teacher, []):
-                            if room in self.room_suitability.get(subject, self.rooms):
-                                if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                    room_slots.append(self.schedule_vars[(teacher, class_id, subject, day, period, room)])
-                
-                if room_slots:
-                    self.model.Add(sum(room_slots) <= 1)
+            if self.room_pooling:
+                pool = pool_by_signature.setdefault(frozenset(signatures[room]), room)
+            else:
+                pool = room
+            self.room_pools.setdefault(pool, []).append(room)
+            self.room_pool_of[room] = pool
+        
+        # Without pooling, rooms of one signature are still interchangeable and symmetry breaking
+        # orders them. Repairs keep frozen lessons in their rooms and diagnosis relaxes single
+        # rooms, so both leave the order out.
+        if self.symmetry_breaking and self.repair_scope is None and self.diagnosis_groups is None:
+            equivalent = defaultdict(list)
+            for pool in self.room_pools:
+                equivalent[frozenset(signatures[pool])].append(pool)
+            for pools in equivalent.values():
+                if len(pools) > 1:
+                    for pool in pools:
+                        self.equivalent_pools[pool] = pools
+    
+    def _add_schedule_var(self, t, c, s, slot, pool, var):
+        """Register a schedule variable by entity ids in its columns and every index the constraints read from."""
+        self.schedule_vars.append(var)
+        self.var_teacher.append(t)
+        self.var_class.append(c)
+        self.var_subject.append(s)
+        self.var_slot.append(slot)
+        self.var_pool.append(pool)
+        self.teacher_slot_vars[(t, slot)].append(var)
+        self.class_slot_vars[(c, slot)].append(var)
+        if pool >= 0:
+            self.room_slot_vars[(pool, slot)].append(var)
+        self.subject_slot_vars[(s, slot)].append(var)
+        self.class_subject_vars[(c, s)].append(var)
+        self.lesson_vars[(t, c, s, slot)].append(var)
+    
+    def _create_aggregate_vars(self):
+        """Create the shared aggregates the constraint blocks are written against.
+        
+        A lesson aggregate says a teacher teaches a class and subject in a slot, in whichever room;
+        a taught aggregate says a class has a subject in a slot, with whichever teacher. Each is
+        linked to the variables below it by one equality, so later blocks never repeat those sums.
+        Clash constraints stay on the schedule variables, where at-most-one cliques are strongest,
+        and so does the weekly requirement: presolve turns the links into exactly-one constraints the
+        default LP leaves out, and the weekly sums keep rooms and lessons together in the LP bound.
+        """
+        for (t, c, s, slot), room_vars in self.lesson_vars.items():
+            self._add_lesson_slot_var(t, c, s, slot, self._aggregate_var(room_vars, "lesson", (t, c, s, slot)))
+        for (c, s, slot), lesson_vars in self.class_subject_slot_vars.items():
+            self._add_taught_var(c, s, slot, self._aggregate_var(lesson_vars, "taught", (c, s, slot)))
+        self.model_info["aggregate_variables"] = (
+            sum(len(parts) > 1 for parts in self.lesson_vars.values())
+            + sum(len(parts) > 1 for parts in self.class_subject_slot_vars.values())
+        )
+    
+    def _aggregate_var(self, parts, kind, key):
+        """Return a variable equal to the sum of the boolean parts; a single part is reused as is.
+        
+        key holds the entity ids the aggregate stands for and only names it in debug_names mode.
+        """
+        if len(parts) == 1:
+            return parts[0]
+        name = ""
+        if self.debug_names:
+            *ids, slot = key
+            interners = (self.teacher_index, self.class_index, self.subject_index)[-len(ids):]
+            names = [interner.names[i] for interner, i in zip(interners, ids)]
+            name = "_".join([kind, *names, *self.slot_index.names[slot]])
+        var = self.model.NewBoolVar(name)
+        self.model.Add(sum(parts) == var)
+        return var
+    
+    def _add_lesson_slot_var(self, t, c, s, slot, var):
+        """Register the lesson aggregate of (teacher, class, subject, slot) in the indexes built on it."""
+        self.lesson_slot_vars[(t, c, s, slot)] = var
+        self.assignment_vars[(t, c, s)].append(var)
+        self.class_subject_slot_vars[(c, s, slot)].append(var)
+        self.teacher_lesson_vars[(t, slot)].append(var)
+    
+    def _add_taught_var(self, c, s, slot, var):
+        """Register the taught aggregate of (class, subject, slot) in the indexes built on it."""
+        self.taught_vars[(c, s, slot)] = var
+        self.class_subject_day_vars[(c, s, slot // len(self.periods))].append(var)
+    
+    def _enforce(self, constraint, group):
+        """In diagnosis mode, make constraint conditional on the assumption literal of its group.
+        
+        group is a key such as ("teacher_clash", teacher_id); see _diagnosis_issue for all groups.
+        Outside diagnosis the constraint is left unconditional.
+        """
+        if self.diagnosis_groups is None:
+            return constraint
+        literal = self.diagnosis_groups.get(group)
+        if literal is None:
+            literal = self.model.NewBoolVar("assume_" + "_".join(str(part) for part in group))
+            self.diagnosis_groups[group] = literal
+        return constraint.OnlyEnforceIf(literal)
+    
+    def apply_constraints(self):
+        # 0. Diagnosis only: lessons in break periods and unavailable timeslots are forbidden per group
+        for group, blocked in self.blocked_vars.items():
+            self._enforce(self.model.Add(sum(blocked) == 0), group)
+        
+        # 1. Each teacher can only teach one class at a time
+        for (t, _), teacher_slots in self.teacher_slot_vars.items():
+            self._enforce(self.model.AddAtMostOne(teacher_slots), ("teacher_clash", self.teacher_index.names[t]))
+        
+        # 2. Each class can only have one subject at a time
+        for (c, _), class_slots in self.class_slot_vars.items():
+            self._enforce(self.model.AddAtMostOne(class_slots), ("class_clash", self.class_index.names[c]))
+        
+        # 3. Each room can only host one class at a time (a pool hosts at most one class per room)
+        for (pool_id, _), room_slots in self.room_slot_vars.items():
+            pool = self.room_index.names[pool_id]
+            capacity = len(self.room_pools[pool])
+            if capacity == 1:
+                self._enforce(self.model.AddAtMostOne(room_slots), ("room_capacity", pool))
+            elif len(room_slots) > capacity:
+                self._enforce(self.model.Add(sum(room_slots) <= capacity), ("room_capacity", pool))
+        
+        if self.symmetry_breaking:
+            self._apply_room_symmetry_breaking()
+        
+        # In two-stage mode rooms are matched after solving, so only bound lessons per slot by room supply
+        if self.solve_mode == "two_stage":
+            self._apply_room_capacity_constraints()
         
         # 4. Each class must receive its required lessons for each subject
         for class_id in self.classes:
+            c = self.class_index.ids[class_id]
             for subject, weekly_periods in self.class_subjects.get(class_id, {}).items():
-                subject_slots = []
-                for teacher in self.teachers:
-                    if class_id in self.teacher_classes.get(teacher, []) and subject in self.teacher_subjects.get(teacher, []):
-                        for day, period in self.timeslots:
-                            # Skip break periods
-                            if (day, period) in self.break_periods:
-                                continue
-                                
-                            for room in self.room_suitability.get(subject, self.rooms):
-                                if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                    subject_slots.append(self.schedule_vars[(teacher, class_id, subject, day, period, room)])
-                
+                subject_slots = self.class_subject_vars.get((c, self.subject_index.ids[subject]))
                 if subject_slots:
-                    self.model.Add(sum(subject_slots) == weekly_periods)
+                    self._enforce(
+                        self.model.Add(sum(subject_slots) == weekly_periods),
+                        ("weekly_requirement", class_id, subject)
+                    )
         
         # 5. Min/max daily periods per subject for each class
+        minimum_days = self._daily_minimum_days()
         for class_id in self.classes:
+            c = self.class_index.ids[class_id]
             for subject, (min_daily, max_daily) in self.subject_constraints.items():
                 if subject in self.class_subjects.get(class_id, {}):
-                    for day in self.days:
-                        day_slots = []
-                        for teacher in self.teachers:
-                            if class_id in self.teacher_classes.get(teacher, []) and subject in self.teacher_subjects.get(teacher, []):
-                                for period in self.periods:
-                                    # Skip break periods
-                                    if (day, period) in self.break_periods:
-                                        continue
-                                        
-                                    for room in self.room_suitability.get(subject, self.rooms):
-                                        if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                            day_slots.append(self.schedule_vars[(teacher, class_id, subject, day, period, room)])
-                        
+                    s = self.subject_index.ids[subject]
+                    group = ("daily_limits", class_id, subject)
+                    for d in range(len(self.days)):
+                        day_slots = self.class_subject_day_vars.get((c, s, d))
                         if day_slots:
                             if min_daily > 0:
-                                self.model.Add(sum(day_slots) >= min_daily)
-                            self.model.Add(sum(day_slots) <= max_daily)
+                                self._enforce(self.model.Add(sum(day_slots) >= min_daily), group)
+                            self._enforce(self.model.Add(sum(day_slots) <= max_daily), group)
+                        elif min_daily > 0 and d in minimum_days[(class_id, subject)]:
+                            # Pruning left no lesson on a day that needs one, e.g. the fixed teacher is away
+                            self._enforce(self.model.AddBoolOr([]), group)
         
         # 6. Apply fixed assignments
         for teacher, class_id, subject in self.fixed_assignments:
             if subject in self.class_subjects.get(class_id, {}) and teacher in self.teachers:
                 weekly_periods = self.class_subjects[class_id][subject]
-                assignment_slots = []
-                for day, period in self.timeslots:
-                    # Skip break periods
-                    if (day, period) in self.break_periods:
-                        continue
-                        
-                    for room in self.room_suitability.get(subject, self.rooms):
-                        if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                            assignment_slots.append(self.schedule_vars[(teacher, class_id, subject, day, period, room)])
-                
+                assignment_slots = self.assignment_vars.get((
+                    self.teacher_index.ids[teacher], self.class_index.ids.get(class_id), self.subject_index.ids[subject]
+                ))
                 if assignment_slots:
-                    self.model.Add(sum(assignment_slots) == weekly_periods)
+                    self._enforce(
+                        self.model.Add(sum(assignment_slots) == weekly_periods),
+                        ("fixed_assignment", teacher, class_id, subject)
+                    )
+        
+        # 6b. Link the teacher choice of each (class, subject) to its time variables
+        if self.teacher_assignment:
+            teacher_load = defaultdict(list)
+            for (t, c, s), choice_var in self.teacher_assignment_vars.items():
+                weekly_periods = self.class_subjects[self.class_index.names[c]][self.subject_index.names[s]]
+                lesson_slots = self.assignment_vars.get((t, c, s), [])
+                # The chosen teacher teaches every lesson, the others none
+                self.model.Add(sum(lesson_slots) == weekly_periods * choice_var)
+                teacher_load[self.teacher_index.names[t]].append(weekly_periods * choice_var)
+            
+            for teacher, load in teacher_load.items():
+                self._enforce(
+                    self.model.Add(sum(load) <= self._teacher_available_slots(teacher)),
+                    ("teacher_availability", teacher)
+                )
         
-        # 7. Consecutive periods for certain subjects
+        # 7. Consecutive periods: every class with a consecutive subject gets at least one block of
+        # min_consecutive adjacent periods on some day, built on the shared taught aggregates
+        n_periods = len(self.periods)
         for subject, min_consecutive in self.consecutive_periods.items():
-            if min_consecutive <= 1:
+            if min_consecutive <= 1 or subject not in self.subject_index.ids:
                 continue  # No need for special constraints
-                
+            s = self.subject_index.ids[subject]
+            
             for class_id in self.classes:
-                if subject not in self.class_subjects.get(class_id, {}):
+                if self.class_subjects.get(class_id, {}).get(subject, 0) <= 0:
                     continue
-                    
-                for day in self.days:
-                    valid_periods = [p for p in self.periods if (day, p) not in self.break_periods]
-                    valid_periods.sort()  # Ensure periods are in order
-                    
-                    # For each possible starting period for a consecutive block
-                    for start_idx in range(len(valid_periods) - min_consecutive + 1):
-                        consecutive_block = valid_periods[start_idx:start_idx + min_consecutive]
-                        
-                        # For all teachers who can teach this subject to this class
-                        for teacher in self.teachers:
-                            if class_id not in self.teacher_classes.get(teacher, []):
-                                continue
-                            if subject not in self.teacher_subjects.get(teacher, []):
-                                continue
-                                
-                            # Create variables to track if a block starts at this period
-                            block_start_var = self.model.NewBoolVar(f"block_start_{teacher}_{class_id}_{subject}_{day}_{consecutive_block[0]}")
-                            
-                            # Calculate the variables for all periods in this potential block
-                            block_period_vars = []
-                            for period in consecutive_block:
-                                period_vars = []
-                                for room in self.room_suitability.get(subject, self.rooms):
-                                    if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                        period_vars.append(self.schedule_vars[(teacher, class_id, subject, day, period, room)])
-                                
-                                # If there are no variables for this period, we can't form a block here
-                                if not period_vars:
-                                    block_period_vars = []
-                                    break
-                                    
-                                # We sum here because we might have multiple rooms, but at most one will be chosen
-                                period_var_sum = sum(period_vars)
-                                block_period_vars.append(period_var_sum)
-                            
-                            # If we can form a block, add the constraint
-                            if block_period_vars:
-                                # If block_start_var is true, all periods in the block must be scheduled
-                                for period_var in block_period_vars:
-                                    self.model.Add(period_var >= block_start_var)
-                                    
-                                # Ensure minimum consecutive periods
-                                self.model.Add(sum(block_period_vars) >= min_consecutive * block_start_var)
+                c = self.class_index.ids[class_id]
+                
+                block_starts = []
+                for d in range(len(self.days)):
+                    day_slots = range(d * n_periods, (d + 1) * n_periods)
+                    for start in range(n_periods - min_consecutive + 1):
+                        block = day_slots[start:start + min_consecutive]
+                        # A block needs a possible lesson in each of its periods, breaks included
+                        if not all((c, s, slot) in self.taught_vars for slot in block):
+                            continue
+                        block_start = self.model.NewBoolVar(
+                            f"block_start_{class_id}_{subject}_{self.days[d]}_{self.periods[start]}" if self.debug_names else ""
+                        )
+                        for slot in block:
+                            self.model.AddImplication(block_start, self.taught_vars[(c, s, slot)])
+                        block_starts.append(block_start)
+                
+                # No possible block at all makes the model infeasible, as it should
+                self._enforce(self.model.AddBoolOr(block_starts), ("consecutive_rule", class_id, subject))
+        
+    def apply_soft_constraints(self):
+        """Add the objective terms; these never change the set of feasible timetables."""
+        objective_vars, objective_coeffs = self.objective_vars, self.objective_coeffs
         
         # 8. Balance teacher workload across good and poor classes (soft constraint)
+        for (teacher, class_id), penalty in self._ranking_penalties().items():
+            # The penalty applies per lesson, so one count per (teacher, class, subject) carries it
+            for subject in self.teacher_subjects.get(teacher, []):
+                assignment_key = (
+                    self.teacher_index.ids[teacher], self.class_index.ids.get(class_id), self.subject_index.ids[subject]
+                )
+                if assignment_key in self.assignment_vars:
+                    objective_vars.append(self._assignment_count_var(assignment_key))
+                    objective_coeffs.append(penalty)
+        
+        # 9. Teacher preferences for timeslots (soft constraint)
+        for teacher, preferences in self.teacher_preferences.items():
+            t = self.teacher_index.ids.get(teacher)
+            for timeslot, preference_score in preferences.items():
+                # Apply preference as a reward (negative penalty); break periods have no variables
+                lessons = self.teacher_lesson_vars.get((t, self.slot_index.ids.get(timeslot)), [])
+                objective_vars.extend(lessons)
+                # Preference score is a reward, so we negate it for the minimization objective
+                objective_coeffs.extend([-preference_score] * len(lessons))
+        
+        # 10. Keep a repaired timetable close to the previous solution (soft constraint)
+        if self.repair_scope is not None:
+            for position in self._hinted_positions():
+                objective_vars.append(self.schedule_vars[position])
+                objective_coeffs.append(-REPAIR_KEEP_REWARD)
+    
+    def _apply_room_symmetry_breaking(self):
+        """Use equivalent rooms in room order: no room hosts more lessons a week than the one before it.
+        
+        Rooms with the same suitability can swap their whole timetables without changing anything
+        else, so this keeps one of every such permutation. With room pooling every pool already
+        stands for all of its equivalent rooms and model_info reports 0 orderings.
+        """
+        groups = {id(pools): pools for pools in self.equivalent_pools.values()}.values()
+        orderings = 0
+        for pools in groups:
+            used = [
+                [var for slot in range(len(self.timeslots)) for var in self.room_slot_vars.get((self.room_index.ids[pool], slot), [])]
+                for pool in pools
+            ]
+            for earlier, later in zip(used, used[1:]):
+                if later:
+                    self.model.Add(sum(later) <= sum(earlier))
+                    orderings += 1
+        self.model_info["symmetry_breaking"] = {"room_orderings": orderings}
+    
+    def _ranking_penalties(self):
+        """Return {(teacher_id, class_id): penalty per lesson} for teachers with several classes.
+        
+        The penalty grows with the distance of the class's ranking from the average ranking of the
+        teacher's classes; pairs without a penalty are left out.
+        """
+        penalties = {}
         for teacher in self.teachers:
             teacher_classes = self.teacher_classes.get(teacher, [])
             if len(teacher_classes) > 1 and teacher_classes:
@@ -267,83 +1039,388 @@ class SchoolScheduler:
                 for class_id in teacher_classes:
                     class_rank = self.class_rankings.get(class_id, 5)
                     deviation = abs(class_rank - avg_ranking)
-                    
-                    for subject in self.teacher_subjects.get(teacher, []):
-                        if subject in self.class_subjects.get(class_id, {}):
-                            for day, period in self.timeslots:
-                                # Skip break periods
-                                if (day, period) in self.break_periods:
-                                    continue
-                                    
-                                for room in self.room_suitability.get(subject, self.rooms):
-                                    if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                        penalty = int(deviation * 5)
-                                        self.objective_terms.append(
-                                            self.schedule_vars[(teacher, class_id, subject, day, period, room)] * penalty
-                                        )
+                    penalty = int(deviation * 5)
+                    if penalty:
+                        penalties[(teacher, class_id)] = penalty
+        return penalties
+    
+    def _assignment_count_var(self, assignment_key):
+        """Return a variable counting the lessons of (teacher, class, subject), linked by one constraint."""
+        lessons = self.assignment_vars[assignment_key]
+        if len(lessons) == 1:
+            return lessons[0]
+        name = ""
+        if self.debug_names:
+            t, c, s = assignment_key
+            name = f"count_{self.teacher_index.names[t]}_{self.class_index.names[c]}_{self.subject_index.names[s]}"
+        count = self.model.NewIntVar(0, len(lessons), name)
+        self.model.Add(sum(lessons) == count)
+        self.assignment_count_vars[assignment_key] = count
+        return count
+    
+    def _room_groups(self):
+        """Return {frozenset(rooms): [subject_ids]} for every subject taught in the model."""
+        groups = defaultdict(list)
+        for subject in {self.subject_index.names[s] for (s, _) in self.subject_slot_vars}:
+            groups[frozenset(self.room_suitability.get(subject, self.rooms))].append(subject)
+        return groups
+    
+    def _room_group_unions(self, groups):
+        """Return every union of the given room groups, or None if there are more than MAX_ROOM_GROUP_UNIONS."""
+        unions = set(groups)
+        frontier = set(groups)
+        while frontier:
+            if len(unions) > MAX_ROOM_GROUP_UNIONS:
+                return None
+            new_unions = set()
+            for union in frontier:
+                for group in groups:
+                    combined = union | group
+                    if combined not in unions:
+                        new_unions.add(combined)
+            unions |= new_unions
+            frontier = new_unions
+        return unions
+    
+    def _two_stage_fits(self):
+        """Whether the room groups of every requested subject stay within MAX_ROOM_GROUP_UNIONS unions.
         
-        # 9. Teacher preferences for timeslots (soft constraint)
-        for teacher, preferences in self.teacher_preferences.items():
-            for timeslot, preference_score in preferences.items():
-                day, period = timeslot
-                
-                # Skip break periods
-                if (day, period) in self.break_periods:
-                    continue
-                    
-                # Apply preference as a reward (negative penalty)
-                for class_id in self.teacher_classes.get(teacher, []):
-                    for subject in self.teacher_subjects.get(teacher, []):
-                        for room in self.room_suitability.get(subject, self.rooms):
-                            if (teacher, class_id, subject, day, period, room) in self.schedule_vars:
-                                # Preference score is a reward, so we negate it for the minimization objective
-                                self.objective_terms.append(
-                                    self.schedule_vars[(teacher, class_id, subject, day, period, room)] * -preference_score
-                                )
+        Checked before the model is built, so it covers every subject a variable could be created for.
+        """
+        subjects = {
+            subject for weekly in self.class_subjects.values() for subject, periods in weekly.items() if periods > 0
+        }
+        groups = {frozenset(self.room_suitability.get(subject, self.rooms)) for subject in subjects}
+        return self._room_group_unions(groups) is not None
+    
+    def _apply_room_capacity_constraints(self):
+        """Limit lessons per timeslot so that a room matching always exists (Hall's condition).
+        
+        For every union U of room_suitability groups, the lessons whose suitable rooms all lie in U
+        may not exceed |U| in any timeslot. Unions with at least as many rooms as classes can never
+        bind, because a class has at most one lesson per timeslot.
+        """
+        groups = self._room_groups()
+        unions = self._room_group_unions(groups)
+        if unions is None:
+            # solve() falls back to the full model before building, so this only guards direct calls
+            raise ValueError(f"More than {MAX_ROOM_GROUP_UNIONS} room group unions, use solve_mode 'full'")
+        
+        for union in unions:
+            if len(union) >= len(self.classes):
+                continue
+            union_subjects = [
+                self.subject_index.ids[subject] for group, subjects in groups.items() if group <= union for subject in subjects
+            ]
+            for slot in range(len(self.timeslots)):
+                slot_vars = []
+                for s in union_subjects:
+                    slot_vars.extend(self.subject_slot_vars.get((s, slot), []))
+                if len(slot_vars) > len(union):
+                    self._enforce(self.model.Add(sum(slot_vars) <= len(union)), ("room_supply", tuple(sorted(union))))
+    
+    def _assign_rooms(self, solution):
+        """Stage two: match every lesson in the solution to a concrete room, slot by slot.
+        
+        Returns False if some timeslot has no valid room matching.
+        """
+        slots = list(solution.keys())
+        lessons = [solution[slot] for slot in slots]
+        candidate_rooms = [
+            [self.room_suitability.get(assignment["subject"], self.rooms) for assignment in slot_lessons]
+            for slot_lessons in lessons
+        ]
+        
+        if self.room_workers > 1 and len(slots) > 1:
+            with ProcessPoolExecutor(max_workers=self.room_workers) as executor:
+                matchings = list(executor.map(match_rooms, candidate_rooms))
+        else:
+            matchings = list(map(match_rooms, candidate_rooms))
+        
+        for (day, period), slot_lessons, rooms in zip(slots, lessons, matchings):
+            if rooms is None:
+                print(f"Room assignment failed for {day} {period}")
+                return False
+            for assignment, room in zip(slot_lessons, rooms):
+                assignment["room"] = room
+        return True
+    
+    def _assign_pool_rooms(self, solution):
+        """Replace pool ids in the solution with concrete rooms, one free room of the pool per lesson.
+        
+        A lesson that also appears in the hinted solution keeps its previous room when that room
+        belongs to the chosen pool, so warm starts and repairs do not shuffle rooms needlessly.
+        """
+        previous_rooms = {
+            (teacher, class_id, subject, day, period): room
+            for teacher, class_id, subject, day, period, room in self.hint_assignments
+        }
+        for (day, period), assignments in solution.items():
+            free_rooms = {}
+            pending = []
+            for assignment in assignments:
+                pool = assignment["room"]
+                if pool not in free_rooms:
+                    free_rooms[pool] = list(reversed(self.room_pools[pool]))
+                previous_room = previous_rooms.get(
+                    (assignment["teacher"], assignment["class"], assignment["subject"], day, period)
+                )
+                if previous_room in free_rooms[pool]:
+                    free_rooms[pool].remove(previous_room)
+                    assignment["room"] = previous_room
+                else:
+                    pending.append(assignment)
+            for assignment in pending:
+                assignment["room"] = free_rooms[assignment["room"]].pop()
     
     def _set_objective(self):
         """Set the objective function for the model."""
-        if self.objective_terms:
-            self.model.Minimize(sum(self.objective_terms))
+        if self.objective_vars or self.objective_offset:
+            self.model.Minimize(
+                cp_model.LinearExpr.WeightedSum(self.objective_vars, self.objective_coeffs) + self.objective_offset
+            )
+    
+    def _create_solver(self):
+        """Create a CpSolver configured from self.solver_params."""
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.solver_params["max_time_in_seconds"]
+        solver.parameters.num_workers = self.solver_params["num_workers"]
+        if self.solver_params["random_seed"] is not None:
+            solver.parameters.random_seed = self.solver_params["random_seed"]
+        if self.solver_params["relative_gap_limit"] is not None:
+            solver.parameters.relative_gap_limit = self.solver_params["relative_gap_limit"]
+        if self.solver_params["log_to_response"]:
+            self.solver_log = []
+            solver.parameters.log_search_progress = True
+            solver.parameters.log_to_stdout = False
+            solver.log_callback = self.solver_log.append
+        return solver
+    
+    def _solve_portfolio(self):
+        """Solve with the portfolio and return (status, value function) like a single CpSolver run."""
+        winner, members = solve_portfolio(
+            self.model, self.solver_params, self.portfolio,
+            hinted=bool(self.hint_assignments), cancel_event=self.cancel_event
+        )
+        self.portfolio_info = {
+            "result": self.portfolio["result"],
+            "winner": winner["name"] if winner else None,
+            "members": members
+        }
+        if winner is None:
+            statuses = {member["status"] for member in members}
+            return (cp_model.INFEASIBLE if "INFEASIBLE" in statuses else cp_model.UNKNOWN), None
+        
+        self.first_solution_seconds = winner["first_solution_seconds"]
+        self.solve_stats = {
+            "status": winner["status"],
+            "objective": winner["objective"],
+            "best_bound": winner["bound"],
+            "solutions": None,
+            "conflicts": winner["conflicts"],
+            "branches": winner["branches"],
+            "wall_time": winner["wall_time"]
+        }
+        values = winner["values"]
+        status = cp_model.OPTIMAL if winner["status"] == "OPTIMAL" else cp_model.FEASIBLE
+        return status, lambda var: values[var.Index()]
+    
+    def _solve_cancellable(self, solver, callback):
+        """Run solver.Solve while a watcher thread stops the search once cancel_event is set."""
+        finished = threading.Event()
+        
+        def watch():
+            while not finished.is_set():
+                if self.cancel_event.wait(0.2):
+                    print("Solve cancelled, keeping the best solution so far")
+                    solver.StopSearch()
+                    return
+        
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            return solver.Solve(self.model, callback)
+        finally:
+            finished.set()
+            watcher.join()
+    
+    def _load_cached_model(self, cache_key):
+        """Restore variables and hard constraints from the model cache. Returns True on a hit."""
+        compiled = self.model_cache.get(cache_key)
+        if compiled is None:
+            return False
+        
+        self.model = compiled.model.Clone()
+        # Entity ids and pools must match the cached columns; input order may differ between equal
+        # inputs, and pools are named after their first room in input order
+        (self.teacher_index, self.class_index, self.subject_index,
+         self.room_index, self.slot_index) = compiled.interners
+        self.room_pools, self.room_pool_of, self.equivalent_pools = compiled.room_pools
+        t_col, c_col, s_col, slot_col, pool_col = compiled.var_columns
+        for position, index in enumerate(compiled.var_indexes):
+            self._add_schedule_var(
+                t_col[position], c_col[position], s_col[position], slot_col[position], pool_col[position],
+                self.model.GetBoolVarFromProtoIndex(index)
+            )
+        for (t, c, s, slot), index in compiled.lesson_var_indexes:
+            self._add_lesson_slot_var(t, c, s, slot, self.model.GetBoolVarFromProtoIndex(index))
+        for (c, s, slot), index in compiled.taught_var_indexes:
+            self._add_taught_var(c, s, slot, self.model.GetBoolVarFromProtoIndex(index))
+        for assignment_key, index in compiled.assignment_var_indexes:
+            self.teacher_assignment_vars[assignment_key] = self.model.GetBoolVarFromProtoIndex(index)
+        self.teacher_candidates = compiled.teacher_candidates
+        self.model_info.update(compiled.model_info)
+        self.model_info["model_cache"] = {"hit": True, "build_seconds": compiled.build_seconds}
+        return True
+    
+    def _store_cached_model(self, cache_key, build_seconds):
+        """Put a copy of the current hard-constraint model into the model cache."""
+        self.model_cache.put(cache_key, CompiledModel(
+            model=self.model.Clone(),
+            interners=(self.teacher_index, self.class_index, self.subject_index, self.room_index, self.slot_index),
+            room_pools=(self.room_pools, self.room_pool_of, self.equivalent_pools),
+            var_columns=tuple(array("i", column) for column in (
+                self.var_teacher, self.var_class, self.var_subject, self.var_slot, self.var_pool
+            )),
+            var_indexes=array("i", (var.Index() for var in self.schedule_vars)),
+            lesson_var_indexes=[(key, var.Index()) for key, var in self.lesson_slot_vars.items()],
+            taught_var_indexes=[(key, var.Index()) for key, var in self.taught_vars.items()],
+            assignment_var_indexes=[(key, var.Index()) for key, var in self.teacher_assignment_vars.items()],
+            teacher_candidates=self.teacher_candidates,
+            model_info=dict(self.model_info),
+            build_seconds=build_seconds
+        ))
+        self.model_info["model_cache"] = {"hit": False, "build_seconds": build_seconds}
     
     def solve(self):
         """Solve the model and return the schedule."""
-        print("Creating variables...")
-        self.create_variables()
+        self._reset_model()
+        self.phase_seconds = {}
+        self.solve_stats = None
         
-        print("Applying constraints...")
-        self.apply_constraints()
+        # Too many room groups for the capacity constraints: a truncated set could leave a timetable
+        # without a room matching, so the rooms go back into the model instead
+        if self.solve_mode == "two_stage" and not self._two_stage_fits():
+            print(f"More than {MAX_ROOM_GROUP_UNIONS} room group unions, falling back to the full model...")
+            self.solve_mode = "full"
+            self.two_stage_fallback = True
+        if self.two_stage_fallback:
+            self.model_info.update({"solve_mode": "full", "two_stage_fallback": "room_group_unions"})
+        
+        # Repairs freeze lessons into the model, so only full grid solves share compiled models
+        cache_key = None
+        if self.model_cache is not None and self.repair_scope is None and self.interval_model is None:
+            cache_key = hard_model_key(self)
+        
+        build_start = time.perf_counter()
+        cache_hit = False
+        if cache_key is not None:
+            with timed_phase(self.phase_seconds, "model_cache_load"):
+                cache_hit = self._load_cached_model(cache_key)
+        if cache_hit:
+            print("Loaded variables and constraints from the model cache...")
+            load_seconds = time.perf_counter() - build_start
+            self.model_info["model_cache"]["saved_seconds"] = round(
+                max(self.model_info["model_cache"]["build_seconds"] - load_seconds, 0.0), 4
+            )
+        else:
+            # The interval engine replaces the grid's variables and constraints, see interval_engine.py
+            engine = self.interval_model or self
+            print("Creating variables...")
+            with timed_phase(self.phase_seconds, "create_variables"):
+                engine.create_variables()
+            
+            print("Applying constraints...")
+            with timed_phase(self.phase_seconds, "apply_constraints"):
+                engine.apply_constraints()
+            
+            if cache_key is not None:
+                self._store_cached_model(cache_key, round(time.perf_counter() - build_start, 4))
         
         print("Setting objective...")
-        self._set_objective()
+        with timed_phase(self.phase_seconds, "soft_constraints"):
+            (self.interval_model or self).apply_soft_constraints()
+            self._set_objective()
         
-        print("Solving...")
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 60.0
-        status = solver.Solve(self.model)
+        # Warm starts hint the grid's schedule variables; the interval engine solves without them
+        if self.hint_assignments and self.interval_model is None:
+            print("Applying solution hint...")
+            with timed_phase(self.phase_seconds, "hint"):
+                self._apply_solution_hint()
+        
+        if self.portfolio is not None:
+            print(f"Solving with a portfolio of {len(self.portfolio['members'])} members...")
+            with timed_phase(self.phase_seconds, "solve"):
+                status, value = self._solve_portfolio()
+        else:
+            print("Solving...")
+            solver = self._create_solver()
+            if self.hint_assignments:
+                # Symmetry detection in presolve can stall for the whole time limit on a complete hint
+                solver.parameters.symmetry_level = 0
+            if self.solution_listener is not None:
+                timer = SolutionStreamer(self._scheduled_lessons, self.solution_listener)
+            else:
+                timer = FirstSolutionTimer()
+            with timed_phase(self.phase_seconds, "solve"):
+                if self.cancel_event is not None:
+                    status = self._solve_cancellable(solver, timer)
+                else:
+                    status = solver.Solve(self.model, timer)
+            self.first_solution_seconds = timer.first_solution_seconds
+            value = solver.Value
+            feasible = status == cp_model.OPTIMAL or status == cp_model.FEASIBLE
+            self.solve_stats = {
+                "status": solver.StatusName(status),
+                "objective": solver.ObjectiveValue() if feasible else None,
+                "best_bound": solver.BestObjectiveBound() if feasible else None,
+                "solutions": timer.solution_count,
+                "conflicts": solver.NumConflicts(),
+                "branches": solver.NumBranches(),
+                "wall_time": round(solver.WallTime(), 4),
+                "user_time": round(solver.UserTime(), 4),
+                "deterministic_time": round(solver.ResponseProto().deterministic_time, 4)
+            }
+        if self.hint_info is not None:
+            self.hint_info["first_solution_seconds"] = self.first_solution_seconds
+            previous = self.hint_info["previous_first_solution_seconds"]
+            if previous and self.first_solution_seconds:
+                self.hint_info["first_solution_speedup"] = round(previous / self.first_solution_seconds, 2)
         
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
             print(f"Solution found! (status: {'OPTIMAL' if status == cp_model.OPTIMAL else 'FEASIBLE'})")
             
             # Create solution dictionary
-            solution = defaultdict(list)
-            for var_key, var in self.schedule_vars.items():
-                if solver.Value(var) == 1:
-                    teacher, class_id, subject, day, period, room = var_key
+            with timed_phase(self.phase_seconds, "extraction"):
+                # Entity ids are translated back to names only for the scheduled lessons
+                solution = defaultdict(list)
+                for teacher, class_id, subject, day, period, pool in self._scheduled_lessons(value):
                     solution[(day, period)].append({
                         "teacher": teacher,
                         "class": class_id,
                         "subject": subject,
-                        "room": room
+                        "room": pool
                     })
             
+            # Stage two of the two-stage mode: rooms were left open by the solver
+            with timed_phase(self.phase_seconds, "room_assignment"):
+                if self.solve_mode == "two_stage":
+                    rooms_assigned = self._assign_rooms(solution)
+                else:
+                    self._assign_pool_rooms(solution)
+                    rooms_assigned = True
+            if not rooms_assigned:
+                self.solution = None
+                return None
+            
             # Validate the solution to ensure all hard constraints are met
-            validation_result = self.validate_solution(solution)
+            with timed_phase(self.phase_seconds, "validate_solution"):
+                validation_result = self.validate_solution(solution)
             if validation_result["is_valid"]:
                 self.solution = solution
                 return solution
             else:
-                print(f"Invalid solution: {validation_result['reason']}")
+                print(f"Invalid solution ({len(validation_result['violations'])} violations): {validation_result['reason']}")
                 self.solution = None
                 return None
         else:
@@ -351,72 +1428,312 @@ class SchoolScheduler:
             self.solution = None
             return None
     
-    def validate_solution(self, solution):
-        """Validate that all hard constraints are met in the solution."""
-        # Check if all classes get their required subjects
-        for class_id in self.classes:
-            for subject, required_periods in self.class_subjects.get(class_id, {}).items():
-                actual_periods = 0
-                for (day, period), assignments in solution.items():
-                    for assignment in assignments:
-                        if assignment["class"] == class_id and assignment["subject"] == subject:
-                            actual_periods += 1
-                
-                if actual_periods < required_periods:
-                    return {
-                        "is_valid": False,
-                        "reason": f"Class {class_id} requires {required_periods} periods of {subject}, but only got {actual_periods}",
-                        "constraint_type": "class_subject_requirement"
-                    }
-        
-        # Check for consecutive periods for subjects that require them
-        for subject, min_consecutive in self.consecutive_periods.items():
-            if min_consecutive <= 1:
+    def _scheduled_lessons(self, value):
+        """Yield (teacher, class, subject, day, period, pool) of every lesson in a solution.
+        
+        value maps a model variable to its value (CpSolver.Value, a solution callback's Value or a
+        portfolio member's values); the pool is None in two-stage mode.
+        """
+        if self.interval_model is not None:
+            yield from self.interval_model.scheduled_lessons(value)
+            return
+        for position, var in enumerate(self.schedule_vars):
+            if value(var) == 1:
+                pool = self.var_pool[position]
+                yield self._lesson_of(position) + (self.room_index.names[pool] if pool >= 0 else None,)
+    
+    def get_stats(self):
+        """Phase timings, model size and solver statistics of the last solve()."""
+        stats = {
+            "phases": dict(self.phase_seconds),
+            "model": {
+                "variables": len(self.model.Proto().variables),
+                "constraints": len(self.model.Proto().constraints),
+                "schedule_variables": len(self.schedule_vars)
+            },
+            "solver": dict(self.solve_stats) if self.solve_stats else None
+        }
+        solver_stats = stats["solver"]
+        if solver_stats and solver_stats["objective"] is not None:
+            objective, bound = solver_stats["objective"], solver_stats["best_bound"]
+            solver_stats["gap"] = round(abs(objective - bound) / max(1.0, abs(objective)), 6)
+        return stats
+    
+    def _diagnosis_issue(self, group):
+        """Describe a diagnosis group as an issue in the check_basic_feasibility format."""
+        kind = group[0]
+        if kind == "break_periods":
+            return {"type": kind, "explanation": f"No lessons may be scheduled in the {len(self.break_periods)} break periods"}
+        if kind == "teacher_availability":
+            teacher = group[1]
+            unavailable = len(self.teacher_unavailability.get(teacher, []))
+            return {"type": kind, "teacher": teacher, "explanation": f"{teacher}'s availability ({unavailable} unavailable periods)"}
+        if kind == "teacher_clash":
+            return {"type": kind, "teacher": group[1], "explanation": f"{group[1]} can teach only one class at a time"}
+        if kind == "class_clash":
+            return {"type": kind, "class": group[1], "explanation": f"{group[1]} can have only one lesson at a time"}
+        if kind == "room_capacity":
+            rooms = self.room_pools[group[1]]
+            return {"type": kind, "rooms": rooms, "explanation": f"{', '.join(rooms)} can each host one class at a time"}
+        if kind == "room_supply":
+            rooms = list(group[1])
+            return {"type": kind, "rooms": rooms, "explanation": f"At most {len(rooms)} lessons per period can use {', '.join(rooms)}"}
+        if kind == "weekly_requirement":
+            class_id, subject = group[1:]
+            weekly_periods = self.class_subjects[class_id][subject]
+            return {
+                "type": kind, "class": class_id, "subject": subject,
+                "explanation": f"{class_id} {subject} weekly requirement of {weekly_periods} periods"
+            }
+        if kind == "daily_limits":
+            class_id, subject = group[1:]
+            min_daily, max_daily = self.subject_constraints[subject]
+            return {
+                "type": kind, "class": class_id, "subject": subject,
+                "explanation": f"{class_id} {subject} daily limits of {min_daily} to {max_daily} periods"
+            }
+        if kind == "consecutive_rule":
+            class_id, subject = group[1:]
+            return {
+                "type": kind, "class": class_id, "subject": subject,
+                "explanation": f"{subject} consecutive rule for {class_id}: a block of {self.consecutive_periods[subject]} periods"
+            }
+        if kind == "fixed_assignment":
+            teacher, class_id, subject = group[1:]
+            return {
+                "type": kind, "teacher": teacher, "class": class_id, "subject": subject,
+                "explanation": f"Fixed assignment of {teacher} to {class_id} {subject}"
+            }
+        return {"type": kind, "explanation": " ".join(str(part) for part in group)}
+    
+    def _solve_assumptions(self, groups, time_limit):
+        """Solve the diagnosis model with the given groups enforced.
+        
+        Returns (status name, groups): for an infeasible model, the subset of groups CP-SAT found
+        sufficient for the infeasibility, otherwise an empty list.
+        """
+        self.model.ClearAssumptions()
+        self.model.AddAssumptions([self.diagnosis_groups[group] for group in groups])
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(time_limit, 0.01)
+        solver.parameters.num_workers = self.solver_params["num_workers"]
+        if self.solver_params["random_seed"] is not None:
+            solver.parameters.random_seed = self.solver_params["random_seed"]
+        if self.cancel_event is not None:
+            status = self._solve_cancellable(solver, None)
+        else:
+            status = solver.Solve(self.model)
+        if status != cp_model.INFEASIBLE:
+            return solver.StatusName(status), []
+        sufficient = set(solver.SufficientAssumptionsForInfeasibility())
+        return solver.StatusName(status), [group for group in groups if self.diagnosis_groups[group].Index() in sufficient]
+    
+    def diagnose(self):
+        """Explain an infeasible model with a minimal set of conflicting constraint groups.
+        
+        Every constraint family and entity (a teacher's availability, a class-subject weekly
+        requirement, a room pool's capacity, ...) gets an assumption literal. CP-SAT returns a
+        sufficient subset of assumptions when the model is infeasible, which is then shrunk by
+        dropping one group at a time while the rest stays infeasible. Returns the groups as issues
+        in the check_basic_feasibility format, or an empty list if no conflict was found within the
+        time limit; diagnosis_info reports the status and whether the set is proven minimal.
+        """
+        start = time.perf_counter()
+        deadline = start + self.solver_params["max_time_in_seconds"]
+        self._reset_model()
+        self.diagnosis_groups = {}
+        try:
+            with timed_phase(self.phase_seconds, "diagnose"):
+                return self._diagnose(start, deadline)
+        finally:
+            self.model.ClearAssumptions()
+            self.diagnosis_groups = None
+    
+    def _diagnose(self, start, deadline):
+        """Body of diagnose(), run with diagnosis_groups collecting the assumption literals."""
+        print("Building the diagnosis model...")
+        self.create_variables()
+        self.apply_constraints()
+        
+        print(f"Diagnosing with {len(self.diagnosis_groups)} constraint groups...")
+        status, core = self._solve_assumptions(list(self.diagnosis_groups), deadline - time.perf_counter())
+        minimal = status == "INFEASIBLE"
+        sufficient_size = len(core)
+        
+        # Deletion filter: a group stays only if the others are feasible without it
+        necessary = []
+        pending = list(core)
+        while pending:
+            group = pending.pop()
+            if time.perf_counter() >= deadline or (self.cancel_event is not None and self.cancel_event.is_set()):
+                necessary.append(group)
+                minimal = False
                 continue
-                
-            for class_id in self.classes:
-                if subject not in self.class_subjects.get(class_id, {}):
-                    continue
-                    
-                has_consecutive = False
-                for day in self.days:
-                    # Get all periods for this subject, class, and day
-                    day_periods = []
-                    for period in self.periods:
-                        if (day, period) in solution:
-                            for assignment in solution[(day, period)]:
-                                if assignment["class"] == class_id and assignment["subject"] == subject:
-                                    day_periods.append(period)
-                
-                    # Sort periods and check for consecutive sequences
-                    day_periods.sort()
-                    max_consecutive = 0
-                    current_consecutive = 1
-                    for i in range(1, len(day_periods)):
-                        # Get numeric indices of periods to check if they're consecutive
-                        curr_idx = self.periods.index(day_periods[i])
-                        prev_idx = self.periods.index(day_periods[i-1])
-                        
-                        if curr_idx == prev_idx + 1:
-                            current_consecutive += 1
-                        else:
-                            current_consecutive = 1
-                        
-                        max_consecutive = max(max_consecutive, current_consecutive)
-                    
-                    if max_consecutive >= min_consecutive:
-                        has_consecutive = True
-                        break
-                
-                if not has_consecutive and self.class_subjects[class_id].get(subject, 0) > 0:
-                    return {
-                        "is_valid": False,
-                        "reason": f"Subject {subject} requires at least {min_consecutive} consecutive periods for class {class_id}, but none were scheduled",
-                        "constraint_type": "consecutive_periods"
-                    }
+            check, smaller = self._solve_assumptions(necessary + pending, deadline - time.perf_counter())
+            if check == "INFEASIBLE":
+                pending = [other for other in pending if other in smaller]
+            else:
+                necessary.append(group)
+                minimal = minimal and check != "UNKNOWN"
+        
+        issues = [self._diagnosis_issue(group) for group in reversed(necessary)]
+        self.diagnosis_info = {
+            "status": status,
+            "groups": len(self.diagnosis_groups),
+            "sufficient_groups": sufficient_size,
+            "conflicting_groups": len(issues),
+            "minimal": minimal,
+            "seconds": round(time.perf_counter() - start, 4)
+        }
+        print(f"Diagnosis found {len(issues)} conflicting constraint groups")
+        return issues
+    
+    def _apply_changes(self, changes):
+        """Apply a repair change set to the scheduler's inputs.
+        
+        Supported keys: "teacher_unavailability" ({teacher_id: [[day, period]]}, added to the
+        existing unavailability), "removed_rooms" ([room_ids]) and "class_subjects"
+        ({class_id: {subject_id: weekly_periods}}). Returns the set of changed (class, subject) pairs.
+        """
+        for teacher, slots in changes.get("teacher_unavailability", {}).items():
+            unavailable = list(self.teacher_unavailability.get(teacher, []))
+            unavailable.extend((day, period) for [day, period] in slots)
+            self.teacher_unavailability = dict(self.teacher_unavailability, **{teacher: unavailable})
         
-        # If we got here, all hard constraints are satisfied
-        return {"is_valid": True}
+        removed_rooms = set(changes.get("removed_rooms", []))
+        if removed_rooms:
+            self.rooms = [room for room in self.rooms if room not in removed_rooms]
+            self.room_suitability = {
+                subject: [room for room in rooms if room not in removed_rooms]
+                for subject, rooms in self.room_suitability.items()
+            }
+        
+        changed_pairs = set()
+        class_subjects = {class_id: dict(subjects) for class_id, subjects in self.class_subjects.items()}
+        for class_id, subjects in changes.get("class_subjects", {}).items():
+            for subject, weekly_periods in subjects.items():
+                if class_subjects.get(class_id, {}).get(subject) != weekly_periods:
+                    class_subjects.setdefault(class_id, {})[subject] = weekly_periods
+                    changed_pairs.add((class_id, subject))
+        self.class_subjects = class_subjects
+        return changed_pairs
+    
+    def _lesson_fits(self, lesson):
+        """Check whether a previous lesson still has a variable under the current inputs."""
+        teacher, class_id, subject, day, period, room = lesson
+        return (
+            teacher in self.teachers
+            and class_id in self.teacher_classes.get(teacher, [])
+            and subject in self.teacher_subjects.get(teacher, [])
+            and subject in self.class_subjects.get(class_id, {})
+            and (day, period) not in self.break_periods
+            and (day, period) not in self.teacher_unavailability.get(teacher, [])
+            and room in self.rooms
+            and room in self.room_suitability.get(subject, self.rooms)
+        )
+    
+    def _widen_scope(self, scope_teachers, scope_classes):
+        """Grow the repair neighbourhood by one step: every class the scoped teachers can teach
+        and every teacher who can teach a scoped class."""
+        classes = set(scope_classes)
+        teachers = set(scope_teachers)
+        for teacher in self.teachers:
+            teacher_classes = set(self.teacher_classes.get(teacher, []))
+            if teacher in scope_teachers:
+                classes |= teacher_classes
+            if teacher_classes & set(scope_classes):
+                teachers.add(teacher)
+        return teachers, classes
+    
+    def repair(self, previous_solution, changes):
+        """Repair a previous solution after a change set, re-optimizing only what the change touches.
+        
+        Lessons that no longer fit (new unavailability, removed room, changed class requirement)
+        define the neighbourhood: their teachers and classes get free variables, while every other
+        lesson of the previous solution is fixed in place. If the repair is infeasible the
+        neighbourhood is widened step by step until it covers the whole school.
+        """
+        if self.interval_model is not None:
+            raise ValueError("Repair freezes schedule variables and needs the grid engine")
+        previous = self.parse_solution(previous_solution)
+        changed_pairs = self._apply_changes(changes)
+        
+        lessons = [
+            (a.get("teacher"), a.get("class"), a.get("subject"), day, period, a.get("room"))
+            for (day, period), assignments in previous.items() for a in assignments
+        ]
+        affected = [
+            lesson for lesson in lessons
+            if (lesson[1], lesson[2]) in changed_pairs or not self._lesson_fits(lesson)
+        ]
+        scope_teachers = {lesson[0] for lesson in affected}
+        scope_classes = {lesson[1] for lesson in affected} | {class_id for class_id, _ in changed_pairs}
+        
+        self.set_solution_hint(previous_solution)
+        widenings = 0
+        while True:
+            self.repair_scope = (scope_teachers, scope_classes)
+            self.frozen_lessons = [
+                lesson for lesson in lessons
+                if lesson[0] not in scope_teachers and lesson[1] not in scope_classes
+            ]
+            print(f"Repairing with {len(scope_teachers)} teachers and {len(scope_classes)} classes free...")
+            solution = self.solve()
+            
+            is_full = set(self.teachers) <= scope_teachers and set(self.classes) <= scope_classes
+            if solution is not None or is_full:
+                break
+            
+            widened = self._widen_scope(scope_teachers, scope_classes)
+            if widened == (scope_teachers, scope_classes):
+                # Nothing left to add through qualifications, fall back to a full re-solve
+                widened = (set(self.teachers), set(self.classes))
+            scope_teachers, scope_classes = widened
+            widenings += 1
+        
+        changed_lessons = 0
+        if solution is not None:
+            new_lessons = {
+                (a["teacher"], a["class"], a["subject"], day, period, a["room"])
+                for (day, period), assignments in solution.items() for a in assignments
+            }
+            changed_lessons = len(new_lessons - set(lessons))
+        
+        self.repair_info = {
+            "affected_lessons": len(affected),
+            "frozen_lessons": len(self.frozen_lessons),
+            "changed_lessons": changed_lessons,
+            "neighbourhood": {"teachers": sorted(scope_teachers), "classes": sorted(scope_classes)},
+            "widenings": widenings
+        }
+        self.repair_scope = None
+        self.frozen_lessons = []
+        return solution
+    
+    def validate_solution(self, solution):
+        """Check a solution ({(day, period): [assignments]}) against every hard constraint.
+        
+        Returns {"is_valid", "violations", ...}, see validation.validate_timetable.
+        """
+        return validate_timetable(self, solution)
+    
+    def validate_timetable(self, timetable):
+        """Validate a timetable in get_solution_json format, e.g. one uploaded or edited by hand.
+        
+        Timeslot keys that match no day and period are reported as violations as well.
+        """
+        if "solution" in timetable and isinstance(timetable["solution"], dict):
+            timetable = timetable["solution"]
+        slot_keys = {f"{day}_{period}" for day, period in self.timeslots}
+        result = self.validate_solution(self.parse_solution(timetable))
+        unknown = [
+            {"type": "unknown_timeslot", "explanation": f"Timeslot {slot_key} matches no day and period", "timeslot": slot_key}
+            for slot_key in timetable if slot_key not in slot_keys
+        ]
+        if unknown:
+            result["violations"] = unknown + result["violations"]
+            result.update(is_valid=False, reason=unknown[0]["explanation"], constraint_type="unknown_timeslot")
+        return result
     
     def get_solution_json(self):
         """Returns the solution in a JSON-serializable format."""
@@ -440,21 +1757,93 @@ class SchoolScheduler:
         }
 
 
+def configure_scheduler(scheduler, data):
+    """Apply the constraint settings of a schedule payload to a SchoolScheduler."""
+    # Set constraints
+    if 'teacher_subjects' in data:
+        scheduler.set_teacher_subjects(data.get('teacher_subjects', {}))
+    
+    if 'teacher_classes' in data:
+        scheduler.set_teacher_classes(data.get('teacher_classes', {}))
+    
+    if 'class_subjects' in data:
+        scheduler.set_class_subjects(data.get('class_subjects', {}))
+    
+    if 'subject_constraints' in data:
+        scheduler.set_subject_constraints(data.get('subject_constraints', {}))
+    
+    if 'class_rankings' in data:
+        scheduler.set_class_rankings(data.get('class_rankings', {}))
+    
+    if 'room_suitability' in data:
+        scheduler.set_room_suitability(data.get('room_suitability', {}))
+    
+    # Set fixed assignments
+    if 'fixed_assignments' in data:
+        for assignment in data.get('fixed_assignments', []):
+            teacher = assignment.get('teacher')
+            class_id = assignment.get('class')
+            subject = assignment.get('subject')
+            if all([teacher, class_id, subject]):
+                scheduler.add_fixed_assignment(teacher, class_id, subject)
+    
+    # Set additional constraints
+    if 'teacher_unavailability' in data:
+        # Convert string keys back to tuples
+        teacher_unavailability = {}
+        for teacher, unavailability in data.get('teacher_unavailability', {}).items():
+            teacher_unavailability[teacher] = [(day, period) for [day, period] in unavailability]
+        scheduler.set_teacher_unavailability(teacher_unavailability)
+    
+    if 'teacher_preferences' in data:
+        # Convert string keys back to tuples
+        teacher_preferences = {}
+        for teacher, preferences in data.get('teacher_preferences', {}).items():
+            teacher_preferences[teacher] = {(day, period): score for (day, period, score) in preferences}
+        scheduler.set_teacher_preferences(teacher_preferences)
+    
+    if 'consecutive_periods' in data:
+        scheduler.set_consecutive_periods(data.get('consecutive_periods', {}))
+    
+    if 'break_periods' in data:
+        # Convert list format back to tuples
+        break_periods = [(day, period) for [day, period] in data.get('break_periods', [])]
+        scheduler.set_break_periods(break_periods)
+
+
+def response_stats(handler_phases, handler_start, scheduler=None):
+    """Build the response 'stats' section: handler and solver phase timings plus solver statistics."""
+    stats = scheduler.get_stats() if scheduler is not None else {"phases": {}, "model": None, "solver": None}
+    stats["phases"] = dict(handler_phases, **stats["phases"])
+    if "response" in stats["phases"]:
+        stats["phases"]["response"] = stats["phases"].pop("response")  # Keep phases in execution order
+    stats["total_seconds"] = round(time.perf_counter() - handler_start, 4)
+    stats["cached"] = scheduler is None
+    return stats
+
+
 # BytePlus Cloud Function handler
 def handler(event, context):
+    # context may be a dict with a 'solution_listener' callable and a 'cancel_event' to stream
+    # intermediate solutions and stop the solve early (used by the local server's stream endpoint),
+    # and a 'stats_listener' that receives the stats of every solve or cache hit
+    options = context if isinstance(context, dict) else {}
+    handler_start = time.perf_counter()
+    handler_phases = {}
     try:
         # Parse input from request
-        if isinstance(event, str):
-            data = json.loads(event)
-        else:
-            # Check if the data is in the 'body' field (common for HTTP triggers)
-            if 'body' in event:
-                if isinstance(event['body'], str):
-                    data = json.loads(event['body'])
-                else:
-                    data = event['body']
+        with timed_phase(handler_phases, "parse"):
+            if isinstance(event, str):
+                data = json.loads(event)
             else:
-                data = event
+                # Check if the data is in the 'body' field (common for HTTP triggers)
+                if 'body' in event:
+                    if isinstance(event['body'], str):
+                        data = json.loads(event['body'])
+                    else:
+                        data = event['body']
+                else:
+                    data = event
         
         print("Processed data:", data)
             
@@ -487,8 +1876,57 @@ def handler(event, context):
                 "body": json.dumps({"error": f"Missing required data: {', '.join(missing_fields)}"})
             }
         
+        try:
+            flags = {
+                key: _strict_bool(data.get(key), key, default)
+                for key, default in (
+                    ('teacher_assignment', False), ('room_pooling', True),
+                    ('debug_names', False), ('symmetry_breaking', False)
+                )
+            }
+        except TypeError as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Invalid option: {e}"})
+            }
+        
+        # Check an uploaded or hand-edited timetable (get_solution_json format) instead of solving
+        if data.get('validate'):
+            scheduler = SchoolScheduler(
+                teachers, subjects, classes, rooms, days, periods,
+                teacher_assignment=flags['teacher_assignment']
+            )
+            configure_scheduler(scheduler, data)
+            result = scheduler.validate_timetable(data['validate'])
+            return {
+                "statusCode": 200,
+                "body": json.dumps(result)
+            }
+        
+        # Identical inputs are answered from the solution cache
+        solution_cache = get_solution_cache() if data.get('use_cache', True) else None
+        cache_key = None
+        if solution_cache is not None:
+            with timed_phase(handler_phases, "cache_lookup"):
+                cache_key = canonical_input_hash(
+                    {key: value for key, value in data.items() if key not in CACHE_IGNORED_KEYS}
+                )
+                cached_result = solution_cache.get(cache_key)
+            if cached_result is not None:
+                result = dict(cached_result, cached=True)
+                stats = response_stats(handler_phases, handler_start)
+                if options.get('stats_listener'):
+                    options['stats_listener'](stats)
+                if data.get('stats'):
+                    result["stats"] = stats
+                return {
+                    "statusCode": 200,
+                    "body": json.dumps(result)
+                }
+        
         # Perform pre-solve feasibility check to identify obvious issues
-        feasibility_issues = check_basic_feasibility(data)
+        with timed_phase(handler_phases, "feasibility_check"):
+            feasibility_issues = check_basic_feasibility(data)
         if feasibility_issues:
             return {
                 "statusCode": 400, 
@@ -498,166 +1936,144 @@ def handler(event, context):
                 })
             }
         
-        # Initialize scheduler
-        scheduler = SchoolScheduler(teachers, subjects, classes, rooms, days, periods)
+        solve_mode = data.get('solve_mode', 'full')
+        if solve_mode not in SOLVE_MODES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Unknown solve_mode '{solve_mode}', expected one of: {', '.join(SOLVE_MODES)}"})
+            }
         
-        # Set constraints
-        if 'teacher_subjects' in data:
-            scheduler.set_teacher_subjects(data.get('teacher_subjects', {}))
-            
-        if 'teacher_classes' in data:
-            scheduler.set_teacher_classes(data.get('teacher_classes', {}))
-            
-        if 'class_subjects' in data:
-            scheduler.set_class_subjects(data.get('class_subjects', {}))
-            
-        if 'subject_constraints' in data:
-            scheduler.set_subject_constraints(data.get('subject_constraints', {}))
-            
-        if 'class_rankings' in data:
-            scheduler.set_class_rankings(data.get('class_rankings', {}))
-            
-        if 'room_suitability' in data:
-            scheduler.set_room_suitability(data.get('room_suitability', {}))
-        
-        # Set fixed assignments
-        if 'fixed_assignments' in data:
-            for assignment in data.get('fixed_assignments', []):
-                teacher = assignment.get('teacher')
-                class_id = assignment.get('class')
-                subject = assignment.get('subject')
-                if all([teacher, class_id, subject]):
-                    scheduler.add_fixed_assignment(teacher, class_id, subject)
-        
-        # Set additional constraints
-        if 'teacher_unavailability' in data:
-            # Convert string keys back to tuples
-            teacher_unavailability = {}
-            for teacher, unavailability in data.get('teacher_unavailability', {}).items():
-                teacher_unavailability[teacher] = [(day, period) for [day, period] in unavailability]
-            scheduler.set_teacher_unavailability(teacher_unavailability)
-            
-        if 'teacher_preferences' in data:
-            # Convert string keys back to tuples
-            teacher_preferences = {}
-            for teacher, preferences in data.get('teacher_preferences', {}).items():
-                teacher_preferences[teacher] = {(day, period): score for (day, period, score) in preferences}
-            scheduler.set_teacher_preferences(teacher_preferences)
-            
-        if 'consecutive_periods' in data:
-            scheduler.set_consecutive_periods(data.get('consecutive_periods', {}))
-            
-        if 'break_periods' in data:
-            # Convert list format back to tuples
-            break_periods = [(day, period) for [day, period] in data.get('break_periods', [])]
-            scheduler.set_break_periods(break_periods)
+        engine = data.get('engine', 'grid')
+        if engine not in ENGINES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Unknown engine '{engine}', expected one of: {', '.join(ENGINES)}"})
+            }
+        if engine == 'interval' and (solve_mode != 'full' or 'repair' in data):
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": "The interval engine only supports full solves, without repair"})
+            }
         
-        # Solve the scheduling problem
-        solution = scheduler.solve()
+        try:
+            solver_params = resolve_solver_params(data.get('solver'))
+        except (TypeError, ValueError) as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Invalid solver parameters: {e}"})
+            }
         
-        if solution:
+        try:
+            portfolio = resolve_portfolio(data.get('portfolio'))
+        except (TypeError, ValueError) as e:
             return {
-                "statusCode": 200,
-                "body": json.dumps(scheduler.get_solution_json())
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Invalid portfolio: {e}"})
             }
-        else:
+        
+        # Room assignment processes are capped like the solver's workers
+        try:
+            room_workers = int(data.get('room_workers', 1))
+            if room_workers < 1:
+                raise ValueError("room_workers must be at least 1")
+        except (TypeError, ValueError) as e:
             return {
                 "statusCode": 400,
-                "body": json.dumps({"error": "No valid solution found that meets all hard constraints"})
+                "body": json.dumps({"error": f"Invalid room_workers: {e}"})
             }
+        room_workers = min(room_workers, _env_number("SCHEDULER_MAX_WORKERS", os.cpu_count() or 1, int))
+        
+        # Initialize scheduler
+        configure_start = time.perf_counter()
+        scheduler = SchoolScheduler(
+            teachers, subjects, classes, rooms, days, periods,
+            solve_mode=solve_mode,
+            room_workers=room_workers,
+            room_pooling=flags['room_pooling'],
+            teacher_assignment=flags['teacher_assignment'],
+            solver_params=solver_params,
+            model_cache=get_model_cache() if data.get('use_cache', True) else None,
+            solution_listener=options.get('solution_listener'),
+            cancel_event=options.get('cancel_event'),
+            portfolio=portfolio,
+            debug_names=flags['debug_names'],
+            engine=engine,
+            symmetry_breaking=flags['symmetry_breaking']
+        )
+        
+        configure_scheduler(scheduler, data)
+        
+        # Warm start from a previous solution in get_solution_json format
+        if data.get('previous_solution'):
+            scheduler.set_solution_hint(data['previous_solution'])
+        handler_phases["configure"] = round(time.perf_counter() - configure_start, 4)
+        
+        # Solve the scheduling problem, or repair the previous solution if a change set was given
+        if 'repair' in data:
+            if not data.get('previous_solution'):
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({"error": "Repair requires previous_solution"})
+                }
+            solution = scheduler.repair(data['previous_solution'], data['repair'])
+        else:
+            solution = scheduler.solve()
+        
+        response_start = time.perf_counter()
+        if solution:
+            result = scheduler.get_solution_json()
+            result["model_info"] = scheduler.model_info
+            result["solver_params"] = scheduler.solver_params
+            result["first_solution_seconds"] = scheduler.first_solution_seconds
+            if scheduler.hint_info is not None:
+                result["hint_info"] = scheduler.hint_info
+            if scheduler.repair_info is not None:
+                result["repair_info"] = scheduler.repair_info
+            if scheduler.portfolio_info is not None:
+                result["portfolio_info"] = scheduler.portfolio_info
+            if solver_params["log_to_response"]:
+                result["solver_log"] = scheduler.solver_log
+            result["cached"] = False
+            # A cancelled solve returns its best solution so far, which is not worth caching
+            cancelled = scheduler.cancel_event is not None and scheduler.cancel_event.is_set()
+            if cancelled:
+                result["cancelled"] = True
+            if solution_cache is not None and not cancelled:
+                solution_cache.put(cache_key, result)
+            status_code = 200
+        else:
+            result = {
+                "error": "No valid solution found that meets all hard constraints",
+                "model_info": scheduler.model_info,
+                "solver_params": scheduler.solver_params
+            }
+            if scheduler.hint_info is not None:
+                result["hint_info"] = scheduler.hint_info
+            if scheduler.repair_info is not None:
+                result["repair_info"] = scheduler.repair_info
+            if scheduler.portfolio_info is not None:
+                result["portfolio_info"] = scheduler.portfolio_info
+            if solver_params["log_to_response"]:
+                result["solver_log"] = scheduler.solver_log
+            # Explain the failure with a minimal set of conflicting constraints when asked to
+            cancelled = scheduler.cancel_event is not None and scheduler.cancel_event.is_set()
+            if data.get('diagnose') and 'repair' not in data and not cancelled:
+                result["issues"] = scheduler.diagnose()
+                result["diagnosis_info"] = scheduler.diagnosis_info
+            status_code = 400
+        
+        handler_phases["response"] = round(time.perf_counter() - response_start, 4)
+        stats = response_stats(handler_phases, handler_start, scheduler)
+        if options.get('stats_listener'):
+            options['stats_listener'](stats)
+        if data.get('stats'):
+            result = dict(result, stats=stats)
+        return {
+            "statusCode": status_code,
+            "body": json.dumps(result)
+        }
     except Exception as e:
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
         }
-
-def check_basic_feasibility(data):
-    """Check for obvious infeasibilities before solving."""
-    issues = []
-    
-    # Calculate available teaching slots
-    days = data.get('days', [])
-    periods = data.get('periods', [])
-    break_periods = data.get('break_periods', [])
-    
-    total_periods = len(days) * len(periods)
-    break_count = len(break_periods)
-    available_periods = total_periods - break_count
-    
-    # Check teacher workload feasibility
-    if 'teacher_subjects' in data and 'teacher_classes' in data and 'class_subjects' in data:
-        teacher_subjects = data.get('teacher_subjects', {})
-        teacher_classes = data.get('teacher_classes', {})
-        class_subjects = data.get('class_subjects', {})
-        teacher_unavailability = data.get('teacher_unavailability', {})
-        
-        for teacher, subjects in teacher_subjects.items():
-            classes = teacher_classes.get(teacher, [])
-            unavailable_count = len(teacher_unavailability.get(teacher, []))
-            
-            # Count how many periods this teacher would need to teach
-            required_periods = 0
-            for class_id in classes:
-                for subject in subjects:
-                    if subject in class_subjects.get(class_id, {}):
-                        required_periods += class_subjects[class_id][subject]
-            
-            teacher_available_periods = available_periods - unavailable_count
-            
-            if required_periods > teacher_available_periods:
-                issues.append({
-                    "type": "teacher_overload",
-                    "teacher": teacher,
-                    "required_periods": required_periods,
-                    "available_periods": teacher_available_periods,
-                    "explanation": f"Teacher {teacher} needs to teach {required_periods} periods but only has {teacher_available_periods} available periods"
-                })
-                
-    # Check for subject-teacher coverage
-    if 'teacher_subjects' in data and 'class_subjects' in data:
-        teacher_subjects = data.get('teacher_subjects', {})
-        class_subjects = data.get('class_subjects', {})
-        
-        # Invert teacher_subjects to get subject -> teachers mapping
-        subject_teachers = {}
-        for teacher, subjects in teacher_subjects.items():
-            for subject in subjects:
-                if subject not in subject_teachers:
-                    subject_teachers[subject] = []
-                subject_teachers[subject].append(teacher)
-        
-        # Check if any required subject has no teachers
-        for class_id, subjects in class_subjects.items():
-            for subject, periods in subjects.items():
-                if periods > 0 and (subject not in subject_teachers or not subject_teachers[subject]):
-                    issues.append({
-                        "type": "no_teachers_for_subject",
-                        "subject": subject,
-                        "class": class_id,
-                        "explanation": f"Subject {subject} is required for class {class_id} but no teachers can teach it"
-                    })
-    
-    # Check for subject-class-teacher compatibility
-    if 'teacher_subjects' in data and 'teacher_classes' in data and 'class_subjects' in data:
-        teacher_subjects = data.get('teacher_subjects', {})
-        teacher_classes = data.get('teacher_classes', {})
-        class_subjects = data.get('class_subjects', {})
-        
-        for class_id, subjects in class_subjects.items():
-            for subject, periods in subjects.items():
-                if periods > 0:
-                    # Find teachers who can teach this subject to this class
-                    capable_teachers = []
-                    for teacher, teacher_subject_list in teacher_subjects.items():
-                        if subject in teacher_subject_list and class_id in teacher_classes.get(teacher, []):
-                            capable_teachers.append(teacher)
-                    
-                    if not capable_teachers:
-                        issues.append({
-                            "type": "no_capable_teachers",
-                            "subject": subject,
-                            "class": class_id,
-                            "explanation": f"No teachers can teach {subject} to class {class_id}"
-                        })
-    
-    return issues 
\ No newline at end of file
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Seeded generator of synthetic school timetabling instances.
+
+Instances use the same JSON format as the /api/schedule payload. Every class-subject pair gets
+a qualified teacher and teacher loads stay within their available periods, so generated
+instances pass check_basic_feasibility and are usually feasible.
+"""
+import argparse
+import json
+import math
+import random
+
+SUBJECT_NAMES = [
+    "Math", "English", "Science", "History", "Geography", "PE", "Art", "Music",
+    "French", "Spanish", "Biology", "Chemistry", "Physics", "Computing", "Drama", "Economics"
+]
+
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Instance sizes used by the benchmark runner
+SIZE_PRESETS = {
+    "small": {"teachers": 10, "classes": 6, "subjects": 5, "rooms": 8, "days": 5, "periods": 6},
+    "medium": {"teachers": 24, "classes": 18, "subjects": 8, "rooms": 22, "days": 5, "periods": 7},
+    "large": {"teachers": 48, "classes": 36, "subjects": 10, "rooms": 42, "days": 5, "periods": 8},
+    "xlarge": {"teachers": 96, "classes": 72, "subjects": 12, "rooms": 80, "days": 5, "periods": 8},
+}
+
+
+def generate_instance(seed=0, teachers=24, classes=18, subjects=8, rooms=22, days=5, periods=7,
+                      breaks_per_day=0, special_subjects=2, class_load=0.8, teacher_load=0.8,
+                      preference_density=0.1, unavailability_density=0.05, consecutive_subjects=0):
+    """Return a schedule payload for a synthetic school.
+
+    class_load is the share of a class's non-break periods filled with lessons, teacher_load the
+    largest share of a teacher's available periods they may teach. The first special_subjects
+    subjects are restricted to their own rooms (labs, gyms). preference_density and
+    unavailability_density are the share of a teacher's periods with a preference or marked
+    unavailable, and the first consecutive_subjects subjects require double periods.
+    Raises ValueError when the sizes cannot hold the generated lessons.
+    """
+    rng = random.Random(seed)
+    if subjects > len(SUBJECT_NAMES):
+        subject_ids = [f"Subject{i + 1}" for i in range(subjects)]
+    else:
+        subject_ids = SUBJECT_NAMES[:subjects]
+    day_ids = DAY_NAMES[:days] if days <= len(DAY_NAMES) else [f"D{i + 1}" for i in range(days)]
+    period_ids = [f"P{i + 1}" for i in range(periods)]
+    class_ids = [f"C{i + 1:02d}" for i in range(classes)]
+    teacher_ids = [f"T{i + 1:02d}" for i in range(teachers)]
+    if teachers < subjects:
+        raise ValueError(f"Need at least one teacher per subject ({subjects}), got {teachers}")
+    if rooms < classes:
+        raise ValueError(f"Need at least one room per class ({classes}), got {rooms}")
+
+    # Breaks in the middle of the day
+    break_periods = []
+    first_break = max((periods - breaks_per_day) // 2, 0)
+    for day in day_ids:
+        for period in period_ids[first_break:first_break + breaks_per_day]:
+            break_periods.append([day, period])
+    teaching_slots = days * periods - len(break_periods)
+
+    # Weekly periods per class: every subject at least once, the rest spread at random
+    max_daily = {}
+    class_subjects = {}
+    lessons_per_class = max(int(teaching_slots * class_load), subjects)
+    for class_id in class_ids:
+        # Subjects taught in double periods need at least two lessons a week
+        weekly = {subject: 2 if i < consecutive_subjects else 1 for i, subject in enumerate(subject_ids)}
+        for subject in rng.choices(subject_ids, k=max(lessons_per_class - sum(weekly.values()), 0)):
+            weekly[subject] += 1
+        class_subjects[class_id] = weekly
+    for subject in subject_ids:
+        busiest = max(class_subjects[class_id][subject] for class_id in class_ids)
+        max_daily[subject] = max(2, math.ceil(busiest / days))
+    subject_demand = {
+        subject: sum(class_subjects[class_id][subject] for class_id in class_ids) for subject in subject_ids
+    }
+
+    # Specialist teachers: each subject gets teachers in proportion to its demand
+    total_demand = sum(subject_demand.values())
+    staff = {subject: 1 for subject in subject_ids}
+    for _ in range(teachers - subjects):
+        subject = max(subject_ids, key=lambda s: subject_demand[s] / staff[s])
+        staff[subject] += 1
+    teacher_subjects = {}
+    teacher_classes = {}
+    teacher_periods = {}
+    teacher_iter = iter(teacher_ids)
+    for subject in subject_ids:
+        subject_teachers = [next(teacher_iter) for _ in range(staff[subject])]
+        for teacher in subject_teachers:
+            teacher_subjects[teacher] = [subject]
+            teacher_classes[teacher] = []
+            teacher_periods[teacher] = 0
+        # Largest classes first, each to the least loaded teacher of the subject
+        for class_id in sorted(class_ids, key=lambda c: -class_subjects[c][subject]):
+            teacher = min(subject_teachers, key=lambda t: teacher_periods[t])
+            teacher_classes[teacher].append(class_id)
+            teacher_periods[teacher] += class_subjects[class_id][subject]
+
+    capacity = int(teaching_slots * teacher_load)
+    overloaded = [teacher for teacher, load in teacher_periods.items() if load > capacity]
+    if overloaded:
+        needed = math.ceil(total_demand / capacity) + subjects
+        raise ValueError(f"{len(overloaded)} teachers exceed {capacity} periods, use about {needed} teachers")
+
+    # Special rooms for the first subjects, general classrooms for the rest
+    room_ids = []
+    room_suitability = {}
+    for subject in subject_ids[:special_subjects]:
+        count = max(1, math.ceil(subject_demand[subject] / (teaching_slots * 0.7)))
+        subject_rooms = [f"{subject[:3].upper()}{i + 1}" for i in range(count)]
+        room_suitability[subject] = subject_rooms
+        room_ids.extend(subject_rooms)
+    general_rooms = max(rooms - len(room_ids), classes)
+    room_ids.extend(f"R{100 + i + 1}" for i in range(general_rooms))
+
+    # Teacher availability and preferences on the non-break periods
+    open_slots = [
+        [day, period] for day in day_ids for period in period_ids if [day, period] not in break_periods
+    ]
+    teacher_unavailability = {}
+    teacher_preferences = {}
+    for teacher in teacher_ids:
+        spare = max(teaching_slots - teacher_periods[teacher] - days, 0)
+        unavailable = min(int(teaching_slots * unavailability_density), spare)
+        if unavailable:
+            teacher_unavailability[teacher] = rng.sample(open_slots, unavailable)
+        preferred = int(teaching_slots * preference_density)
+        if preferred:
+            teacher_preferences[teacher] = [
+                [day, period, rng.randint(1, 5)] for day, period in rng.sample(open_slots, preferred)
+            ]
+
+    instance = {
+        "teachers": teacher_ids,
+        "subjects": subject_ids,
+        "classes": class_ids,
+        "rooms": room_ids,
+        "days": day_ids,
+        "periods": period_ids,
+        "teacher_subjects": teacher_subjects,
+        "teacher_classes": teacher_classes,
+        "class_subjects": class_subjects,
+        "subject_constraints": {subject: [0, max_daily[subject]] for subject in subject_ids},
+        "class_rankings": {class_id: rng.randint(1, 10) for class_id in class_ids},
+        "room_suitability": room_suitability,
+        "teacher_unavailability": teacher_unavailability,
+        "teacher_preferences": teacher_preferences,
+        "break_periods": break_periods,
+    }
+    if consecutive_subjects:
+        instance["consecutive_periods"] = {subject: 2 for subject in subject_ids[:consecutive_subjects]}
+    return instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic school timetabling instance.")
+    parser.add_argument("--size", choices=sorted(SIZE_PRESETS), help="Start from a size preset")
+    parser.add_argument("--seed", type=int, default=0)
+    for name in ("teachers", "classes", "subjects", "rooms", "days", "periods",
+                 "breaks_per_day", "special_subjects", "consecutive_subjects"):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int)
+    for name in ("class_load", "teacher_load", "preference_density", "unavailability_density"):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float)
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    options = dict(SIZE_PRESETS.get(args.size, {}))
+    options.update({
+        name: value for name, value in vars(args).items()
+        if value is not None and name not in ("size", "output")
+    })
+    instance = generate_instance(**options)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(instance, f, indent=2)
+        print(f"Instance written to {args.output}")
+    else:
+        print(json.dumps(instance, indent=2))
+
+
+if __name__ == "__main__":
+    main()
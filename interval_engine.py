@@ -0,0 +1,331 @@
+"""
+Interval-variable engine.
+
+The boolean grid gives every lesson one variable per timeslot and room. This engine gives every
+lesson, or every consecutive block, one start variable over the week's timeslots plus optional
+intervals for its candidate teachers and room pools. AddNoOverlap keeps teachers, classes and
+single rooms apart and AddCumulative caps pools of interchangeable rooms, so the model stays
+small on long days and a double period propagates as one block instead of adjacent booleans.
+"""
+from collections import defaultdict
+
+from ortools.sat.python import cp_model
+
+
+class LessonUnit:
+    """One lesson, or one consecutive block, of a class and subject."""
+
+    def __init__(self, c, s, length, starts, start, interval):
+        self.c = c                # Class id
+        self.s = s                # Subject id
+        self.length = length      # Periods covered; more than 1 for a consecutive block
+        self.starts = starts      # Slots the unit may start in
+        self.start = start        # IntVar over starts
+        self.interval = interval  # Mandatory interval in the class's NoOverlap
+        self.teachers = []        # [(teacher id, presence literal)], literal None for the only candidate
+        self.pools = []           # [(pool id, presence literal)], literal None for the only suitable pool
+        self.days = {}            # {day: literal} for every day the unit may fall on, None if only one
+        self.start_literals = {}  # {slot: literal implying start == slot}, created for preferences
+
+
+class IntervalModel:
+    """Lessons of a SchoolScheduler as interval variables in its CpModel.
+
+    Each class-subject gets one unit per weekly period, and a subject with a consecutive-period
+    rule gets its first min_consecutive periods as one block, taught by one teacher in one room
+    pool. Mirrors the create_variables, apply_constraints and apply_soft_constraints steps of the
+    grid; scheduled_lessons reads a solution back in the grid's lesson format.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.model = scheduler.model
+        self.units = []
+
+    def _name(self, *parts):
+        return "_".join(str(part) for part in parts) if self.scheduler.debug_names else ""
+
+    def _block_starts(self, open_slots, length):
+        """Bitset of the slots a run of length open periods within one day can start in."""
+        n_periods = len(self.scheduler.periods)
+        starts = open_slots
+        for offset in range(1, length):
+            starts &= open_slots >> offset
+        day_starts = 0
+        for d in range(len(self.scheduler.days)):
+            day_starts |= ((1 << (n_periods - length + 1)) - 1) << (d * n_periods)
+        return starts & day_starts
+
+    def create_variables(self):
+        """Create a start variable and interval per unit, and its teacher and room pool choices."""
+        scheduler = self.scheduler
+        scheduler._intern_entities()
+        scheduler._build_room_pools()
+        if scheduler.teacher_assignment:
+            scheduler._create_teacher_assignment_vars()
+        teacher_ids, class_ids, subject_ids = (
+            scheduler.teacher_index.ids, scheduler.class_index.ids, scheduler.subject_index.ids
+        )
+        teacher_open, class_open, pool_open = scheduler._availability_bitsets()
+        pruned_lessons = scheduler._pruned_lessons()
+
+        qualified = defaultdict(list)  # {(class_id, subject_id): [teacher_ids]}
+        for teacher in scheduler.teachers:
+            for class_id in scheduler.teacher_classes.get(teacher, []):
+                for subject in scheduler.teacher_subjects.get(teacher, []):
+                    if subject in scheduler.class_subjects.get(class_id, {}):
+                        if (teacher, class_id, subject) not in pruned_lessons:
+                            qualified[(class_id, subject)].append(teacher)
+
+        for class_id in scheduler.classes:
+            c = class_ids[class_id]
+            for subject, weekly_periods in scheduler.class_subjects.get(class_id, {}).items():
+                if weekly_periods <= 0:
+                    continue
+                s = subject_ids[subject]
+                if scheduler.teacher_assignment:
+                    candidates = scheduler.teacher_candidates.get((class_id, subject), [])
+                else:
+                    candidates = qualified.get((class_id, subject), [])
+                suitable_pools = list(dict.fromkeys(
+                    scheduler.room_index.ids[scheduler.room_pool_of[room]]
+                    for room in scheduler.room_suitability.get(subject, scheduler.rooms)
+                ))
+
+                # Teacher, class and room availability intersected in one bitset
+                teacher_slots = room_slots = 0
+                for teacher in candidates:
+                    teacher_slots |= teacher_open[teacher]
+                for pool in suitable_pools:
+                    room_slots |= pool_open[pool]
+                open_slots = class_open[class_id] & teacher_slots & room_slots
+
+                min_consecutive = scheduler.consecutive_periods.get(subject, 1)
+                lengths = [1] * weekly_periods
+                if min_consecutive > 1:
+                    # A block longer than the weekly periods leaves no room for any unit
+                    lengths = [min_consecutive] + [1] * (weekly_periods - min_consecutive)
+                for k, length in enumerate(lengths):
+                    starts_mask = self._block_starts(open_slots, length) if length > 1 else open_slots
+                    starts = [slot for slot in range(len(scheduler.timeslots)) if starts_mask >> slot & 1]
+                    if not starts or length > weekly_periods:
+                        # Nothing can hold this lesson, which makes the model infeasible, as it should
+                        self.model.AddBoolOr([])
+                        continue
+                    start = self.model.NewIntVarFromDomain(
+                        cp_model.Domain.FromValues(starts), self._name("start", class_id, subject, k)
+                    )
+                    interval = self.model.NewFixedSizeIntervalVar(
+                        start, length, self._name("lesson", class_id, subject, k)
+                    )
+                    unit = LessonUnit(c, s, length, starts, start, interval)
+
+                    for teacher in candidates:
+                        t = teacher_ids[teacher]
+                        if len(candidates) == 1:
+                            literal = None
+                        elif scheduler.teacher_assignment:
+                            literal = scheduler.teacher_assignment_vars[(t, c, s)]
+                        else:
+                            literal = self.model.NewBoolVar(self._name("teacher", teacher, class_id, subject, k))
+                        unit.teachers.append((t, literal))
+                    for pool in suitable_pools:
+                        literal = None
+                        if len(suitable_pools) > 1:
+                            literal = self.model.NewBoolVar(
+                                self._name("room", scheduler.room_index.names[pool], class_id, subject, k)
+                            )
+                        unit.pools.append((pool, literal))
+                    self.units.append(unit)
+
+        scheduler.model_info.update({
+            "engine": "interval",
+            "lesson_units": len(self.units),
+            "blocks": sum(unit.length > 1 for unit in self.units),
+            "aggregate_variables": 0,
+            "variables": len(self.model.Proto().variables)
+        })
+
+    def apply_constraints(self):
+        """Add the NoOverlap, Cumulative, choice and daily limit constraints of every unit."""
+        scheduler = self.scheduler
+        n_periods = len(scheduler.periods)
+        teacher_intervals = defaultdict(list)  # {teacher id: [intervals]}
+        class_intervals = defaultdict(list)    # {class id: [intervals]}
+        pool_intervals = defaultdict(list)     # {pool id: [intervals]}
+
+        for unit in self.units:
+            class_intervals[unit.c].append(unit.interval)
+            for choices, intervals in ((unit.teachers, teacher_intervals), (unit.pools, pool_intervals)):
+                for entity, literal in choices:
+                    if literal is None:
+                        intervals[entity].append(unit.interval)
+                    else:
+                        intervals[entity].append(
+                            self.model.NewOptionalFixedSizeIntervalVar(unit.start, unit.length, literal, "")
+                        )
+                literals = [literal for _, literal in choices if literal is not None]
+                # Teacher assignment mode chooses one teacher per class-subject, not per unit
+                if literals and not (choices is unit.teachers and scheduler.teacher_assignment):
+                    self.model.AddExactlyOne(literals)
+
+        # 1. Each teacher can only teach one class at a time, and not while unavailable
+        for teacher in scheduler.teachers:
+            t = scheduler.teacher_index.ids[teacher]
+            if t not in teacher_intervals:
+                continue
+            break_slots = set(scheduler.break_periods)
+            for timeslot in scheduler.teacher_unavailability.get(teacher, []):
+                slot = scheduler.slot_index.ids.get(tuple(timeslot))
+                if slot is not None and tuple(timeslot) not in break_slots:
+                    teacher_intervals[t].append(self.model.NewFixedSizeIntervalVar(slot, 1, ""))
+            if len(teacher_intervals[t]) > 1:
+                self.model.AddNoOverlap(teacher_intervals[t])
+
+        # 2. Each class can only have one subject at a time
+        for intervals in class_intervals.values():
+            if len(intervals) > 1:
+                self.model.AddNoOverlap(intervals)
+
+        # Symmetry breaking: units of a class-subject with the same length are interchangeable,
+        # so they start in the order they were created
+        if scheduler.symmetry_breaking:
+            orderings = 0
+            previous = {}
+            for unit in self.units:
+                key = (unit.c, unit.s, unit.length)
+                if key in previous:
+                    self.model.Add(previous[key].start < unit.start)
+                    orderings += 1
+                previous[key] = unit
+            scheduler.model_info["symmetry_breaking"] = {"lesson_orderings": orderings}
+
+        # 3. Each room can only host one class at a time (a pool hosts at most one class per room)
+        for pool, intervals in pool_intervals.items():
+            capacity = len(scheduler.room_pools[scheduler.room_index.names[pool]])
+            if capacity == 1 and len(intervals) > 1:
+                self.model.AddNoOverlap(intervals)
+            elif len(intervals) > capacity:
+                self.model.AddCumulative(intervals, [1] * len(intervals), capacity)
+
+        # 4. Weekly requirements hold by construction: one unit per weekly period
+        # 5. Min/max daily periods per subject for each class
+        class_ids = {class_id: scheduler.class_index.ids[class_id] for class_id in scheduler.classes}
+        units_by_class_subject = defaultdict(list)
+        for unit in self.units:
+            units_by_class_subject[(unit.c, unit.s)].append(unit)
+        minimum_days = scheduler._daily_minimum_days()
+        for (class_id, subject), required_days in minimum_days.items():
+            if class_id not in class_ids or subject not in scheduler.subject_constraints:
+                continue
+            # A class-subject without units (0 weekly periods) is short on every day that needs it
+            key = (class_ids[class_id], scheduler.subject_index.ids[subject])
+            if key not in units_by_class_subject and required_days and scheduler.subject_constraints[subject][0] > 0:
+                self.model.AddBoolOr([])
+        for (c, s), units in units_by_class_subject.items():
+            limits = scheduler.subject_constraints.get(scheduler.subject_index.names[s])
+            if limits is None:
+                continue
+            min_daily, max_daily = limits
+            if min_daily <= 0 and sum(unit.length for unit in units) <= max_daily:
+                continue
+            day_terms = defaultdict(list)  # {day: [(literal or None, periods)]}
+            for unit in units:
+                days = sorted({slot // n_periods for slot in unit.starts})
+                for d in days:
+                    literal = None
+                    if len(days) > 1:
+                        literal = self.model.NewBoolVar(self._name("day", unit.c, unit.s, d))
+                        self.model.AddLinearConstraint(
+                            unit.start, d * n_periods, (d + 1) * n_periods - 1
+                        ).OnlyEnforceIf(literal)
+                    unit.days[d] = literal
+                    day_terms[d].append((literal, unit.length))
+                if len(days) > 1:
+                    self.model.AddExactlyOne(unit.days.values())
+
+            for d, terms in day_terms.items():
+                fixed = sum(length for literal, length in terms if literal is None)
+                literals = [literal for literal, _ in terms if literal is not None]
+                coeffs = [length for literal, length in terms if literal is not None]
+                day_count = cp_model.LinearExpr.WeightedSum(literals, coeffs) + fixed
+                if min_daily > 0:
+                    self.model.Add(day_count >= min_daily)
+                if fixed + sum(coeffs) > max_daily:
+                    self.model.Add(day_count <= max_daily)
+            if min_daily > 0:
+                # Pruning can leave a day that needs the subject without any unit that may start on it
+                required_days = minimum_days.get(
+                    (scheduler.class_index.names[c], scheduler.subject_index.names[s]), set()
+                )
+                if required_days - set(day_terms):
+                    self.model.AddBoolOr([])
+
+        # 6. Fixed assignments hold by construction: the other teachers were pruned
+        # 7. Consecutive periods hold by construction: the first unit is the block
+
+    def apply_soft_constraints(self):
+        """Add the ranking-balance and preference terms to the scheduler's objective lists."""
+        scheduler = self.scheduler
+        objective_vars, objective_coeffs = scheduler.objective_vars, scheduler.objective_coeffs
+        penalties = scheduler._ranking_penalties()
+        preferences = {
+            scheduler.teacher_index.ids[teacher]: {
+                scheduler.slot_index.ids[timeslot]: score
+                for timeslot, score in teacher_preferences.items() if timeslot in scheduler.slot_index.ids
+            }
+            for teacher, teacher_preferences in scheduler.teacher_preferences.items()
+            if teacher in scheduler.teacher_index.ids
+        }
+
+        for unit in self.units:
+            class_id = scheduler.class_index.names[unit.c]
+            for t, literal in unit.teachers:
+                # 8. Balance teacher workload across good and poor classes, per period taught
+                penalty = penalties.get((scheduler.teacher_index.names[t], class_id), 0)
+                if penalty and literal is not None:
+                    objective_vars.append(literal)
+                    objective_coeffs.append(penalty * unit.length)
+                elif penalty:
+                    # The only candidate pays in every solution; the offset keeps objectives comparable with the grid
+                    scheduler.objective_offset += penalty * unit.length
+
+                # 9. Teacher preferences for the periods a unit covers, rewarded per start
+                teacher_preferences = preferences.get(t)
+                if not teacher_preferences:
+                    continue
+                for slot in unit.starts:
+                    score = sum(teacher_preferences.get(slot + offset, 0) for offset in range(unit.length))
+                    if not score:
+                        continue
+                    reward = self._start_literal(unit, slot)
+                    if literal is not None:
+                        taught = self.model.NewBoolVar("")
+                        self.model.AddImplication(taught, reward)
+                        self.model.AddImplication(taught, literal)
+                        reward = taught
+                    objective_vars.append(reward)
+                    objective_coeffs.append(-score)
+
+    def _start_literal(self, unit, slot):
+        """Return a literal that can only be true if unit starts in slot."""
+        literal = unit.start_literals.get(slot)
+        if literal is None:
+            literal = self.model.NewBoolVar("")
+            self.model.Add(unit.start == slot).OnlyEnforceIf(literal)
+            unit.start_literals[slot] = literal
+        return literal
+
+    def scheduled_lessons(self, value):
+        """Yield (teacher, class, subject, day, period, pool) of every period taught in a solution."""
+        scheduler = self.scheduler
+        for unit in self.units:
+            start = value(unit.start)
+            t = next(t for t, literal in unit.teachers if literal is None or value(literal))
+            pool = next(pool for pool, literal in unit.pools if literal is None or value(literal))
+            for slot in range(start, start + unit.length):
+                day, period = scheduler.slot_index.names[slot]
+                yield (
+                    scheduler.teacher_index.names[t], scheduler.class_index.names[unit.c],
+                    scheduler.subject_index.names[unit.s], day, period, scheduler.room_index.names[pool]
+                )
@@ -0,0 +1,152 @@
+"""
+Asynchronous schedule jobs.
+
+Solves submitted through the job API run in a bounded pool of worker processes, so solver CPU
+work never blocks the HTTP server. Job state and results are kept in sqlite and survive a
+server restart.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Job states, in lifecycle order
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when the job pool already has the maximum number of pending jobs."""
+
+
+class JobStore:
+    """sqlite-backed store of job status and results."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT, created_at REAL, updated_at REAL, "
+                "status_code INTEGER, result TEXT)"
+            )
+
+    def _connect(self):
+        # Callers wrap this in closing(): a sqlite3 connection used as a context manager commits but stays open
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def create(self):
+        """Register a new queued job and return its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, now, now)
+            )
+        return job_id
+
+    def update(self, job_id, status, status_code=None, result=None):
+        """Set a job's status and, once finished, its HTTP status code and response body."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, status_code = ?, result = ? WHERE id = ?",
+                (status, time.time(), status_code, result, job_id)
+            )
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it does not exist."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT id, status, created_at, updated_at, status_code, result FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job_id, status, created_at, updated_at, status_code, result = row
+        job = {"job_id": job_id, "status": status, "created_at": created_at, "updated_at": updated_at}
+        if status in (JOB_DONE, JOB_FAILED):
+            job["status_code"] = status_code
+            job["result"] = json.loads(result) if result else None
+        return job
+
+    def fail_unfinished(self, reason):
+        """Mark jobs left queued or running by a previous server process as failed."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, status_code = 500, result = ? WHERE status IN (?, ?)",
+                (JOB_FAILED, time.time(), json.dumps({"error": reason}), JOB_QUEUED, JOB_RUNNING)
+            )
+
+
+def run_job(db_path, job_id, payload):
+    """Worker-process entry point: solve one payload and return the handler result."""
+    # Imported here so the server process does not need OR-Tools loaded to submit jobs
+    from index import handler
+
+    JobStore(db_path).update(job_id, JOB_RUNNING)
+    return handler(payload, {})
+
+
+class JobManager:
+    """Submits schedule payloads to a process pool and records their results in a JobStore."""
+
+    def __init__(self, db_path, max_workers=2, max_pending=32):
+        self.store = JobStore(db_path)
+        self.store.fail_unfinished("Job was interrupted by a server restart")
+        self.max_pending = max_pending
+        self.pending = 0
+        self.lock = threading.Lock()
+        # spawn keeps worker processes independent of the server's threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def submit(self, payload):
+        """Queue a payload and return its job id; raises JobQueueFull when the pool is saturated."""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise JobQueueFull(f"{self.pending} jobs are already pending")
+            self.pending += 1
+
+        job_id = self.store.create()
+        future = self.executor.submit(run_job, self.store.db_path, job_id, payload)
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        return job_id
+
+    def _finish(self, job_id, future):
+        with self.lock:
+            self.pending -= 1
+        try:
+            result = future.result()
+        except Exception as e:
+            self.store.update(job_id, JOB_FAILED, 500, json.dumps({"error": str(e)}))
+            return
+
+        status_code = result.get("statusCode", 200)
+        status = JOB_DONE if status_code < 500 else JOB_FAILED
+        self.store.update(job_id, status, status_code, result.get("body"))
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_job_manager(directory):
+    """Build the JobManager from SCHEDULER_JOB_DB, SCHEDULER_JOB_WORKERS and SCHEDULER_JOB_QUEUE_LIMIT."""
+    return JobManager(
+        db_path=os.environ.get("SCHEDULER_JOB_DB") or os.path.join(directory, "jobs.db"),
+        max_workers=int(os.environ.get("SCHEDULER_JOB_WORKERS", "2")),
+        max_pending=int(os.environ.get("SCHEDULER_JOB_QUEUE_LIMIT", "32"))
+    )
@@ -3,17 +3,172 @@
 Simple HTTP Server for testing the School Scheduler web interface.
 """
 
+import email.utils
+import hashlib
 import http.server
-import socketserver
+import mimetypes
 import os
+import queue
+import threading
+import time
+import uuid
 import webbrowser
 import json
+from collections import defaultdict
 from urllib.parse import urlparse
 from index import handler
+from jobs import JobQueueFull, create_job_manager
 
 # Configuration
 PORT = 8000
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+JOBS_PATH = '/api/schedule/jobs'
+STREAM_PATH = '/api/schedule/stream'
+STREAM_HEARTBEAT_SECONDS = 1.0  # Also bounds how long a disconnected client keeps its solve running
+MAX_CONCURRENT_SOLVES = int(os.environ.get('SCHEDULER_MAX_CONCURRENT_SOLVES', '2'))
+MAX_QUEUED_SOLVES = int(os.environ.get('SCHEDULER_SOLVE_QUEUE_LIMIT', '8'))
+RETRY_AFTER_SECONDS = int(os.environ.get('SCHEDULER_RETRY_AFTER', '15'))
+
+
+class SolveAdmission:
+    """Caps concurrent synchronous solves and the number of requests waiting for a slot."""
+    
+    def __init__(self, max_concurrent, max_queued):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.queued = 0
+        self.condition = threading.Condition()
+    
+    def acquire(self):
+        """Wait for a solve slot. Returns False without waiting if the wait queue is full."""
+        with self.condition:
+            if self.in_flight >= self.max_concurrent:
+                if self.queued >= self.max_queued:
+                    return False
+                self.queued += 1
+                while self.in_flight >= self.max_concurrent:
+                    self.condition.wait()
+                self.queued -= 1
+            self.in_flight += 1
+            return True
+    
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+    
+    def gauges(self):
+        with self.condition:
+            return {
+                "in_flight_solves": self.in_flight,
+                "queued_solves": self.queued,
+                "max_concurrent_solves": self.max_concurrent,
+                "max_queued_solves": self.max_queued
+            }
+
+
+class Metrics:
+    """Request and solver metrics, rendered in the Prometheus text exposition format."""
+    
+    LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}                # {(name, labels): [bucket counts, sum, count]}
+        self.counters = defaultdict(float)  # {(name, labels): value}
+        self.last_model = {}                # {"variables": n, "constraints": n} of the last solve
+    
+    def observe(self, name, labels, value):
+        with self.lock:
+            histogram = self.histograms.setdefault((name, labels), [[0] * len(self.LATENCY_BUCKETS), 0.0, 0])
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+    
+    def increment(self, name, labels=(), value=1):
+        with self.lock:
+            self.counters[(name, labels)] += value
+    
+    def record_request(self, endpoint, status_code, seconds):
+        """Count an API request and observe its latency."""
+        self.increment("scheduler_http_requests_total", (("endpoint", endpoint), ("status", str(status_code))))
+        self.observe("scheduler_http_request_duration_seconds", (("endpoint", endpoint),), seconds)
+    
+    def record_stats(self, stats):
+        """Stats listener for handler: phase timings and solver statistics of one solve."""
+        if stats["cached"]:
+            self.increment("scheduler_cache_hits_total")
+        for phase, seconds in stats["phases"].items():
+            self.observe("scheduler_phase_duration_seconds", (("phase", phase),), seconds)
+        self.observe("scheduler_handler_duration_seconds", (), stats["total_seconds"])
+        solver = stats["solver"]
+        if solver:
+            self.increment("scheduler_solves_total", (("status", solver["status"]),))
+            self.increment("scheduler_solver_conflicts_total", value=solver["conflicts"])
+            self.increment("scheduler_solver_branches_total", value=solver["branches"])
+        if stats["model"]:
+            with self.lock:
+                self.last_model = dict(stats["model"])
+    
+    def render(self, gauges):
+        """Return all metrics plus the given {name: value} gauges as Prometheus text."""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+        
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value:g}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), (buckets, total, count) in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(self.LATENCY_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {bucket_count}")
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{label_text(labels)} {total:g}")
+                    lines.append(f"{name}_count{label_text(labels)} {count}")
+            gauges = dict(gauges, **{f"scheduler_last_model_{key}": value for key, value in self.last_model.items()})
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class StaticFileCache:
+    """In-memory copies of static files, refreshed when a file's mtime or size changes."""
+    
+    def __init__(self):
+        self.files = {}  # {path: (mtime, size, content_type, etag, last_modified, body)}
+        self.lock = threading.Lock()
+    
+    def get(self, path):
+        """Return (content_type, etag, last_modified, body) for a file path."""
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.files.get(path)
+            if entry is not None and entry[:2] == (stat.st_mtime, stat.st_size):
+                return entry[2:]
+        
+        with open(path, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        with self.lock:
+            self.files[path] = (stat.st_mtime, stat.st_size, content_type, etag, last_modified, body)
+        return content_type, etag, last_modified, body
+
 
 class Handler(http.server.SimpleHTTPRequestHandler):
     """Custom request handler with directory override."""
@@ -36,41 +191,134 @@ class Handler(http.server.SimpleHTTPRequestHandler):
         """Print colorized log message."""
         print(message)
     
+    def send_response(self, code, message=None):
+        """Remember the status code so API requests can be counted in the metrics."""
+        self.response_status = code
+        super().send_response(code, message)
+    
+    def send_json(self, status_code, body, headers=None):
+        """Send a JSON response; body may be a dict or an already encoded JSON string."""
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')  # For CORS
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+    
+    def read_json(self):
+        """Read and decode the JSON request body."""
+        content_length = int(self.headers['Content-Length'])
+        return json.loads(self.rfile.read(content_length).decode('utf-8'))
+    
+    def do_GET(self):
+        """Serve job status and server gauges from the API, everything else as static files."""
+        path = urlparse(self.path).path
+        if path.startswith(JOBS_PATH + '/'):
+            job = self.server.job_manager.get(path[len(JOBS_PATH) + 1:])
+            if job is None:
+                self.send_json(404, {"error": "Job not found"})
+            else:
+                self.send_json(200, job)
+        elif path == '/api/health':
+            self.send_json(200, self.server_gauges())
+        elif path == '/metrics':
+            body = self.server.metrics.render(
+                {f"scheduler_{name}": value for name, value in self.server_gauges().items()}
+            ).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.serve_static()
+    
+    def server_gauges(self):
+        gauges = self.server.admission.gauges()
+        gauges["pending_jobs"] = self.server.job_manager.pending
+        return gauges
+    
+    def serve_static(self):
+        """Serve regular files from memory with ETag revalidation; fall back for anything else."""
+        file_path = self.translate_path(self.path)
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, 'index.html')
+        if not os.path.isfile(file_path):
+            super().do_GET()
+            return
+        
+        content_type, etag, last_modified, body = self.server.static_files.get(file_path)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def submit_job(self):
+        """Queue a schedule payload on the worker pool and return its job id immediately."""
+        try:
+            event = self.read_json()
+        except (TypeError, ValueError) as e:
+            self.send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+        
+        try:
+            job_id = self.server.job_manager.submit(event)
+        except JobQueueFull as e:
+            self.send_json(429, {"error": f"Too many pending jobs: {e}"}, {'Retry-After': str(RETRY_AFTER_SECONDS)})
+            return
+        
+        self.send_json(202, {
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"{JOBS_PATH}/{job_id}"
+        }, {'Location': f"{JOBS_PATH}/{job_id}"})
+    
     def do_POST(self):
-        """Handle POST requests for the API endpoint."""
-        if self.path == '/api/schedule':
-            # Get content length from header
-            content_length = int(self.headers['Content-Length'])
-            # Read the data
-            post_data = self.rfile.read(content_length)
-            
-            # Parse JSON data
+        """Handle POST requests for the API endpoints and record their latency."""
+        start = time.perf_counter()
+        self.response_status = None
+        try:
+            self.route_post()
+        finally:
+            if self.path in ('/api/schedule', STREAM_PATH, JOBS_PATH):
+                self.server.metrics.record_request(self.path, self.response_status, time.perf_counter() - start)
+    
+    def route_post(self):
+        if self.path == JOBS_PATH:
+            self.submit_job()
+        elif self.path in ('/api/schedule', STREAM_PATH):
+            # Refuse instead of piling up sockets when too many solves are waiting
+            if not self.server.admission.acquire():
+                self.send_json(429, {"error": "Too many schedule requests, please retry later"},
+                               {'Retry-After': str(RETRY_AFTER_SECONDS)})
+                return
             try:
-                event = json.loads(post_data.decode('utf-8'))
-                # Call the handler function from index.py
-                result = handler(event, {})
-                
-                # Get status code from result or default to 200
-                status_code = result.get('statusCode', 200)
-                
-                # Send response
-                self.send_response(status_code)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')  # For CORS
-                self.end_headers()
-                
-                # Send the response body
-                if isinstance(result.get('body'), str):
-                    self.wfile.write(result['body'].encode('utf-8'))
+                if self.path == STREAM_PATH:
+                    self.stream_schedule()
                 else:
-                    self.wfile.write(json.dumps(result.get('body', {})).encode('utf-8'))
-                
-            except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": str(e)}).encode('utf-8'))
+                    self.solve_schedule()
+            finally:
+                self.server.admission.release()
+        elif self.path.startswith(STREAM_PATH + '/') and self.path.endswith('/cancel'):
+            cancel_event = self.server.streams.get(self.path[len(STREAM_PATH) + 1:-len('/cancel')])
+            if cancel_event is None:
+                self.send_json(404, {"error": "Stream not found"})
+            else:
+                cancel_event.set()
+                self.send_json(202, {"status": "cancelling"})
         else:
             # Not an API endpoint, return 404
             self.send_response(404)
@@ -78,6 +326,107 @@ class Handler(http.server.SimpleHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({"error": "Not found"}).encode('utf-8'))
     
+    def solve_schedule(self):
+        """Run a synchronous solve for /api/schedule."""
+        # Get content length from header
+        content_length = int(self.headers['Content-Length'])
+        # Read the data
+        post_data = self.rfile.read(content_length)
+        
+        # Parse JSON data
+        try:
+            event = json.loads(post_data.decode('utf-8'))
+            # Call the handler function from index.py
+            result = handler(event, {'stats_listener': self.server.metrics.record_stats})
+            
+            # Get status code from result or default to 200
+            status_code = result.get('statusCode', 200)
+            
+            # Send response
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')  # For CORS
+            self.end_headers()
+            
+            # Send the response body
+            if isinstance(result.get('body'), str):
+                self.wfile.write(result['body'].encode('utf-8'))
+            else:
+                self.wfile.write(json.dumps(result.get('body', {})).encode('utf-8'))
+            
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": str(e)}).encode('utf-8'))
+    
+    def send_event(self, event, data):
+        """Write one Server-Sent Event."""
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+    
+    def stream_schedule(self):
+        """Solve like /api/schedule, streaming every improving solution as a Server-Sent Event.
+        
+        Events: "started" (stream id), "solution" (objective, bound, elapsed time and lesson diff)
+        and a final "result" with the status code and response body of the solve. POSTing to
+        /api/schedule/stream/{id}/cancel, or closing the connection, stops the search early; the
+        result then holds the best timetable found so far.
+        """
+        try:
+            event = self.read_json()
+        except (TypeError, ValueError) as e:
+            self.send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+        
+        stream_id = uuid.uuid4().hex
+        cancel_event = threading.Event()
+        events = queue.Queue()
+        context = {
+            'solution_listener': lambda progress: events.put(('solution', progress)),
+            'cancel_event': cancel_event,
+            'stats_listener': self.server.metrics.record_stats
+        }
+        
+        def solve():
+            try:
+                result = handler(event, context)
+                body = json.loads(result.get('body') or '{}')
+                events.put(('result', {"status_code": result.get('statusCode', 200), "body": body}))
+            except Exception as e:
+                events.put(('result', {"status_code": 500, "body": {"error": str(e)}}))
+        
+        self.server.streams[stream_id] = cancel_event
+        worker = threading.Thread(target=solve, daemon=True)
+        worker.start()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.send_event('started', {"stream_id": stream_id, "cancel_url": f"{STREAM_PATH}/{stream_id}/cancel"})
+            
+            while True:
+                try:
+                    name, data = events.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Comment line: keeps proxies from timing out and detects closed connections
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                self.send_event(name, data)
+                if name == 'result':
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            print(f"Stream {stream_id} closed by the client, cancelling the solve")
+            cancel_event.set()
+        finally:
+            # Keep the admission slot until the solver has actually stopped
+            worker.join()
+            self.server.streams.pop(stream_id, None)
+    
     def do_OPTIONS(self):
         """Handle preflight CORS requests."""
         self.send_response(200)
@@ -88,11 +437,22 @@ class Handler(http.server.SimpleHTTPRequestHandler):
 
 def run_server():
     """Start the HTTP server and open browser."""
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+    # One thread per connection, so static files and job polls are served while solves run
+    with http.server.ThreadingHTTPServer(("", PORT), Handler) as httpd:
+        httpd.daemon_threads = True
+        httpd.job_manager = create_job_manager(DIRECTORY)
+        httpd.admission = SolveAdmission(MAX_CONCURRENT_SOLVES, MAX_QUEUED_SOLVES)
+        httpd.static_files = StaticFileCache()
+        httpd.streams = {}  # {stream_id: cancel event} of running streamed solves
+        httpd.metrics = Metrics()
         url = f"http://localhost:{PORT}/"
         print(f"\033[1;36m=== School Scheduler Development Server ===\033[0m")
         print(f"\033[1;32mServer running at: \033[1;34m{url}\033[0m")
         print(f"\033[1;33mAPI endpoint: \033[1;34m{url}api/schedule\033[0m")
+        print(f"\033[1;33mJob endpoint: \033[1;34m{url}api/schedule/jobs\033[0m")
+        print(f"\033[1;33mStream endpoint: \033[1;34m{url}api/schedule/stream\033[0m")
+        print(f"\033[1;33mHealth: \033[1;34m{url}api/health\033[0m")
+        print(f"\033[1;33mMetrics: \033[1;34m{url}metrics\033[0m")
         print(f"\033[1;33mPress Ctrl+C to stop.\033[0m\n")
         
         # Open browser automatically
@@ -103,6 +463,8 @@ def run_server():
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n\033[1;33mServer stopped.\033[0m")
+        finally:
+            httpd.job_manager.shutdown()
 
 if __name__ == "__main__":
     run_server() 
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Cache of compiled hard-constraint models.
+
+The variables and hard constraints of a SchoolScheduler model only depend on part of the input.
+Requests that differ only in soft terms (teacher preferences, class rankings) or solver settings
+can reuse a cached model and only rebuild the objective.
+"""
+import os
+
+from solution_cache import SolutionCache, canonical_input_hash
+
+# SchoolScheduler attributes that shape variables or hard constraints
+HARD_INPUT_ATTRIBUTES = (
+    "teachers", "subjects", "classes", "rooms", "days", "periods",
+    "solve_mode", "room_pooling", "teacher_assignment", "symmetry_breaking",
+    "teacher_subjects", "teacher_classes", "class_subjects", "subject_constraints",
+    "fixed_assignments", "room_suitability", "teacher_unavailability", "consecutive_periods",
+    "break_periods"
+)
+
+
+def hard_model_key(scheduler):
+    """Hash of the scheduler inputs that affect the hard part of the model."""
+    return canonical_input_hash({name: getattr(scheduler, name) for name in HARD_INPUT_ATTRIBUTES})
+
+
+class CompiledModel:
+    """A hard-constraint CpModel plus what is needed to map its variables back to schedule keys."""
+
+    def __init__(self, model, interners, room_pools, var_columns, var_indexes, lesson_var_indexes,
+                 taught_var_indexes, assignment_var_indexes, teacher_candidates, model_info, build_seconds):
+        self.model = model                                    # CpModel without objective or hints
+        self.interners = interners                            # Entity ids the columns refer to
+        self.room_pools = room_pools                          # (room_pools, room_pool_of, equivalent_pools)
+        self.var_columns = var_columns                        # Teacher, class, subject, slot and pool id per schedule var
+        self.var_indexes = var_indexes                        # Proto index per schedule var
+        self.lesson_var_indexes = lesson_var_indexes          # [(lesson aggregate key, proto index)]
+        self.taught_var_indexes = taught_var_indexes          # [(taught aggregate key, proto index)]
+        self.assignment_var_indexes = assignment_var_indexes  # [(teacher assignment key, proto index)]
+        self.teacher_candidates = teacher_candidates
+        self.model_info = model_info
+        self.build_seconds = build_seconds
+
+
+_model_cache = None
+
+
+def get_model_cache():
+    """Return the process-wide compiled-model cache, or None if SCHEDULER_MODEL_CACHE_SIZE is 0.
+
+    Models stay in memory only; SCHEDULER_MODEL_CACHE_TTL sets their lifetime in seconds.
+    """
+    global _model_cache
+    if _model_cache is None:
+        max_entries = int(os.environ.get("SCHEDULER_MODEL_CACHE_SIZE", "8"))
+        if max_entries <= 0:
+            return None
+        _model_cache = SolutionCache(
+            max_entries=max_entries,
+            ttl_seconds=float(os.environ.get("SCHEDULER_MODEL_CACHE_TTL", "3600"))
+        )
+    return _model_cache
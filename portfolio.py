@@ -0,0 +1,186 @@
+"""
+Solver portfolio.
+
+CP-SAT run times vary a lot between seeds and search settings on the same instance. A portfolio
+solves one model with several differently parameterised CpSolvers, each in its own process, and
+keeps either the first feasible result or the best result within the time limit.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from ortools.sat.python import cp_model
+
+# "first" returns the first feasible result, "best" the best objective found within the time limit
+PORTFOLIO_RESULTS = ("first", "best")
+
+# Portfolio members in the order they are picked. "hint": False drops the warm-start hint,
+# every other key except "name" is a CP-SAT SatParameters field.
+PORTFOLIO_MEMBERS = (
+    {"name": "default"},
+    {"name": "fixed_search", "search_branching": cp_model.FIXED_SEARCH},
+    {"name": "quick_restart", "search_branching": cp_model.PORTFOLIO_WITH_QUICK_RESTART_SEARCH},
+    {"name": "no_lp", "linearization_level": 0},
+    {"name": "full_lp", "linearization_level": 2},
+    {"name": "seed_1", "random_seed": 1},
+    {"name": "seed_2_no_hint", "random_seed": 2, "hint": False},
+    {"name": "pseudo_cost", "search_branching": cp_model.PSEUDO_COST_SEARCH},
+)
+PORTFOLIO_MEMBERS_BY_NAME = {member["name"]: member for member in PORTFOLIO_MEMBERS}
+
+# Seconds a member may take beyond the time limit (process start-up, model parsing) before it is killed
+MEMBER_GRACE_SECONDS = 10.0
+
+
+def resolve_portfolio(requested=None):
+    """Validate a portfolio request and return {"members": [names], "result": mode}, or None if disabled.
+
+    requested may be true (default portfolio), a member count, or a dict with "size" or "members"
+    and "result". SCHEDULER_PORTFOLIO_SIZE sets the default size (default: one member per core, at
+    least 2). Every member is a process, so sizes are capped at SCHEDULER_MAX_WORKERS like the
+    solver's workers. Raises ValueError for unknown members or result modes.
+    """
+    if not requested:
+        return None
+    if requested is True:
+        requested = {}
+    elif isinstance(requested, int):
+        requested = {"size": requested}
+    elif not isinstance(requested, dict):
+        raise ValueError("portfolio must be true, a member count or an object")
+
+    result = requested.get("result", "best")
+    if result not in PORTFOLIO_RESULTS:
+        raise ValueError(f"Unknown portfolio result '{result}', expected one of {', '.join(PORTFOLIO_RESULTS)}")
+
+    members = requested.get("members")
+    if members is None:
+        default_size = int(os.environ.get("SCHEDULER_PORTFOLIO_SIZE", max(2, os.cpu_count() or 1)))
+        size = int(requested.get("size", default_size))
+        if not 1 <= size <= len(PORTFOLIO_MEMBERS):
+            raise ValueError(f"portfolio size must be between 1 and {len(PORTFOLIO_MEMBERS)}")
+        max_workers = int(os.environ.get("SCHEDULER_MAX_WORKERS") or os.cpu_count() or 1)
+        members = [member["name"] for member in PORTFOLIO_MEMBERS[:min(size, max_workers)]]
+    else:
+        unknown = [name for name in members if name not in PORTFOLIO_MEMBERS_BY_NAME]
+        if unknown or not members:
+            raise ValueError(
+                f"Unknown portfolio members {unknown}, expected some of {', '.join(PORTFOLIO_MEMBERS_BY_NAME)}"
+            )
+
+    return {"members": list(members), "result": result}
+
+
+def run_portfolio_member(model_text, name, solver_params, stop_after_first, hinted, stop_event, results):
+    """Member-process entry point: solve the model with one member's parameters and report the result."""
+    # Imported here to avoid a circular import; index imports this module
+    from index import FirstSolutionTimer
+
+    member = PORTFOLIO_MEMBERS_BY_NAME[name]
+    model = cp_model.CpModel()
+    model.Proto().parse_text_format(model_text)
+    if hinted and not member.get("hint", True):
+        model.ClearHints()
+        hinted = False
+
+    solver = cp_model.CpSolver()
+    # The portfolio provides the parallelism, so each member runs one deterministic worker
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = solver_params["max_time_in_seconds"]
+    if solver_params["random_seed"] is not None:
+        solver.parameters.random_seed = solver_params["random_seed"]
+    if solver_params["relative_gap_limit"] is not None:
+        solver.parameters.relative_gap_limit = solver_params["relative_gap_limit"]
+    if hinted:
+        # Same as SchoolScheduler.solve: symmetry detection can stall on a complete hint
+        solver.parameters.symmetry_level = 0
+    solver.parameters.stop_after_first_solution = stop_after_first
+    for key, value in member.items():
+        if key not in ("name", "hint"):
+            setattr(solver.parameters, key, value)
+
+    def watch():
+        # Poll rather than wait(): a process Event blocks set() on waiters that were terminated
+        while not stop_event.is_set():
+            time.sleep(0.2)
+        solver.StopSearch()
+
+    threading.Thread(target=watch, daemon=True).start()
+    timer = FirstSolutionTimer()
+    status = solver.Solve(model, timer)
+    feasible = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    results.put({
+        "name": name,
+        "status": solver.StatusName(status),
+        "objective": solver.ObjectiveValue() if feasible else None,
+        "bound": solver.BestObjectiveBound() if feasible else None,
+        "wall_time": round(solver.WallTime(), 3),
+        "conflicts": solver.NumConflicts(),
+        "branches": solver.NumBranches(),
+        "first_solution_seconds": timer.first_solution_seconds,
+        "values": list(solver.ResponseProto().solution) if feasible else None
+    })
+
+
+def solve_portfolio(model, solver_params, portfolio, hinted=False, cancel_event=None):
+    """Solve model with every portfolio member in parallel processes.
+
+    Returns (winner, members): the winning member's result (None if no member found a solution),
+    whose "values" are indexed by proto variable index, and a summary of every member.
+    Remaining members are stopped once a winner is certain: the first feasible result in "first"
+    mode, an optimal or infeasible proof in "best" mode, or when cancel_event is set.
+    """
+    model_text = str(model.Proto())
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    stop_event = context.Event()
+    stop_after_first = portfolio["result"] == "first"
+    processes = {
+        name: context.Process(
+            target=run_portfolio_member,
+            args=(model_text, name, solver_params, stop_after_first, hinted, stop_event, results),
+            daemon=True
+        )
+        for name in portfolio["members"]
+    }
+    for process in processes.values():
+        process.start()
+
+    finished = []
+    deadline = time.monotonic() + solver_params["max_time_in_seconds"] + MEMBER_GRACE_SECONDS
+    try:
+        while len(finished) < len(processes) and time.monotonic() < deadline:
+            if cancel_event is not None and cancel_event.is_set() and not stop_event.is_set():
+                # Let every member report its best solution so far
+                print("Portfolio cancelled, keeping the best solution so far")
+                stop_event.set()
+                deadline = min(deadline, time.monotonic() + MEMBER_GRACE_SECONDS)
+            try:
+                result = results.get(timeout=0.2)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes.values()) and results.empty():
+                    break  # A member crashed without reporting
+                continue
+
+            finished.append(result)
+            print(f"Portfolio member {result['name']} finished: {result['status']}")
+            if result["status"] in ("OPTIMAL", "INFEASIBLE") or (stop_after_first and result["status"] == "FEASIBLE"):
+                break
+    finally:
+        stop_event.set()
+        for process in processes.values():
+            process.terminate()
+            process.join()
+
+    feasible = [result for result in finished if result["values"] is not None]
+    winner = None
+    if feasible:
+        # Earlier finishers win ties
+        winner = feasible[0] if stop_after_first else min(feasible, key=lambda result: result["objective"])
+
+    reported = {result["name"] for result in finished}
+    members = [{key: value for key, value in result.items() if key != "values"} for result in finished]
+    members.extend({"name": name, "status": "STOPPED"} for name in portfolio["members"] if name not in reported)
+    return winner, members
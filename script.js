@@ -3,6 +3,9 @@ let timetableData = null;
 let currentView = 'room';
 let currentEntity = '';
 
+// Cancel URL of the streamed solve in progress
+let activeSolveCancelUrl = null;
+
 // State for fixed assignments
 let fixedAssignments = [];
 
@@ -119,6 +122,7 @@ document.addEventListener('DOMContentLoaded', () => {
     });
     
     document.getElementById('generate-schedule').addEventListener('click', generateSchedule);
+    document.getElementById('stop-solve').addEventListener('click', stopSolve);
     document.getElementById('add-fixed-assignment').addEventListener('click', addFixedAssignment);
     
     // Add event listener for loading example data
@@ -919,12 +923,13 @@ function generateSchedule() {
     // Show loading spinner
     document.getElementById('loading-spinner').classList.remove('hidden');
     document.getElementById('generate-schedule').disabled = true;
+    showSolveProgress('Starting solver...');
     
     // Collect all form data
     const data = collectFormData();
     
-    // Call the API endpoint
-    fetch('/api/schedule', {
+    // Stream intermediate solutions; servers without the stream endpoint answer in one response
+    fetch('/api/schedule/stream', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -932,50 +937,29 @@ function generateSchedule() {
         body: JSON.stringify(data)
     })
     .then(response => {
+        if (response.status === 404) {
+            return requestSchedule(data);
+        }
         if (!response.ok) {
             return response.json().then(err => {
                 throw new Error(err.error || 'Failed to generate schedule');
             });
         }
-        return response.json();
+        return readScheduleStream(response);
     })
     .then(result => {
         // Hide loading spinner
         document.getElementById('loading-spinner').classList.add('hidden');
         document.getElementById('generate-schedule').disabled = false;
+        hideSolveProgress();
         
-        // Store the timetable data
-        timetableData = result;
-        
-        // Show the results step
-        showStep(5);
-        
-        // Initialize the timetable view
-        currentView = 'room';
-        if (timetableData.rooms && timetableData.rooms.length > 0) {
-            currentEntity = timetableData.rooms[0];
-        }
-        
-        // Populate the entity select
-        const viewEntitySelect = document.getElementById('view-entity-select');
-        viewEntitySelect.innerHTML = '';
-        timetableData.rooms.forEach(room => {
-            viewEntitySelect.innerHTML += `<option value="${room}">${room}</option>`;
-        });
-        
-        // Add event listener to switch entity
-        viewEntitySelect.addEventListener('change', function() {
-            currentEntity = this.value;
-            renderTimetable();
-        });
-        
-        // Render the timetable
-        renderTimetable();
+        showScheduleResult(result);
     })
     .catch(error => {
         // Hide loading spinner
         document.getElementById('loading-spinner').classList.add('hidden');
         document.getElementById('generate-schedule').disabled = false;
+        hideSolveProgress();
         
         // Show error message
         alert(`Error: ${error.message}`);
@@ -983,6 +967,129 @@ function generateSchedule() {
     });
 }
 
+// Solve in a single request, without progress updates
+function requestSchedule(data) {
+    return fetch('/api/schedule', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(err => {
+                throw new Error(err.error || 'Failed to generate schedule');
+            });
+        }
+        return response.json();
+    });
+}
+
+// Read Server-Sent Events from the stream endpoint until the final result arrives
+async function readScheduleStream(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            throw new Error('Connection closed before the schedule was finished');
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const message = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let payload = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    payload += line.slice(5).trim();
+                }
+            });
+            if (!payload) {
+                continue;  // keep-alive comment
+            }
+            
+            const data = JSON.parse(payload);
+            if (event === 'started') {
+                activeSolveCancelUrl = data.cancel_url;
+                document.getElementById('stop-solve').disabled = false;
+            } else if (event === 'solution') {
+                showSolveProgress(
+                    `Solution ${data.solution} after ${data.elapsed_seconds.toFixed(1)}s: ` +
+                    `penalty ${data.objective} (best possible ${data.bound}), ` +
+                    `${data.added.length + data.removed.length} lessons changed`
+                );
+            } else if (event === 'result') {
+                reader.cancel();
+                if (data.status_code >= 400) {
+                    throw new Error(data.body.error || 'Failed to generate schedule');
+                }
+                return data.body;
+            }
+        }
+    }
+}
+
+// Stop the running solve; the stream then delivers the best timetable found so far
+function stopSolve() {
+    if (!activeSolveCancelUrl) {
+        return;
+    }
+    document.getElementById('stop-solve').disabled = true;
+    showSolveProgress('Stopping solver, keeping the best timetable so far...');
+    fetch(activeSolveCancelUrl, { method: 'POST' })
+    .catch(error => console.error('Error stopping solve:', error));
+}
+
+function showSolveProgress(text) {
+    document.getElementById('solve-progress-text').textContent = text;
+    document.getElementById('solve-progress').classList.remove('hidden');
+}
+
+function hideSolveProgress() {
+    activeSolveCancelUrl = null;
+    document.getElementById('stop-solve').disabled = true;
+    document.getElementById('solve-progress').classList.add('hidden');
+}
+
+function showScheduleResult(result) {
+    // Store the timetable data
+    timetableData = result;
+    
+    // Show the results step
+    showStep(5);
+    
+    // Initialize the timetable view
+    currentView = 'room';
+    if (timetableData.rooms && timetableData.rooms.length > 0) {
+        currentEntity = timetableData.rooms[0];
+    }
+    
+    // Populate the entity select
+    const viewEntitySelect = document.getElementById('view-entity-select');
+    viewEntitySelect.innerHTML = '';
+    timetableData.rooms.forEach(room => {
+        viewEntitySelect.innerHTML += `<option value="${room}">${room}</option>`;
+    });
+    
+    // Add event listener to switch entity
+    viewEntitySelect.addEventListener('change', function() {
+        currentEntity = this.value;
+        renderTimetable();
+    });
+    
+    // Render the timetable
+    renderTimetable();
+}
+
 // Display functions
 function switchView(view) {
     currentView = view;
@@ -0,0 +1,150 @@
+"""
+Content-addressed cache for schedule responses.
+
+Identical scheduling inputs always produce an equally valid timetable, so the handler can
+return a stored response instead of solving again. Inputs are hashed after normalization,
+entries live in a bounded in-memory LRU and can optionally be persisted to sqlite.
+"""
+from collections import OrderedDict
+from contextlib import closing
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Payload keys whose list values are sets: their order does not change the problem
+SET_VALUED_KEYS = {
+    "teachers", "subjects", "classes", "rooms", "break_periods", "fixed_assignments"
+}
+
+# Payload keys mapping an entity to a set-valued list
+SET_VALUED_MAPPINGS = {
+    "teacher_subjects", "teacher_classes", "room_suitability", "teacher_unavailability", "teacher_preferences"
+}
+
+
+def _sorted_list(values):
+    """Sort a list of JSON values by their canonical JSON encoding."""
+    return sorted(values, key=lambda value: json.dumps(value, sort_keys=True))
+
+
+def normalize_input(data):
+    """Return a canonical copy of a schedule payload.
+
+    Set-valued lists are sorted and tuples ([day, period], [day, period, score]) become plain lists,
+    the way handler converts them. days and periods keep their order because it defines which
+    periods are consecutive.
+    """
+    normalized = {}
+    for key, value in data.items():
+        if key in SET_VALUED_KEYS and isinstance(value, list):
+            value = _sorted_list([list(item) if isinstance(item, tuple) else item for item in value])
+        elif key in SET_VALUED_MAPPINGS and isinstance(value, dict):
+            value = {
+                entity: _sorted_list([list(item) if isinstance(item, tuple) else item for item in items])
+                for entity, items in value.items()
+            }
+        normalized[key] = value
+    return normalized
+
+
+def canonical_input_hash(data):
+    """SHA-256 of the normalized payload, used as the cache key."""
+    encoded = json.dumps(normalize_input(data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    """Bounded LRU of schedule responses with TTL eviction and optional sqlite persistence."""
+
+    def __init__(self, max_entries=128, ttl_seconds=3600.0, db_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.entries = OrderedDict()  # {key: (created_at, result)}
+        self.lock = threading.Lock()
+
+        if self.db_path:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, created_at REAL, result TEXT)"
+                )
+
+    def _connect(self):
+        # Used as "with closing(self._connect()) as conn, conn:", since the connection's own
+        # context manager only commits or rolls back and never closes it
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _is_expired(self, created_at):
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached result for key, or None if it is missing or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                created_at, result = entry
+                if not self._is_expired(created_at):
+                    self.entries.move_to_end(key)
+                    return result
+                del self.entries[key]
+
+        if not self.db_path:
+            return None
+
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT created_at, result FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            created_at, encoded = row
+            if self._is_expired(created_at):
+                conn.execute("DELETE FROM solutions WHERE key = ?", (key,))
+                return None
+
+        result = json.loads(encoded)
+        self._remember(key, created_at, result)
+        return result
+
+    def put(self, key, result):
+        """Store a result under key, evicting the least recently used entries beyond max_entries."""
+        created_at = time.time()
+        self._remember(key, created_at, result)
+        if self.db_path:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO solutions (key, created_at, result) VALUES (?, ?, ?)",
+                    (key, created_at, json.dumps(result))
+                )
+                if self.ttl_seconds > 0:
+                    conn.execute("DELETE FROM solutions WHERE created_at < ?", (created_at - self.ttl_seconds,))
+
+    def _remember(self, key, created_at, result):
+        with self.lock:
+            self.entries[key] = (created_at, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+_solution_cache = None
+
+
+def get_solution_cache():
+    """Return the process-wide cache configured from the environment, or None if disabled.
+
+    SCHEDULER_CACHE_SIZE sets the LRU size (0 disables caching), SCHEDULER_CACHE_TTL the entry
+    lifetime in seconds and SCHEDULER_CACHE_DB an optional sqlite file for persistence.
+    """
+    global _solution_cache
+    if _solution_cache is None:
+        max_entries = int(os.environ.get("SCHEDULER_CACHE_SIZE", "128"))
+        if max_entries <= 0:
+            return None
+        _solution_cache = SolutionCache(
+            max_entries=max_entries,
+            ttl_seconds=float(os.environ.get("SCHEDULER_CACHE_TTL", "3600")),
+            db_path=os.environ.get("SCHEDULER_CACHE_DB") or None
+        )
+    return _solution_cache
@@ -0,0 +1,23 @@
+import json
+import os
+
+import pytest
+
+from index import handler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def example2():
+    """The example2.json payload with a short, single-worker solve and no caches."""
+    with open(os.path.join(ROOT, "example2.json")) as f:
+        data = json.load(f)
+    data.update(use_cache=False, solver={"max_time_in_seconds": 2, "num_workers": 1, "random_seed": 0})
+    return data
+
+
+def call(data):
+    """Post data to the handler and return (status code, parsed body)."""
+    response = handler({"body": json.dumps(data)}, None)
+    return response["statusCode"], json.loads(response["body"])
@@ -0,0 +1,123 @@
+import pytest
+
+from feasibility import _bipartite_shortfall, check_basic_feasibility
+
+
+def payload(**overrides):
+    """Two classes, three teachers and two rooms over 2 days of 3 periods; feasible as given."""
+    data = {
+        "teachers": ["T1", "T2", "T3"],
+        "subjects": ["Math", "English"],
+        "classes": ["A", "B"],
+        "rooms": ["R1", "R2"],
+        "days": ["Mon", "Tue"],
+        "periods": ["P1", "P2", "P3"],
+        "teacher_subjects": {"T1": ["Math"], "T2": ["Math"], "T3": ["English"]},
+        "teacher_classes": {"T1": ["A", "B"], "T2": ["A", "B"], "T3": ["A"]},
+        "class_subjects": {"A": {"Math": 2, "English": 2}, "B": {"Math": 3}},
+        "subject_constraints": {"Math": [0, 2], "English": [0, 2]},
+    }
+    data.update(overrides)
+    return data
+
+
+def issue_types(data):
+    return [issue["type"] for issue in check_basic_feasibility(data)]
+
+
+def test_feasible_payload_has_no_issues():
+    assert check_basic_feasibility(payload()) == []
+
+
+def test_teacher_supply():
+    # Both Math teachers can teach both classes, but have only 2 free periods each for 5 lessons
+    busy = [["Mon", "P1"], ["Mon", "P2"], ["Mon", "P3"], ["Tue", "P1"]]
+    issues = check_basic_feasibility(payload(teacher_unavailability={"T1": busy, "T2": busy}))
+    assert [issue["type"] for issue in issues] == ["teacher_supply"]
+    assert sorted(issues[0]["teachers"]) == ["T1", "T2"]
+    assert issues[0]["required_periods"] == 5
+    assert issues[0]["available_periods"] == 4
+
+
+def test_room_supply():
+    # Math fits only in R1, which has 6 periods for 7 lessons
+    data = payload(
+        class_subjects={"A": {"Math": 2, "English": 2}, "B": {"Math": 5}},
+        subject_constraints={"Math": [0, 3], "English": [0, 2]},
+        room_suitability={"Math": ["R1"]}
+    )
+    issues = check_basic_feasibility(data)
+    assert [issue["type"] for issue in issues] == ["room_supply"]
+    assert issues[0]["subjects"] == ["Math"]
+    assert issues[0]["rooms"] == ["R1"]
+
+
+def test_teacher_overload():
+    # T3 is the only English teacher and has one free period for two lessons
+    busy = [["Mon", "P1"], ["Mon", "P2"], ["Mon", "P3"], ["Tue", "P1"], ["Tue", "P2"]]
+    issues = check_basic_feasibility(payload(teacher_unavailability={"T3": busy}))
+    assert [issue["type"] for issue in issues] == ["teacher_overload"]
+    assert issues[0]["teacher"] == "T3"
+
+
+def test_teacher_overload_counts_fixed_assignments():
+    busy = [["Mon", "P1"], ["Mon", "P2"], ["Mon", "P3"], ["Tue", "P1"]]
+    data = payload(
+        teacher_unavailability={"T1": busy},
+        fixed_assignments=[{"teacher": "T1", "class": "B", "subject": "Math"}]
+    )
+    assert issue_types(data) == ["teacher_overload"]
+
+
+@pytest.mark.parametrize("breaks, limit", [([], "3 unbroken"), ([["Mon", "P2"], ["Tue", "P2"]], "1 unbroken")])
+def test_consecutive_block_too_long(breaks, limit):
+    data = payload(consecutive_periods={"Math": 4}, subject_constraints={}, break_periods=breaks)
+    issues = [issue for issue in check_basic_feasibility(data) if issue["type"] == "consecutive_block_too_long"]
+    assert {issue["class"] for issue in issues} == {"A", "B"}
+    assert all(limit in issue["explanation"] for issue in issues)
+
+
+def test_conflicting_fixed_assignments():
+    data = payload(fixed_assignments=[
+        {"teacher": "T1", "class": "A", "subject": "Math"},
+        {"teacher": "T2", "class": "A", "subject": "Math"},
+    ])
+    issues = check_basic_feasibility(data)
+    assert [issue["type"] for issue in issues] == ["conflicting_fixed_assignments"]
+    assert issues[0]["teachers"] == ["T1", "T2"]
+
+
+def test_fixed_assignment_to_unqualified_teacher_is_ignored():
+    data = payload(fixed_assignments=[{"teacher": "T3", "class": "B", "subject": "Math"}])
+    assert check_basic_feasibility(data) == []
+
+
+def test_bipartite_shortfall_returns_hall_violator():
+    demand = {"a": 2, "b": 2, "c": 1}
+    capacity = {"x": 1, "y": 2, "z": 5}
+    edges = {"a": ["x", "y"], "b": ["x", "y"], "c": ["z"]}
+    lefts, rights = _bipartite_shortfall(demand, capacity, edges)
+    assert sorted(lefts) == ["a", "b"]
+    assert sorted(rights) == ["x", "y"]
+
+
+def test_bipartite_shortfall_none_when_demand_fits():
+    demand = {"a": 2, "b": 2}
+    capacity = {"x": 1, "y": 3}
+    assert _bipartite_shortfall(demand, capacity, {"a": ["x", "y"], "b": ["y"]}) is None
+
+
+def test_daily_limits_ignore_days_that_are_all_breaks():
+    tuesday_off = [["Tue", "P1"], ["Tue", "P2"], ["Tue", "P3"]]
+    # One open day holds a single Math period a day, so the minimum fits and the maximum caps B at 2
+    data = payload(
+        class_subjects={"A": {"Math": 1, "English": 2}, "B": {"Math": 3}},
+        subject_constraints={"Math": [1, 2], "English": [0, 2]},
+        break_periods=tuesday_off
+    )
+    issues = check_basic_feasibility(data)
+    assert [issue["type"] for issue in issues] == ["subject_max_daily_too_low"]
+    assert issues[0]["class"] == "B"
+
+    data["class_subjects"]["B"]["Math"] = 2
+    assert check_basic_feasibility(data) == []
@@ -0,0 +1,47 @@
+import pytest
+
+import index
+from conftest import call
+
+
+def test_unknown_room_in_suitability_is_ignored(example2):
+    suitability = {subject: rooms + ["R999"] for subject, rooms in example2["room_suitability"].items()}
+    status, body = call(dict(example2, room_suitability=suitability))
+    assert status == 200
+    rooms = {lesson["room"] for lessons in body["solution"].values() for lesson in lessons}
+    assert rooms <= set(example2["rooms"])
+
+
+def test_unknown_room_in_suitability_two_stage(example2):
+    suitability = dict(example2["room_suitability"], Science=["Lab1", "R999"])
+    status, _ = call(dict(example2, room_suitability=suitability, solve_mode="two_stage"))
+    assert status == 200
+
+
+@pytest.mark.parametrize("flag", ["teacher_assignment", "room_pooling", "debug_names", "symmetry_breaking"])
+@pytest.mark.parametrize("value", ["false", 0, 1])
+def test_handler_rejects_non_boolean_flags(example2, flag, value):
+    status, body = call(dict(example2, **{flag: value}))
+    assert status == 400
+    assert flag in body["error"]
+
+
+def test_validate_rejects_non_boolean_teacher_assignment(example2):
+    status, body = call(dict(example2, validate={"Mon": {}}, teacher_assignment="false"))
+    assert status == 400
+    assert "teacher_assignment" in body["error"]
+
+
+@pytest.mark.parametrize("value", [0, -1, "many", None])
+def test_handler_rejects_invalid_room_workers(example2, value):
+    status, body = call(dict(example2, room_workers=value))
+    assert status == 400
+    assert "room_workers" in body["error"]
+
+
+def test_room_workers_capped_at_max_workers(example2, monkeypatch):
+    workers = []
+    monkeypatch.setenv("SCHEDULER_MAX_WORKERS", "2")
+    monkeypatch.setattr(index.SchoolScheduler, "solve", lambda self: workers.append(self.room_workers))
+    call(dict(example2, room_workers=64, solve_mode="two_stage"))
+    assert workers == [2]
@@ -0,0 +1,67 @@
+import pytest
+
+import index
+from conftest import call
+from solution_cache import SolutionCache
+
+
+@pytest.fixture
+def cached(example2, monkeypatch):
+    """example2 with the model cache on: a fresh in-memory model cache and no solution cache."""
+    model_cache = SolutionCache(max_entries=8, ttl_seconds=0)
+    monkeypatch.setattr(index, "get_model_cache", lambda: model_cache)
+    monkeypatch.setattr(index, "get_solution_cache", lambda: None)
+    return dict(example2, use_cache=True)
+
+
+def assert_valid(data, body):
+    scheduler = index.SchoolScheduler(
+        data["teachers"], data["subjects"], data["classes"], data["rooms"], data["days"], data["periods"]
+    )
+    index.configure_scheduler(scheduler, data)
+    result = index.validate_timetable(scheduler, scheduler.parse_solution(body))
+    assert result["is_valid"], result["violations"]
+
+
+def test_objective_only_change_hits_the_model_cache(cached):
+    status, body = call(cached)
+    assert status == 200
+    assert body["model_info"]["model_cache"]["hit"] is False
+    changed = dict(cached, class_rankings={class_id: 5 for class_id in cached["classes"]})
+    status, body = call(changed)
+    assert status == 200
+    assert body["model_info"]["model_cache"]["hit"] is True
+    assert_valid(changed, body)
+
+
+def test_cache_hit_with_reordered_rooms(cached):
+    status, _ = call(cached)
+    assert status == 200
+    reordered = dict(
+        cached,
+        rooms=["R103", "R102", "R101", "Lab1", "Gym"],
+        teacher_preferences={"Smith": [["Mon", "P1", 3]]}
+    )
+    status, body = call(reordered)
+    assert status == 200, body
+    assert body["model_info"]["model_cache"]["hit"] is True
+    assert_valid(reordered, body)
+
+
+def test_cache_hit_with_every_entity_list_reordered(cached):
+    status, _ = call(cached)
+    assert status == 200
+    reordered = dict(
+        cached,
+        teachers=list(reversed(cached["teachers"])),
+        subjects=list(reversed(cached["subjects"])),
+        classes=list(reversed(cached["classes"])),
+        rooms=list(reversed(cached["rooms"])),
+        teacher_subjects={teacher: list(reversed(subjects)) for teacher, subjects in cached["teacher_subjects"].items()},
+        teacher_classes={teacher: list(reversed(classes)) for teacher, classes in cached["teacher_classes"].items()},
+        class_rankings={class_id: 5 for class_id in cached["classes"]}
+    )
+    status, body = call(reordered)
+    assert status == 200, body
+    assert body["model_info"]["model_cache"]["hit"] is True
+    assert_valid(reordered, body)
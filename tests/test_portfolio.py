@@ -0,0 +1,37 @@
+from conftest import call
+from portfolio import resolve_portfolio
+
+
+def run_portfolio(example2, result):
+    data = dict(example2, stats=True, portfolio={"members": ["default", "no_lp"], "result": result})
+    status, body = call(data)
+    assert status == 200, body
+    assert body["portfolio_info"]["result"] == result
+    return body
+
+
+def test_first_mode_keeps_the_first_feasible_member(example2):
+    body = run_portfolio(example2, "first")
+    members = body["portfolio_info"]["members"]
+    # Members are listed in the order they finished; the rest were stopped
+    assert members[0]["status"] in ("FEASIBLE", "OPTIMAL")
+    assert body["portfolio_info"]["winner"] == members[0]["name"]
+    assert {member["name"] for member in members} == {"default", "no_lp"}
+
+
+def test_best_mode_keeps_the_best_objective(example2):
+    body = run_portfolio(example2, "best")
+    members = {member["name"]: member for member in body["portfolio_info"]["members"]}
+    finished = [member for member in members.values() if member.get("objective") is not None]
+    winner = members[body["portfolio_info"]["winner"]]
+    assert winner["objective"] == min(member["objective"] for member in finished)
+    assert body["stats"]["solver"]["objective"] == winner["objective"]
+
+
+def test_portfolio_size_is_capped_at_max_workers(monkeypatch):
+    monkeypatch.setenv("SCHEDULER_MAX_WORKERS", "3")
+    assert len(resolve_portfolio(True)["members"]) <= 3
+    assert len(resolve_portfolio(8)["members"]) == 3
+    assert len(resolve_portfolio({"size": 2})["members"]) == 2
+    monkeypatch.setenv("SCHEDULER_PORTFOLIO_SIZE", "6")
+    assert len(resolve_portfolio(True)["members"]) == 3
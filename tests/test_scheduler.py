@@ -0,0 +1,230 @@
+import pytest
+
+import index
+from conftest import call
+from index import SchoolScheduler, configure_scheduler
+from solution_cache import SolutionCache
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+
+# One class with 5 Math periods, at least one a day; T1 is fixed to it but away on Friday
+FIXED_TEACHER_AWAY = {
+    "teachers": ["T1", "T2"],
+    "subjects": ["Math"],
+    "classes": ["A"],
+    "rooms": ["R1"],
+    "days": DAYS,
+    "periods": ["P1", "P2"],
+    "teacher_subjects": {"T1": ["Math"], "T2": ["Math"]},
+    "teacher_classes": {"T1": ["A"], "T2": ["A"]},
+    "class_subjects": {"A": {"Math": 5}},
+    "subject_constraints": {"Math": [1, 2]},
+    "fixed_assignments": [{"teacher": "T1", "class": "A", "subject": "Math"}],
+    "teacher_unavailability": {"T1": [["Fri", "P1"], ["Fri", "P2"]]},
+}
+
+
+def solve(data, **options):
+    """Solve data with a short, single-worker run and return the scheduler."""
+    scheduler = SchoolScheduler(
+        data["teachers"], data["subjects"], data["classes"], data["rooms"], data["days"], data["periods"],
+        solver_params={"max_time_in_seconds": 5, "num_workers": 1, "random_seed": 0}, **options
+    )
+    configure_scheduler(scheduler, data)
+    scheduler.solve()
+    return scheduler
+
+
+@pytest.mark.parametrize("engine", ["grid", "interval"])
+def test_daily_minimum_on_day_left_without_candidates(engine):
+    # Pruning T2 leaves Friday without variables, yet T2 could teach then, so Friday still needs Math;
+    # the model itself must be infeasible rather than return a timetable the validator rejects
+    scheduler = solve(FIXED_TEACHER_AWAY, engine=engine)
+    assert scheduler.solution is None
+    assert scheduler.solve_stats["status"] == "INFEASIBLE"
+
+
+def longest_runs(data, solution, subject):
+    """Return {class_id: longest run of adjacent periods of subject on a single day}."""
+    longest = {}
+    for class_id in data["classes"]:
+        for day in data["days"]:
+            run = 0
+            for period in data["periods"]:
+                lessons = solution.get(f"{day}_{period}", [])
+                taught = any(l["class"] == class_id and l["subject"] == subject for l in lessons)
+                run = run + 1 if taught else 0
+                longest[class_id] = max(longest.get(class_id, 0), run)
+    return longest
+
+
+@pytest.mark.parametrize("engine", ["grid", "interval"])
+def test_consecutive_periods_give_every_class_a_block(example2, engine):
+    data = dict(example2, consecutive_periods={"Science": 2}, engine=engine)
+    status, body = call(data)
+    assert status == 200, body
+    runs = longest_runs(data, body["solution"], "Science")
+    assert all(runs[class_id] >= 2 for class_id, subjects in data["class_subjects"].items() if subjects.get("Science"))
+
+
+def lessons_of(solution):
+    """Return {(teacher, class, subject, timeslot key, room)} of a solution in get_solution_json format."""
+    return {
+        (lesson["teacher"], lesson["class"], lesson["subject"], slot, lesson["room"])
+        for slot, lessons in solution.items() for lesson in lessons
+    }
+
+
+def test_repair_keeps_lessons_outside_the_neighbourhood(example2):
+    status, previous = call(example2)
+    assert status == 200
+    before = lessons_of(previous["solution"])
+    # Smith becomes unavailable in every Monday slot they teach
+    away = sorted(slot for teacher, _, _, slot, _ in before if teacher == "Smith" and slot.startswith("Mon_"))
+    assert away
+    changes = {"teacher_unavailability": {"Smith": [slot.split("_") for slot in away]}}
+
+    status, body = call(dict(example2, previous_solution=previous, repair=changes))
+    assert status == 200, body
+    after = lessons_of(body["solution"])
+    info = body["repair_info"]
+    assert info["affected_lessons"] == len(away)
+    assert not any(teacher == "Smith" and slot in away for teacher, _, _, slot, _ in after)
+    # Lessons outside the neighbourhood keep their timeslot and room
+    neighbourhood = info["neighbourhood"]
+    outside = {
+        lesson for lesson in before
+        if lesson[0] not in neighbourhood["teachers"] and lesson[1] not in neighbourhood["classes"]
+    }
+    assert outside and outside <= after
+    assert info["frozen_lessons"] == len(outside)
+    assert info["changed_lessons"] == len(after - before)
+    assert info["changed_lessons"] >= len(away)
+
+
+def test_diagnose_reports_a_minimal_conflict():
+    # Math and English each have a single free teacher period, both Mon P2, for the same class;
+    # every count-based screening check passes
+    data = {
+        "teachers": ["T1", "T2"],
+        "subjects": ["Math", "English"],
+        "classes": ["A"],
+        "rooms": ["R1", "R2"],
+        "days": ["Mon"],
+        "periods": ["P1", "P2"],
+        "teacher_subjects": {"T1": ["Math"], "T2": ["English"]},
+        "teacher_classes": {"T1": ["A"], "T2": ["A"]},
+        "class_subjects": {"A": {"Math": 1, "English": 1}},
+        "subject_constraints": {"Math": [0, 1], "English": [0, 1]},
+        "teacher_unavailability": {"T1": [["Mon", "P1"]], "T2": [["Mon", "P1"]]},
+        "diagnose": True,
+        "use_cache": False,
+        "solver": {"max_time_in_seconds": 5, "num_workers": 1, "random_seed": 0},
+    }
+    status, body = call(data)
+    assert status == 400
+    assert body["error"] == "No valid solution found that meets all hard constraints"
+    groups = {(issue["type"], issue.get("teacher") or issue.get("class"), issue.get("subject")) for issue in body["issues"]}
+    assert groups == {
+        ("teacher_availability", "T1", None),
+        ("teacher_availability", "T2", None),
+        ("class_clash", "A", None),
+        ("weekly_requirement", "A", "Math"),
+        ("weekly_requirement", "A", "English"),
+    }
+    assert body["diagnosis_info"]["minimal"] is True
+    assert body["diagnosis_info"]["conflicting_groups"] == len(body["issues"])
+
+
+def test_teacher_assignment_picks_one_teacher_per_class_subject():
+    # T1 has 2 free periods, too few for B's 3 Math periods, so it is pruned as a candidate for B
+    data = {
+        "teachers": ["T1", "T2", "T3"],
+        "subjects": ["Math", "English"],
+        "classes": ["A", "B"],
+        "rooms": ["R1", "R2"],
+        "days": ["Mon", "Tue"],
+        "periods": ["P1", "P2", "P3"],
+        "teacher_subjects": {"T1": ["Math"], "T2": ["Math"], "T3": ["English"]},
+        "teacher_classes": {"T1": ["A", "B"], "T2": ["A", "B"], "T3": ["A", "B"]},
+        "class_subjects": {"A": {"Math": 2, "English": 2}, "B": {"Math": 3, "English": 1}},
+        "subject_constraints": {"Math": [0, 2], "English": [0, 2]},
+        "teacher_unavailability": {"T1": [["Mon", "P2"], ["Mon", "P3"], ["Tue", "P2"], ["Tue", "P3"]]},
+        "teacher_assignment": True,
+        "use_cache": False,
+        "solver": {"max_time_in_seconds": 5, "num_workers": 1, "random_seed": 0},
+    }
+    status, body = call(data)
+    assert status == 200, body
+    teachers = {}
+    for lessons in body["solution"].values():
+        for lesson in lessons:
+            teachers.setdefault((lesson["class"], lesson["subject"]), set()).add(lesson["teacher"])
+    assert set(teachers) == {("A", "Math"), ("A", "English"), ("B", "Math"), ("B", "English")}
+    assert all(len(names) == 1 for names in teachers.values())
+    assert teachers[("B", "Math")] == {"T2"}
+    assert body["model_info"]["pruned_teacher_candidates"] == 1
+
+
+def test_warm_start_drops_hints_that_no_longer_fit(example2):
+    status, previous = call(example2)
+    assert status == 200
+    before = lessons_of(previous["solution"])
+
+    status, body = call(dict(example2, previous_solution=previous))
+    assert status == 200
+    assert body["hint_info"]["assignments"] == len(before)
+    assert body["hint_info"]["applied"] == len(before)
+    assert body["hint_info"]["dropped"] == 0
+    assert body["hint_info"]["survival_rate"] == 1.0
+
+    # Smith's Monday lessons lose their variables once Smith is away on Monday
+    monday = [lesson for lesson in before if lesson[0] == "Smith" and lesson[3].startswith("Mon_")]
+    assert monday
+    unavailability = dict(example2["teacher_unavailability"])
+    unavailability["Smith"] = unavailability["Smith"] + [["Mon", period] for period in example2["periods"]]
+    status, body = call(dict(example2, previous_solution=previous, teacher_unavailability=unavailability))
+    assert status == 200, body
+    assert body["hint_info"]["dropped"] == len(monday)
+    assert body["hint_info"]["applied"] == len(before) - len(monday)
+    assert body["hint_info"]["survival_rate"] == round((len(before) - len(monday)) / len(before), 4)
+
+
+def test_interval_engine_output_passes_the_validator(example2):
+    # example2 has a break every day, R102 and R103 form a room pool, and Science needs a double period
+    data = dict(example2, engine="interval", consecutive_periods={"Science": 2})
+    status, body = call(data)
+    assert status == 200, body
+    assert body["model_info"]["blocks"] == len(data["classes"])
+    rooms = {lesson["room"] for lessons in body["solution"].values() for lesson in lessons}
+    assert {"R102", "R103"} <= rooms
+
+    status, result = call(dict(data, validate=body["solution"]))
+    assert status == 200
+    assert result["is_valid"], result["violations"]
+
+
+def test_stats_section(example2, monkeypatch):
+    solution_cache = SolutionCache(max_entries=8, ttl_seconds=0)
+    monkeypatch.setattr(index, "get_solution_cache", lambda: solution_cache)
+    monkeypatch.setattr(index, "get_model_cache", lambda: None)
+    data = dict(example2, use_cache=True, stats=True)
+    status, body = call(data)
+    assert status == 200
+    stats = body["stats"]
+    assert set(stats) == {"phases", "model", "solver", "total_seconds", "cached"}
+    assert list(stats["phases"])[:3] == ["parse", "cache_lookup", "feasibility_check"]
+    assert {"create_variables", "apply_constraints", "solve", "validate_solution"} <= set(stats["phases"])
+    assert list(stats["phases"])[-1] == "response"
+    assert set(stats["model"]) == {"variables", "constraints", "schedule_variables"}
+    assert {"status", "objective", "best_bound", "gap", "solutions", "conflicts", "branches", "wall_time"} <= set(stats["solver"])
+    assert stats["cached"] is False
+
+    # A solution cache hit has no model or solver to report
+    status, body = call(data)
+    assert status == 200
+    stats = body["stats"]
+    assert set(stats) == {"phases", "model", "solver", "total_seconds", "cached"}
+    assert list(stats["phases"]) == ["parse", "cache_lookup"]
+    assert stats["model"] is None and stats["solver"] is None
+    assert stats["cached"] is True
@@ -0,0 +1,151 @@
+import http.client
+import http.server
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from conftest import ROOT
+from jobs import JOB_DONE, JobManager, JobStore
+
+# local-server.py is a script, so it is loaded by path
+spec = importlib.util.spec_from_file_location("local_server", os.path.join(ROOT, "local-server.py"))
+local_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(local_server)
+
+
+@pytest.fixture
+def server(tmp_path):
+    """The development server on a free port, with a one-worker job pool that holds one pending job."""
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), local_server.Handler)
+    httpd.daemon_threads = True
+    httpd.job_manager = JobManager(str(tmp_path / "jobs.db"), max_workers=1, max_pending=1)
+    httpd.admission = local_server.SolveAdmission(1, 1)
+    httpd.static_files = local_server.StaticFileCache()
+    httpd.streams = {}
+    httpd.metrics = local_server.Metrics()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.job_manager.shutdown()
+
+
+def request(server, method, path, data=None):
+    """Send a request and return (status, headers, raw body)."""
+    conn = http.client.HTTPConnection(*server.server_address, timeout=60)
+    body = json.dumps(data) if data is not None else None
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    result = response.status, dict(response.getheaders()), response.read().decode("utf-8")
+    conn.close()
+    return result
+
+
+def test_job_runs_from_queued_to_done_and_rejects_a_full_queue(server, example2):
+    status, headers, body = request(server, "POST", local_server.JOBS_PATH, example2)
+    assert status == 202
+    job = json.loads(body)
+    assert job["status"] == "queued"
+    assert headers["Location"] == job["status_url"]
+
+    # The pool holds a single pending job, so a second one is turned away until the first finishes
+    status, headers, body = request(server, "POST", local_server.JOBS_PATH, example2)
+    assert status == 429
+    assert headers["Retry-After"] == str(local_server.RETRY_AFTER_SECONDS)
+
+    seen = []
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        status, _, body = request(server, "GET", job["status_url"])
+        assert status == 200
+        current = json.loads(body)
+        if not seen or seen[-1] != current["status"]:
+            seen.append(current["status"])
+        if current["status"] in ("done", "failed"):
+            break
+        time.sleep(0.1)
+    assert seen[0] in ("queued", "running")
+    assert seen[-1] == "done"
+    assert set(seen) <= {"queued", "running", "done"}
+    assert current["status_code"] == 200
+    assert current["result"]["solution"]
+
+    # A finished job frees its place in the queue
+    status, _, _ = request(server, "POST", local_server.JOBS_PATH, example2)
+    assert status == 202
+
+
+def test_admission_control_rejects_solves_beyond_the_wait_queue(server, example2):
+    # One solve holds the only slot and another waits for it, which fills the wait queue of one
+    admission = server.admission
+    assert admission.acquire()
+    waiter = threading.Thread(target=admission.acquire)
+    waiter.start()
+    while admission.gauges()["queued_solves"] < 1:
+        time.sleep(0.01)
+    try:
+        for path in ("/api/schedule", local_server.STREAM_PATH):
+            status, headers, body = request(server, "POST", path, example2)
+            assert status == 429
+            assert headers["Retry-After"] == str(local_server.RETRY_AFTER_SECONDS)
+            assert "retry" in json.loads(body)["error"]
+    finally:
+        admission.release()
+        waiter.join()
+        admission.release()
+    assert admission.gauges()["in_flight_solves"] == 0
+
+
+def parse_events(body):
+    """Return [(event, data)] of a Server-Sent Events body, skipping keep-alive comments."""
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_sends_started_then_solutions_then_result(server, example2):
+    status, headers, body = request(server, "POST", local_server.STREAM_PATH, example2)
+    assert status == 200
+    assert headers["Content-Type"] == "text/event-stream"
+    events = parse_events(body)
+    names = [name for name, _ in events]
+    assert names[0] == "started"
+    assert names[-1] == "result"
+    assert names[1:-1] and set(names[1:-1]) == {"solution"}
+
+    started, result = events[0][1], events[-1][1]
+    assert started["cancel_url"] == f"{local_server.STREAM_PATH}/{started['stream_id']}/cancel"
+    assert result["status_code"] == 200
+    assert result["body"]["solution"]
+    # Each solution event improves on the previous one
+    objectives = [data["objective"] for name, data in events if name == "solution"]
+    assert objectives == sorted(objectives, reverse=True)
+    assert server.streams == {}
+
+
+def test_job_store_closes_its_sqlite_connections(tmp_path, monkeypatch):
+    connections = []
+    connect = sqlite3.connect
+
+    def tracked_connect(*args, **kwargs):
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(sqlite3, "connect", tracked_connect)
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.create()
+    store.update(job_id, JOB_DONE, 200, json.dumps({"solution": {}}))
+    assert store.get(job_id)["result"] == {"solution": {}}
+    assert len(connections) == 4
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
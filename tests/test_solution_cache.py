@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+
+import solution_cache
+from solution_cache import SolutionCache, canonical_input_hash, normalize_input
+
+PAYLOAD = {
+    "teachers": ["Smith", "Jones"],
+    "rooms": ["R101", "Lab1"],
+    "days": ["Mon", "Tue"],
+    "periods": ["P1", "P2"],
+    "teacher_subjects": {"Smith": ["Math", "Science"], "Jones": ["English"]},
+    "teacher_unavailability": {"Smith": [["Mon", "P1"], ["Tue", "P2"]]},
+    "break_periods": [["Mon", "P2"], ["Tue", "P2"]],
+}
+
+
+def test_reordered_set_valued_keys_hash_equal():
+    reordered = dict(
+        PAYLOAD,
+        teachers=["Jones", "Smith"],
+        rooms=["Lab1", "R101"],
+        teacher_subjects={"Jones": ["English"], "Smith": ["Science", "Math"]},
+        teacher_unavailability={"Smith": [("Tue", "P2"), ("Mon", "P1")]},
+        break_periods=[["Tue", "P2"], ["Mon", "P2"]],
+    )
+    assert canonical_input_hash(reordered) == canonical_input_hash(PAYLOAD)
+
+
+def test_order_sensitive_lists_hash_differently():
+    assert canonical_input_hash(dict(PAYLOAD, periods=["P2", "P1"])) != canonical_input_hash(PAYLOAD)
+    assert canonical_input_hash(dict(PAYLOAD, days=["Tue", "Mon"])) != canonical_input_hash(PAYLOAD)
+
+
+def test_normalize_input_keeps_days_and_periods():
+    normalized = normalize_input(dict(PAYLOAD, periods=["P2", "P1"]))
+    assert normalized["periods"] == ["P2", "P1"]
+    assert normalized["teachers"] == ["Jones", "Smith"]
+
+
+def test_changed_values_hash_differently():
+    assert canonical_input_hash(dict(PAYLOAD, rooms=["R101"])) != canonical_input_hash(PAYLOAD)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = SolutionCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(solution_cache.time, "time", lambda: now[0])
+    cache = SolutionCache(ttl_seconds=60)
+    cache.put("a", {"n": 1})
+    now[0] += 59
+    assert cache.get("a") == {"n": 1}
+    now[0] += 2
+    assert cache.get("a") is None
+
+
+def test_entries_survive_reopening_the_sqlite_file(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    SolutionCache(db_path=db_path).put("a", {"solution": {"Mon_P1": []}})
+    reopened = SolutionCache(db_path=db_path)
+    assert reopened.get("a") == {"solution": {"Mon_P1": []}}
+    assert reopened.get("missing") is None
+
+
+def test_expired_sqlite_entries_are_not_returned(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(solution_cache.time, "time", lambda: now[0])
+    db_path = str(tmp_path / "cache.sqlite")
+    SolutionCache(ttl_seconds=60, db_path=db_path).put("a", {"n": 1})
+    now[0] += 61
+    assert SolutionCache(ttl_seconds=60, db_path=db_path).get("a") is None
+
+
+def test_sqlite_connections_are_closed(tmp_path, monkeypatch):
+    connections = []
+    connect = sqlite3.connect
+
+    def tracked_connect(*args, **kwargs):
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(sqlite3, "connect", tracked_connect)
+    db_path = str(tmp_path / "cache.sqlite")
+    SolutionCache(db_path=db_path).put("a", {"n": 1})
+    assert SolutionCache(db_path=db_path).get("a") == {"n": 1}
+    assert len(connections) == 4
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
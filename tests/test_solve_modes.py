@@ -0,0 +1,17 @@
+import index
+from conftest import call
+
+
+def test_two_stage_solves(example2):
+    status, body = call(dict(example2, solve_mode="two_stage"))
+    assert status == 200
+    assert body["model_info"]["solve_mode"] == "two_stage"
+    assert all(lesson["room"] for lessons in body["solution"].values() for lesson in lessons)
+
+
+def test_two_stage_falls_back_to_full_when_room_groups_explode(example2, monkeypatch):
+    monkeypatch.setattr(index, "MAX_ROOM_GROUP_UNIONS", 1)
+    status, body = call(dict(example2, solve_mode="two_stage"))
+    assert status == 200
+    assert body["model_info"]["solve_mode"] == "full"
+    assert body["model_info"]["two_stage_fallback"] == "room_group_unions"
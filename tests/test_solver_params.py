@@ -0,0 +1,28 @@
+import pytest
+
+from conftest import call
+from index import resolve_solver_params
+
+
+def test_log_to_response_accepts_booleans():
+    assert resolve_solver_params({"log_to_response": True})["log_to_response"] is True
+    assert resolve_solver_params({})["log_to_response"] is False
+    assert resolve_solver_params({"log_to_response": None})["log_to_response"] is False
+
+
+@pytest.mark.parametrize("value", ["false", "true", 0, 1])
+def test_log_to_response_rejects_non_booleans(value):
+    with pytest.raises(TypeError):
+        resolve_solver_params({"log_to_response": value})
+
+
+def test_handler_rejects_string_log_to_response(example2):
+    status, body = call(dict(example2, solver={"log_to_response": "false"}))
+    assert status == 400
+    assert "log_to_response" in body["error"]
+
+
+@pytest.mark.parametrize("params", [{"max_time_in_seconds": 0}, {"num_workers": 0}, {"relative_gap_limit": -1}, {"threads": 2}])
+def test_invalid_solver_params(params):
+    with pytest.raises(ValueError):
+        resolve_solver_params(params)
@@ -0,0 +1,32 @@
+from conftest import call
+
+
+def rooms_used(body):
+    return [lesson["room"] for lessons in body["solution"].values() for lesson in lessons]
+
+
+def test_room_ordering_without_pooling(example2):
+    status, body = call(dict(example2, room_pooling=False, symmetry_breaking=True))
+    assert status == 200, body
+    assert body["model_info"]["symmetry_breaking"]["room_orderings"] > 0
+    # R101 is suitable for Science, so only R102 and R103 share a signature
+    used = rooms_used(body)
+    assert used.count("R102") >= used.count("R103")
+
+
+def test_pooled_grid_reports_no_orderings(example2):
+    status, body = call(dict(example2, symmetry_breaking=True))
+    assert status == 200, body
+    assert body["model_info"]["symmetry_breaking"] == {"room_orderings": 0}
+
+
+def test_lesson_ordering_with_interval_engine(example2):
+    status, body = call(dict(example2, engine="interval", symmetry_breaking=True))
+    assert status == 200, body
+    assert body["model_info"]["symmetry_breaking"]["lesson_orderings"] > 0
+
+
+def test_off_by_default(example2):
+    status, body = call(dict(example2, room_pooling=False))
+    assert status == 200, body
+    assert "symmetry_breaking" not in body["model_info"]
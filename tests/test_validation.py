@@ -0,0 +1,146 @@
+import pytest
+
+from conftest import call
+from index import SchoolScheduler, configure_scheduler
+from validation import validate_timetable
+
+
+def test_subject_missing_from_subjects_still_validates(example2):
+    # PE is only named in teacher_subjects and class_subjects; the model schedules it anyway
+    data = dict(example2, subjects=[subject for subject in example2["subjects"] if subject != "PE"])
+    status, body = call(data)
+    assert status == 200, body
+    assert any(lesson["subject"] == "PE" for lessons in body["solution"].values() for lesson in lessons)
+
+PAYLOAD = {
+    "teachers": ["T1", "T2", "T3"],
+    "subjects": ["Math", "English"],
+    "classes": ["A", "B"],
+    "rooms": ["R1", "R2", "R3"],
+    "days": ["Mon", "Tue"],
+    "periods": ["P1", "P2", "P3"],
+    "teacher_subjects": {"T1": ["Math"], "T2": ["English"], "T3": ["Math"]},
+    "teacher_classes": {"T1": ["A"], "T2": ["A", "B"], "T3": ["A", "B"]},
+    "class_subjects": {"A": {"Math": 2, "English": 1}, "B": {"Math": 1, "English": 1}},
+    "subject_constraints": {"Math": [0, 1], "English": [0, 1]},
+    "room_suitability": {"English": ["R1"]},
+    "teacher_unavailability": {"T3": [["Tue", "P2"]]},
+    "break_periods": [["Tue", "P3"]],
+}
+
+# (day, period, teacher, class, subject, room) of a timetable that meets every constraint of PAYLOAD
+VALID = [
+    ("Mon", "P1", "T1", "A", "Math", "R2"),
+    ("Mon", "P1", "T2", "B", "English", "R1"),
+    ("Mon", "P2", "T2", "A", "English", "R1"),
+    ("Mon", "P2", "T3", "B", "Math", "R2"),
+    ("Tue", "P1", "T1", "A", "Math", "R2"),
+]
+
+
+def validate(lessons, **overrides):
+    data = dict(PAYLOAD, **overrides)
+    scheduler = SchoolScheduler(
+        data["teachers"], data["subjects"], data["classes"], data["rooms"], data["days"], data["periods"]
+    )
+    configure_scheduler(scheduler, data)
+    solution = {}
+    for day, period, teacher, class_id, subject, room in lessons:
+        solution.setdefault((day, period), []).append(
+            {"teacher": teacher, "class": class_id, "subject": subject, "room": room}
+        )
+    return validate_timetable(scheduler, solution)
+
+
+def replace(lesson, **changes):
+    """VALID with lesson (an index) changed, e.g. replace(4, period="P2")."""
+    fields = ("day", "period", "teacher", "class_id", "subject", "room")
+    lessons = list(VALID)
+    lessons[lesson] = tuple(changes.get(field, value) for field, value in zip(fields, VALID[lesson]))
+    return lessons
+
+
+def violation_types(result):
+    return {violation["type"] for violation in result["violations"]}
+
+
+def test_valid_timetable_passes():
+    result = validate(VALID)
+    assert result == {"is_valid": True, "violations": []}
+
+
+@pytest.mark.parametrize("lessons, kind", [
+    (replace(1, period="P2"), "teacher_clash"),    # T2 teaches A and B at Mon P2
+    (replace(2, period="P1"), "class_clash"),      # A has Math and English at Mon P1
+    (replace(3, day="Tue", period="P1"), "room_clash"),  # R2 hosts A and B at Tue P1
+])
+def test_clashes(lessons, kind):
+    result = validate(lessons)
+    assert not result["is_valid"]
+    assert kind in violation_types(result)
+
+
+def test_room_suitability():
+    result = validate(replace(2, room="R3"))
+    assert violation_types(result) == {"room_suitability"}
+    assert result["violations"][0]["room"] == "R3"
+
+
+def test_teacher_availability():
+    result = validate(replace(3, day="Tue", period="P2"))
+    assert violation_types(result) == {"teacher_availability"}
+    assert result["violations"][0]["teacher"] == "T3"
+
+
+def test_break_periods():
+    result = validate(replace(3, day="Tue", period="P3"))
+    assert violation_types(result) == {"break_periods"}
+
+
+def test_teacher_qualification():
+    result = validate(replace(3, teacher="T1"))
+    assert violation_types(result) == {"teacher_qualification"}
+
+
+def test_weekly_requirement():
+    result = validate(VALID[:4])
+    assert violation_types(result) == {"weekly_requirement"}
+    assert result["violations"][0]["class"] == "A"
+
+
+def test_daily_maximum():
+    result = validate(replace(4, day="Mon", period="P3"))
+    assert violation_types(result) == {"daily_limits"}
+    assert result["violations"][0]["day"] == "Mon"
+
+
+def test_daily_minimum():
+    # B has its only Math lesson on Monday, but needs one every day
+    result = validate(VALID, subject_constraints={"Math": [1, 1], "English": [0, 1]})
+    assert violation_types(result) == {"daily_limits"}
+    assert [(v["class"], v["day"]) for v in result["violations"]] == [("B", "Tue")]
+
+
+def test_fixed_assignment():
+    fixed = [{"teacher": "T1", "class": "A", "subject": "Math"}]
+    assert validate(VALID, fixed_assignments=fixed)["is_valid"]
+    result = validate(replace(4, teacher="T3"), fixed_assignments=fixed)
+    assert violation_types(result) == {"fixed_assignment"}
+
+
+def test_consecutive_block():
+    result = validate(VALID, consecutive_periods={"Math": 2}, subject_constraints={})
+    assert violation_types(result) == {"consecutive_periods"}
+    assert {v["class"] for v in result["violations"]} == {"A", "B"}
+
+
+def test_consecutive_block_met():
+    lessons = [
+        ("Mon", "P1", "T1", "A", "Math", "R2"),
+        ("Mon", "P2", "T1", "A", "Math", "R2"),
+        ("Mon", "P3", "T2", "A", "English", "R1"),
+        ("Mon", "P1", "T2", "B", "English", "R1"),
+    ]
+    result = validate(lessons, consecutive_periods={"Math": 2}, subject_constraints={},
+                      class_subjects={"A": {"Math": 2, "English": 1}, "B": {"English": 1}})
+    assert result["is_valid"], result["violations"]
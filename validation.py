@@ -0,0 +1,216 @@
+"""
+Timetable validation.
+
+Checks a timetable against every hard constraint of the scheduler in one pass. Lessons become
+integer arrays of (teacher, class, subject, room, day, period) indexes and every constraint is a
+count or lookup on dense entity x slot arrays, so a whole school validates in milliseconds and
+every violation is reported, not just the first. Works on solver output as well as on timetables
+uploaded or edited outside the solver.
+"""
+import numpy as np
+
+
+def _index(items):
+    return {item: i for i, item in enumerate(items)}
+
+
+def _violation(kind, explanation, **entities):
+    return dict({"type": kind, "explanation": explanation}, **entities)
+
+
+def validate_timetable(scheduler, solution):
+    """Validate solution ({(day, period): [assignments]}) against the hard constraints of scheduler.
+
+    Checks teacher, class and room clashes, room suitability, teacher qualifications,
+    unavailability, break periods, weekly totals, daily minimums and maximums, fixed assignments,
+    one teacher per class-subject in teacher_assignment mode, and consecutive blocks. Returns
+    {"is_valid", "violations"}, where each violation is an issue dict with a type, an explanation
+    and the entities involved, plus "reason" and "constraint_type" of the first violation.
+    """
+    teachers, classes, rooms = scheduler.teachers, scheduler.classes, scheduler.rooms
+    # Like the model, subjects only named in teacher_subjects or class_subjects count as subjects too
+    subjects = list(dict.fromkeys(
+        list(scheduler.subjects)
+        + [subject for named in scheduler.teacher_subjects.values() for subject in named]
+        + [subject for weekly in scheduler.class_subjects.values() for subject in weekly]
+    ))
+    days, periods = scheduler.days, scheduler.periods
+    teacher_index, class_index, subject_index = _index(teachers), _index(classes), _index(subjects)
+    room_index, day_index, period_index = _index(rooms), _index(days), _index(periods)
+    n_teachers, n_classes, n_subjects, n_rooms = len(teachers), len(classes), len(subjects), len(rooms)
+    n_days, n_periods = len(days), len(periods)
+    n_slots = n_days * n_periods
+    violations = []
+
+    def slot_name(slot):
+        return days[slot // n_periods], periods[slot % n_periods]
+
+    # Lessons as rows of entity indexes; lessons naming unknown entities cannot be checked further
+    rows = []
+    for (day, period), assignments in solution.items():
+        for assignment in assignments:
+            names = (
+                assignment.get("teacher"), assignment.get("class"), assignment.get("subject"),
+                assignment.get("room"), day, period
+            )
+            row = (
+                teacher_index.get(names[0]), class_index.get(names[1]), subject_index.get(names[2]),
+                room_index.get(names[3]), day_index.get(day), period_index.get(period)
+            )
+            if None in row:
+                unknown = [
+                    f"{field} {name}" for field, name, index
+                    in zip(("teacher", "class", "subject", "room", "day", "period"), names, row) if index is None
+                ]
+                violations.append(_violation(
+                    "unknown_entity", f"Lesson at {day} {period} refers to unknown {', '.join(unknown)}",
+                    day=day, period=period, lesson=dict(assignment)
+                ))
+                continue
+            rows.append(row)
+    lessons = np.array(rows, dtype=np.int64).reshape(-1, 6)
+    T, C, S, R, D, P = lessons.T
+    slot = D * n_periods + P
+
+    def lesson_name(i):
+        return f"{teachers[T[i]]} teaching {classes[C[i]]} {subjects[S[i]]} in {rooms[R[i]]} at {days[D[i]]} {periods[P[i]]}"
+
+    def lesson_violation(kind, explanation, i):
+        violations.append(_violation(
+            kind, explanation, teacher=teachers[T[i]], **{"class": classes[C[i]]}, subject=subjects[S[i]],
+            room=rooms[R[i]], day=days[D[i]], period=periods[P[i]]
+        ))
+
+    # Clashes: more than one lesson per teacher, class or room in a timeslot
+    for kind, ids, names, field, rule in (
+        ("teacher_clash", T, teachers, "teacher", "can teach only one class at a time"),
+        ("class_clash", C, classes, "class", "can have only one lesson at a time"),
+        ("room_clash", R, rooms, "room", "can host only one class at a time")
+    ):
+        counts = np.zeros((len(names), n_slots), dtype=np.int64)
+        np.add.at(counts, (ids, slot), 1)
+        for entity, clash_slot in zip(*np.nonzero(counts > 1)):
+            day, period = slot_name(clash_slot)
+            violations.append(_violation(
+                kind, f"{names[entity]} {rule}, but has {counts[entity, clash_slot]} lessons at {day} {period}",
+                **{field: names[entity]}, day=day, period=period
+            ))
+
+    # Per-lesson lookups: suitable room, qualified teacher, teacher available, not a break
+    suitable = np.ones((n_subjects, n_rooms), dtype=bool)
+    for subject, suitable_rooms in scheduler.room_suitability.items():
+        if subject in subject_index:
+            suitable[subject_index[subject]] = False
+            suitable[subject_index[subject], [room_index[room] for room in suitable_rooms if room in room_index]] = True
+    teaches_subject = np.zeros((n_teachers, n_subjects), dtype=bool)
+    teaches_class = np.zeros((n_teachers, n_classes), dtype=bool)
+    for teacher, t in teacher_index.items():
+        teaches_subject[t, [subject_index[s] for s in scheduler.teacher_subjects.get(teacher, []) if s in subject_index]] = True
+        teaches_class[t, [class_index[c] for c in scheduler.teacher_classes.get(teacher, []) if c in class_index]] = True
+    unavailable = np.zeros((n_teachers, n_slots), dtype=bool)
+    for teacher, slots in scheduler.teacher_unavailability.items():
+        for day, period in slots:
+            if teacher in teacher_index and day in day_index and period in period_index:
+                unavailable[teacher_index[teacher], day_index[day] * n_periods + period_index[period]] = True
+    is_break = np.zeros(n_slots, dtype=bool)
+    for day, period in scheduler.break_periods:
+        if day in day_index and period in period_index:
+            is_break[day_index[day] * n_periods + period_index[period]] = True
+
+    for i in np.nonzero(~suitable[S, R])[0]:
+        lesson_violation("room_suitability", f"{lesson_name(i)}: room is not suitable for {subjects[S[i]]}", i)
+    for i in np.nonzero(~(teaches_subject[T, S] & teaches_class[T, C]))[0]:
+        lesson_violation("teacher_qualification", f"{lesson_name(i)}: teacher is not assigned this class and subject", i)
+    for i in np.nonzero(unavailable[T, slot])[0]:
+        lesson_violation("teacher_availability", f"{lesson_name(i)}: teacher is unavailable", i)
+    for i in np.nonzero(is_break[slot])[0]:
+        lesson_violation("break_periods", f"{lesson_name(i)}: timeslot is a break period", i)
+
+    # Weekly totals must match the requirement exactly, lessons of unrequested subjects included
+    required = np.zeros((n_classes, n_subjects), dtype=np.int64)
+    has_subject = np.zeros((n_classes, n_subjects), dtype=bool)
+    for class_id, weekly in scheduler.class_subjects.items():
+        for subject, weekly_periods in weekly.items():
+            if class_id in class_index and subject in subject_index:
+                required[class_index[class_id], subject_index[subject]] = weekly_periods
+                has_subject[class_index[class_id], subject_index[subject]] = True
+    weekly_counts = np.zeros((n_classes, n_subjects), dtype=np.int64)
+    np.add.at(weekly_counts, (C, S), 1)
+    for c, s in zip(*np.nonzero(weekly_counts != required)):
+        violations.append(_violation(
+            "weekly_requirement",
+            f"{classes[c]} requires {required[c, s]} periods of {subjects[s]} per week, but got {weekly_counts[c, s]}",
+            **{"class": classes[c]}, subject=subjects[s]
+        ))
+
+    # Daily limits; like the model, minimums only apply on days a qualified teacher can teach
+    daily_counts = np.zeros((n_classes, n_subjects, n_days), dtype=np.int64)
+    np.add.at(daily_counts, (C, S, D), 1)
+    qualified = teaches_class[:, :, None] & teaches_subject[:, None, :]
+    teacher_day_open = (~unavailable & ~is_break).reshape(n_teachers, n_days, n_periods).any(axis=2)
+    open_days = np.einsum("tcs,td->csd", qualified.astype(np.int64), teacher_day_open.astype(np.int64)) > 0
+    for subject, (min_daily, max_daily) in scheduler.subject_constraints.items():
+        if subject not in subject_index:
+            continue
+        s = subject_index[subject]
+        counts = daily_counts[:, s, :]
+        too_many = (counts > max_daily) & has_subject[:, s, None]
+        too_few = (counts < min_daily) & has_subject[:, s, None] & open_days[:, s, :]
+        for c, d in zip(*np.nonzero(too_many | too_few)):
+            violations.append(_violation(
+                "daily_limits",
+                f"{classes[c]} needs {min_daily} to {max_daily} periods of {subject} per day, but got {counts[c, d]} on {days[d]}",
+                **{"class": classes[c]}, subject=subject, day=days[d]
+            ))
+
+    # Fixed assignments: the fixed teacher teaches every lesson of its class and subject
+    for teacher, class_id, subject in scheduler.fixed_assignments:
+        if teacher not in teacher_index or class_id not in class_index or subject not in subject_index:
+            continue
+        t, c, s = teacher_index[teacher], class_index[class_id], subject_index[subject]
+        if not has_subject[c, s] or not qualified[t, c, s]:
+            continue  # The model ignores fixed assignments the teacher cannot teach
+        taught = int(np.count_nonzero((T == t) & (C == c) & (S == s)))
+        if taught != required[c, s]:
+            violations.append(_violation(
+                "fixed_assignment",
+                f"{teacher} is fixed to teach all {required[c, s]} periods of {class_id} {subject}, but teaches {taught}",
+                teacher=teacher, **{"class": class_id}, subject=subject
+            ))
+
+    # Teacher assignment mode: one teacher per class and subject
+    if scheduler.teacher_assignment and len(lessons):
+        pairs = np.unique(np.stack([C, S, T], axis=1), axis=0)
+        pair_ids, teacher_counts = np.unique(pairs[:, 0] * n_subjects + pairs[:, 1], return_counts=True)
+        for pair_id in pair_ids[teacher_counts > 1]:
+            c, s = divmod(int(pair_id), n_subjects)
+            names = [teachers[t] for t in pairs[(pairs[:, 0] == c) & (pairs[:, 1] == s), 2]]
+            violations.append(_violation(
+                "split_assignment", f"{classes[c]} {subjects[s]} is taught by {', '.join(names)} instead of one teacher",
+                **{"class": classes[c]}, subject=subjects[s], teachers=names
+            ))
+
+    # Consecutive blocks: at least one run of min_consecutive adjacent periods on some day
+    occupied = np.zeros((n_classes, n_subjects, n_days, n_periods), dtype=bool)
+    occupied[C, S, D, P] = True
+    for subject, min_consecutive in scheduler.consecutive_periods.items():
+        if min_consecutive <= 1 or subject not in subject_index:
+            continue
+        s = subject_index[subject]
+        starts = max(n_periods - min_consecutive + 1, 0)
+        window = occupied[:, s, :, :starts].copy()
+        for offset in range(1, min_consecutive):
+            window &= occupied[:, s, :, offset:offset + starts]
+        has_block = window.any(axis=(1, 2))
+        for c in np.nonzero((required[:, s] > 0) & ~has_block)[0]:
+            violations.append(_violation(
+                "consecutive_periods",
+                f"Subject {subject} requires at least {min_consecutive} consecutive periods for class {classes[c]}, but none were scheduled",
+                **{"class": classes[c]}, subject=subject
+            ))
+
+    result = {"is_valid": not violations, "violations": violations}
+    if violations:
+        result["reason"] = violations[0]["explanation"]
+        result["constraint_type"] = violations[0]["type"]
+    return result